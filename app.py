@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from trading_bot.candles import get_candle_store
+from trading_bot.exchange import ExchangeClient
+from trading_bot.history import get_history_store
+from trading_bot.journal import get_journal
+from trading_bot.metadata import MarketMetadata, BalanceLedger
+from trading_bot.metrics import start_metrics_server
+from trading_bot.risk import RiskEngine
+from trading_bot.scheduler import TokenBucket
+from trading_bot.sentiment import get_sentiment_feed
+from trading_bot.config import SYMBOLS, STREAMING_ENABLED, METRICS_ENABLED, TICK_RECORDING_ENABLED, \
+    EXCHANGE_SIMULATOR, METRICS_PORT, SENTIMENT_ENABLED, REQUEST_RATE_LIMIT, REQUEST_BURST
+
+logger = logging.getLogger(__name__)
+
+async def initialize_client(simulator=None, symbols=SYMBOLS):
+    if simulator:
+        # Simulador local en lugar de testnet: mismos métodos que el cliente del SDK
+        from trading_bot.simulator import ExchangeSimulator
+        client = simulator if isinstance(simulator, ExchangeSimulator) else ExchangeSimulator(symbols)
+        logger.info("Usando el simulador local del exchange")
+        return client, client, client
+    # El SDK de dYdX (gRPC incluido) sólo se carga al conectar, no al importar el bot
+    from dydx_v4_client import NodeClient, IndexerClient, FaucetClient
+    from dydx_v4_client.network import secure_channel, TESTNET
+    try:
+        node = await NodeClient(secure_channel("test-dydx-grpc.kingnodes.com"))
+        indexer = IndexerClient(TESTNET.rest_indexer)
+        faucet = FaucetClient()
+        logger.info("Clientes de dYdX inicializados correctamente")
+        return node, indexer, faucet
+    except Exception as e:
+        logger.error(f"Error al inicializar los clientes de dYdX: {e}")
+        return None, None, None
+
+class AppContext:
+    """Clientes y servicios compartidos del proceso de trading.
+
+    Importar los módulos del bot no crea conexiones ni ficheros: todo se
+    construye una sola vez en start() y se libera en close(). Un worker de
+    sharding recibe sólo su parte del límite de peticiones y no reconcilia el
+    saldo ni descarga el sentimiento: de eso se encarga el coordinador.
+    """
+
+    def __init__(self, symbols=SYMBOLS, streaming=STREAMING_ENABLED, metrics=METRICS_ENABLED,
+                 simulator=EXCHANGE_SIMULATOR, metrics_port=METRICS_PORT, rate_limit=REQUEST_RATE_LIMIT,
+                 burst=REQUEST_BURST, reconcile_balance=True, sentiment=SENTIMENT_ENABLED):
+        self.symbols = symbols
+        self.metrics_port = metrics_port
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.reconcile_balance = reconcile_balance
+        self.sentiment = sentiment
+        # True o un ExchangeSimulator: el bot opera contra el simulador local en lugar de dYdX
+        self.simulator = simulator
+        self.streaming = streaming
+        self.metrics = metrics
+        self.client = self.indexer = self.faucet = None
+        self.exchange = self.metadata = self.ledger = self.stream = self.recorder = None
+        self.risk = RiskEngine()
+        self._tasks = []
+        self._started = False
+
+    async def start(self):
+        """Conecta con el exchange y arranca las tareas de fondo; devuelve False si no hay conexión."""
+        if self._started:
+            return True
+        self.client, self.indexer, self.faucet = await initialize_client(self.simulator, self.symbols)
+        if not (self.client and self.indexer and self.faucet):
+            return False
+        if self.metrics:
+            start_metrics_server(self.metrics_port)
+        self.warm_up(self.symbols)
+        self.exchange = ExchangeClient(self.client, rate_limiter=TokenBucket(self.rate_limit, self.burst))
+        self.metadata = MarketMetadata(self.exchange)
+        await self.metadata.load()
+        self._tasks = [asyncio.create_task(self.metadata.run())]
+        if self.reconcile_balance:
+            self.ledger = BalanceLedger(self.exchange)
+            await self.ledger.reconcile()
+            self._tasks.append(asyncio.create_task(self.ledger.run()))
+        # El simulador no tiene índice de sentimiento: sin datos, el filtro de entrada no bloquea
+        if self.sentiment and not self.simulator:
+            self._tasks.append(asyncio.create_task(get_sentiment_feed().run(self.exchange)))
+        if self.streaming:
+            from trading_bot.streaming import MarketStream
+            if TICK_RECORDING_ENABLED:
+                from trading_bot.replay import TickRecorder
+                self.recorder = TickRecorder()
+            url = await self.client.serve() if self.simulator else None
+            self.stream = MarketStream(self.exchange, url=url, recorder=self.recorder, risk=self.risk,
+                                       symbols=self.symbols)
+            self._tasks.append(asyncio.create_task(self.stream.run()))
+        self._started = True
+        return True
+
+    def warm_up(self, symbols):
+        # Los indicadores arrancan con el histórico local; al indexer sólo se le piden las velas nuevas
+        for symbol in symbols:
+            store = get_candle_store(symbol, "1H").warm_up(get_history_store(symbol, "1H"))
+            self.risk.seed(symbol, store.closes(), store.column("time"))
+
+    async def close(self):
+        if not self._started:
+            return
+        if self.stream:
+            await self.stream.stop()
+        for task in self._tasks:
+            task.cancel()
+        await self.exchange.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.simulator:
+            await self.client.close()
+        get_sentiment_feed().close()
+        get_journal().close()
+        self._started = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -1,80 +1,284 @@
 import logging
+import time
 import numpy as np
 import pandas as pd
-import talib
 from itertools import product
-from bayes_opt import BayesianOptimization
-from dydx4 import Client  # Importar la biblioteca de dYdX4
+from multiprocessing import Pool, resource_tracker, shared_memory
+from trading_bot.history import get_history_store
+from trading_bot.metrics import BACKTEST_BARS, BACKTEST_BARS_PER_SECOND, OPTIMIZER_EVALUATIONS, \
+    OPTIMIZER_EVALUATIONS_PER_SECOND, record_throughput
 from trading_bot.utils import get_technical_indicators, get_atr, get_price
-from trading_bot.config import SYMBOLS, BUDGET, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, PROFIT_THRESHOLD_RANGE, TRAILING_STOP_RANGE
-from trading_bot.ml_models import train_ml_model, predict_with_ml_model
-from ml_models import train_ml_model, predict_with_ml_model
+from trading_bot.config import SYMBOLS, BUDGET, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, PROFIT_THRESHOLD_RANGE, TRAILING_STOP_RANGE, \
+    OPTIMIZER_BATCH_SIZE, OPTIMIZER_WORKERS, ML_INFERENCE_WORKERS, DEFAULT_ALLOCATION
+from trading_bot.ml_models import build_training_data
+from trading_bot.inference import predict_scores
+from trading_bot.model_registry import get_model_registry
+from trading_bot.sentiment import get_sentiment_feed
+from trading_bot.strategy import sentiment_confirmation, order_quantity
 
-def backtest(client, symbol, profit_threshold, trailing_stop):
+try:
+    from numba import njit  # Opcional: compila el bucle de posiciones
+except ImportError:
+    njit = None
+
+WARMUP_BARS = 200
+
+def entry_exit_signals(df):
+    """Máscaras de entrada y salida por vela calculadas sobre arrays completos."""
+    close = df["close"].to_numpy(dtype=np.float64)
+    rsi = df["RSI"].to_numpy(dtype=np.float64)
+    macd = df["MACD"].to_numpy(dtype=np.float64)
+    signal = df["Signal"].to_numpy(dtype=np.float64)
+    entry = (rsi < 30) & (macd > signal) & (close > df["SMA50"].to_numpy(dtype=np.float64)) & \
+        (close > df["EMA200"].to_numpy(dtype=np.float64))
+    exit = (rsi > 70) | (macd < signal)
+    return entry, exit
+
+def _resolve_positions(close, entry, exit, allow, trailing_stop, start):
+    n = len(close)
+    buys = np.empty(n, dtype=np.int64)
+    sells = np.empty(n, dtype=np.int64)
+    count = 0
+    holding = False
+    buy_price = 0.0
+    for i in range(start, n):
+        if entry[i]:
+            if not holding and allow[i]:
+                holding = True
+                buy_price = close[i]
+                buys[count] = i
+        elif exit[i] or (holding and close[i] < buy_price * (1 - trailing_stop)):
+            if holding:
+                sells[count] = i
+                count += 1
+                holding = False
+    return buys[:count], sells[:count]
+
+if njit is not None:
+    _resolve_positions = njit(cache=True)(_resolve_positions)
+
+def simulate_positions(close, entry, exit, trailing_stop, allow=None, start=WARMUP_BARS, budget=BUDGET,
+                       allocation=DEFAULT_ALLOCATION):
+    """Resuelve las posiciones en una sola pasada y calcula las métricas del backtest.
+
+    Cada compra usa la fracción `allocation` del presupuesto, como en el bucle en vivo.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if allow is None:
+        allow = np.ones(len(close), dtype=bool)
+    buys, sells = _resolve_positions(close, entry, exit, allow, float(trailing_stop), int(start))
+    buy_price = close[buys]
+    return trade_metrics(buy_price, close[sells], order_quantity(budget, allocation, buy_price, np.nan))
+
+def trade_metrics(buy_price, sell_price, quantity):
+    """Ganancia total, drawdown máximo y Sharpe de una lista de operaciones cerradas."""
+    if not len(sell_price):
+        return {"total_profit": 0, "max_drawdown": 0, "sharpe_ratio": 0}
+    profit = (sell_price - buy_price) * quantity
+    returns = profit / (buy_price * quantity)
+    equity = np.cumsum(profit)
+    peak = np.maximum.accumulate(equity)
+    drawdown = np.divide(peak - equity, peak, out=np.zeros_like(equity), where=peak != 0)
+    return {
+        "total_profit": float(equity[-1]),
+        "max_drawdown": float(max(0, drawdown.max())),
+        "sharpe_ratio": float(np.mean(returns) / np.std(returns)),
+    }
+
+def ml_entry_filter(model, df, entry, workers=ML_INFERENCE_WORKERS):
+    """Puntúa todas las velas en una sola inferencia y filtra las señales de entrada.
+
+    La decisión de la vela i usa la predicción de la vela i-1, igual que
+    consultar el modelo con el histórico df.iloc[:i].
+    """
+    allow = np.zeros(len(df), dtype=bool)
+    signals = np.flatnonzero(entry)
+    signals = signals[signals > 0]
+    if len(signals):
+        scores = predict_scores(model, df, workers=workers)
+        allow[signals] = scores[signals - 1] > 0.5
+    return allow
+
+def prepare_backtest_data(client, symbol, limit=None, start=None, end=None):
+    """Lee velas del histórico local, calcula indicadores y entrena el modelo una sola vez por símbolo.
+
+    El histórico sólo descarga las velas que le faltan; `start`/`end` acotan
+    el rango (timestamps) y `limit` se queda con las últimas velas del rango.
+    """
+    history = get_history_store(symbol, "1H")
+    history.sync(client)
+    close = history.closes(start, end)
+    times = history.column("time", start, end)
+    if limit:
+        close, times = close[-limit:], times[-limit:]
+    df = get_technical_indicators(pd.DataFrame({"close": close}))
+
+    # Modelo de ML: se reutiliza del registro si ya se entrenó con estas velas
+    model = get_model_registry().get_or_train(build_training_data(df))
+    entry, exit = entry_exit_signals(df)
+    entry[:WARMUP_BARS] = False
+    allow = ml_entry_filter(model, df, entry) & sentiment_confirmation(get_sentiment_feed().series(times))
+    return {"close": df["close"].to_numpy(dtype=np.float64), "entry": entry, "exit": exit, "allow": allow}
+
+def backtest(client, symbol, profit_threshold, trailing_stop, data=None, allocation=DEFAULT_ALLOCATION):
     logging.info(f"Backtesting para {symbol} con profit_threshold={profit_threshold}, trailing_stop={trailing_stop}")
-    klines = client.public.get_candles(market=symbol, resolution="1H", limit=500)  # Obtener datos de velas de dYdX
-    close_prices = [float(k['close']) for k in klines['candles']]
-    df = pd.DataFrame(close_prices, columns=["close"])
-    df["RSI"] = talib.RSI(df["close"].values, timeperiod=14)
-    df["EMA12"] = pd.Series(df["close"]).ewm(span=12, adjust=False).mean()
-    df["EMA26"] = pd.Series(df["close"]).ewm(span=26, adjust=False).mean()
-    df["MACD"] = df["EMA12"] - df["EMA26"]
-    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    df["SMA50"] = talib.SMA(df["close"].values, timeperiod=50)
-    df["EMA200"] = talib.EMA(df["close"].values, timeperiod=200)
-    
-    # Entrenar modelo de ML
-    model = train_ml_model(client, symbol)
-    total_profit = 0
-    position = None
-    buy_price = 0
-    quantity = 0
-    max_drawdown = 0
-    peak = -float("inf")
-    returns = []
-
-    for i in range(200, len(df)):
-        if df["RSI"].iloc[i] < 30 and df["MACD"].iloc[i] > df["Signal"].iloc[i] and \
-                df["close"].iloc[i] > df["SMA50"].iloc[i] and df["close"].iloc[i] > df["EMA200"].iloc[i]:
-            if position is None:
-                # Predecir con modelo de ML
-                prediction = predict_with_ml_model(model, df.iloc[:i])
-                if prediction == "buy":
-                    position = "long"
-                    buy_price = df["close"].iloc[i]
-                    quantity = BUDGET * 0.25 / buy_price
-                    logging.info(f"Backtest Compra: Precio={buy_price}, Cantidad={quantity}")
-        elif (df["RSI"].iloc[i] > 70 or df["MACD"].iloc[i] < df["Signal"].iloc[i]) or \
-                (position == "long" and df["close"].iloc[i] < buy_price * (1 - trailing_stop)):
-            if position == "long":
-                sell_price = df["close"].iloc[i]
-                profit = (sell_price - buy_price) * quantity
-                total_profit += profit
-                returns.append(profit / (buy_price * quantity))
-                logging.info(f"Backtest Venta: Precio={sell_price}, Ganancia={profit}")
-                peak = max(peak, total_profit)
-                drawdown = (peak - total_profit) / peak if peak != 0 else 0
-                max_drawdown = max(max_drawdown, drawdown)
-                position = None
-
-    sharpe_ratio = np.mean(returns) / np.std(returns) if returns else 0
-    logging.info(f"Backtesting finalizado para {symbol}: Ganancia total={total_profit}, Max Drawdown={max_drawdown}, Sharpe Ratio={sharpe_ratio}")
-    return {"total_profit": total_profit, "max_drawdown": max_drawdown, "sharpe_ratio": sharpe_ratio}
-
-def optimize_parameters(client, symbol):
-    def objective(profit_threshold, trailing_stop):
-        result = backtest(client, symbol, profit_threshold, trailing_stop)
-        return result["total_profit"]
+    if data is None:
+        data = prepare_backtest_data(client, symbol)
+    started = time.perf_counter()
+    result = simulate_positions(data["close"], data["entry"], data["exit"], trailing_stop, data["allow"],
+                                allocation=allocation)
+    record_throughput(BACKTEST_BARS, BACKTEST_BARS_PER_SECOND, len(data["close"]), time.perf_counter() - started)
+    logging.info(f"Backtesting finalizado para {symbol}: Ganancia total={result['total_profit']}, "
+                 f"Max Drawdown={result['max_drawdown']}, Sharpe Ratio={result['sharpe_ratio']}")
+    return result
+
+# Los workers del pool leen los arrays del símbolo desde memoria compartida
+_worker_shm = None
+_worker_data = None
 
+def _share_data(data):
+    n = len(data["close"])
+    shm = shared_memory.SharedMemory(create=True, size=max(11 * n, 1))
+    np.ndarray(n, dtype=np.float64, buffer=shm.buf)[:] = data["close"]
+    for k, key in enumerate(("entry", "exit", "allow")):
+        np.ndarray(n, dtype=bool, buffer=shm.buf, offset=8 * n + k * n)[:] = data[key]
+    return shm
+
+def _attach_data(name, n):
+    global _worker_shm, _worker_data
+    if _worker_shm is None or _worker_shm.name != name:
+        if _worker_shm is not None:
+            _worker_data = None
+            _worker_shm.close()
+        _worker_shm = shared_memory.SharedMemory(name=name)
+        # El proceso principal es el dueño del segmento; el worker no debe liberarlo al salir
+        resource_tracker.unregister(_worker_shm._name, "shared_memory")
+        _worker_data = {"close": np.ndarray(n, dtype=np.float64, buffer=_worker_shm.buf)}
+        for k, key in enumerate(("entry", "exit", "allow")):
+            _worker_data[key] = np.ndarray(n, dtype=bool, buffer=_worker_shm.buf, offset=8 * n + k * n)
+    return _worker_data
+
+def _evaluate_shared(task):
+    name, n, trailing_stop = task
+    data = _attach_data(name, n)
+    return simulate_positions(data["close"], data["entry"], data["exit"], trailing_stop, data["allow"])["total_profit"]
+
+def evaluate_batch(data, candidates, pool=None):
+    """Evalúa un lote de candidatos (profit_threshold, trailing_stop) sobre datos ya preparados."""
+    candidates = np.atleast_2d(np.asarray(candidates, dtype=np.float64))
+    # El resultado sólo depende del trailing_stop: cada valor distinto se simula una vez
+    trailing_stops, inverse = np.unique(candidates[:, 1], return_inverse=True)
+    started = time.perf_counter()
+    if pool is None or "shm" not in data:
+        profits = [simulate_positions(data["close"], data["entry"], data["exit"], ts, data["allow"])["total_profit"]
+                   for ts in trailing_stops]
+    else:
+        name = data["shm"].name
+        n = len(data["close"])
+        profits = pool.map(_evaluate_shared, [(name, n, ts) for ts in trailing_stops.tolist()])
+    record_throughput(BACKTEST_BARS, BACKTEST_BARS_PER_SECOND, len(data["close"]) * len(trailing_stops),
+                      time.perf_counter() - started)
+    return np.asarray(profits, dtype=np.float64)[inverse]
+
+def _bounds():
+    return np.array([
+        (min(PROFIT_THRESHOLD_RANGE), max(PROFIT_THRESHOLD_RANGE)),
+        (min(TRAILING_STOP_RANGE), max(TRAILING_STOP_RANGE)),
+    ])
+
+def grid_candidates(n):
+    side = max(int(np.ceil(np.sqrt(n))), 1)
+    bounds = _bounds()
+    axes = [np.linspace(low, high, side) for low, high in bounds]
+    return np.array(list(product(*axes)))
+
+def random_candidates(n, seed=42):
+    bounds = _bounds()
+    return np.random.default_rng(seed).uniform(bounds[:, 0], bounds[:, 1], size=(n, 2))
+
+def _search_bayes(data, n_evals, batch_size, pool, seed=42):
+    from bayes_opt import BayesianOptimization, UtilityFunction  # Carga diferida: sólo la usa la búsqueda bayesiana
     optimizer = BayesianOptimization(
-        f=objective,
-        pbounds={
-            "profit_threshold": (min(PROFIT_THRESHOLD_RANGE), max(PROFIT_THRESHOLD_RANGE)),
-            "trailing_stop": (min(TRAILING_STOP_RANGE), max(TRAILING_STOP_RANGE))
-        },
-        random_state=42,
+        f=None,
+        pbounds={"profit_threshold": tuple(_bounds()[0]), "trailing_stop": tuple(_bounds()[1])},
+        random_state=seed,
     )
-    optimizer.maximize(init_points=10, n_iter=30)
-    best_params = optimizer.max["params"]
+    seen = set()
+
+    def register(batch):
+        unique = []
+        for c in map(tuple, batch):
+            if c not in seen:
+                seen.add(c)
+                unique.append(c)
+        if unique:
+            for c, profit in zip(unique, evaluate_batch(data, unique, pool)):
+                optimizer.register(params={"profit_threshold": c[0], "trailing_stop": c[1]}, target=profit)
+        return len(unique)
+
+    done = register(random_candidates(min(batch_size, n_evals), seed))
+    while done < n_evals:
+        # Lote diverso: un candidato por cada nivel de exploración (kappa) de UCB
+        batch = []
+        for kappa in np.geomspace(0.1, 10, min(batch_size, n_evals - done)):
+            point = optimizer.suggest(UtilityFunction(kind="ucb", kappa=kappa, xi=0.0))
+            batch.append((point["profit_threshold"], point["trailing_stop"]))
+        added = register(batch)
+        if not added:
+            break
+        done += added
+    return optimizer.max["params"], optimizer.max["target"]
+
+def search_parameters(data, strategy="bayes", n_evals=40, batch_size=OPTIMIZER_BATCH_SIZE, pool=None):
+    """Búsqueda de parámetros por lotes sobre datos preparados con prepare_backtest_data."""
+    started = time.perf_counter()
+    best_params, best_profit = _search(data, strategy, n_evals, batch_size, pool)
+    record_throughput(OPTIMIZER_EVALUATIONS, OPTIMIZER_EVALUATIONS_PER_SECOND, n_evals, time.perf_counter() - started)
+    return best_params, best_profit
+
+def _search(data, strategy, n_evals, batch_size, pool):
+    if strategy == "bayes":
+        return _search_bayes(data, n_evals, batch_size, pool)
+    if strategy == "grid":
+        candidates = grid_candidates(n_evals)
+    elif strategy == "random":
+        candidates = random_candidates(n_evals)
+    else:
+        raise ValueError(f"Estrategia de optimización desconocida: {strategy}")
+    profits = np.concatenate([evaluate_batch(data, candidates[i:i + batch_size], pool)
+                              for i in range(0, len(candidates), batch_size)])
+    best = int(np.argmax(profits))
+    return {"profit_threshold": candidates[best, 0], "trailing_stop": candidates[best, 1]}, profits[best]
+
+def optimize_parameters(client, symbol, strategy="bayes", n_evals=40, batch_size=OPTIMIZER_BATCH_SIZE,
+                        workers=OPTIMIZER_WORKERS, pool=None, start=None, end=None, data=None):
+    if data is None:
+        data = prepare_backtest_data(client, symbol, start=start, end=end)
+    own_pool = pool is None and workers > 1
+    if own_pool:
+        pool = Pool(workers)
+    if pool is not None:
+        data["shm"] = _share_data(data)
+    try:
+        best_params, best_profit = search_parameters(data, strategy, n_evals, batch_size, pool)
+    finally:
+        if "shm" in data:
+            shm = data.pop("shm")  # `data` puede venir del llamador y reutilizarse
+            shm.close()
+            shm.unlink()
+        if own_pool:
+            pool.close()
+            pool.join()
+    best_params = {key: float(value) for key, value in best_params.items()}
     logging.info(f"Parámetros óptimos para {symbol}: profit_threshold={best_params['profit_threshold']}, trailing_stop={best_params['trailing_stop']}")
     return best_params
+
+def optimize_all_symbols(client, symbols=SYMBOLS, workers=OPTIMIZER_WORKERS, **kwargs):
+    """Optimiza todos los símbolos reutilizando un único pool de procesos."""
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        return {symbol: optimize_parameters(client, symbol, pool=pool, **kwargs) for symbol in symbols}
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
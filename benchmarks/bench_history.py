@@ -0,0 +1,58 @@
+"""Lectura de históricos largos de velas de 1 minuto desde HistoryStore.
+
+Genera años de velas sintéticas en un directorio temporal y mide la escritura
+en bloque, el recorrido completo de una columna y el corte de rangos de tiempo.
+
+    python -m trading_bot.benchmarks.bench_history --years 3
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from trading_bot.history import HistoryStore
+
+MINUTE = 60
+
+def synthetic_rows(start, n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+    times = start + MINUTE * np.arange(n)
+    return list(zip(times.tolist(), close.tolist(), (close * 1.001).tolist(), (close * 0.999).tolist(),
+                    close.tolist(), rng.uniform(1, 10, n).tolist()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--chunk", type=int, default=500_000, help="velas por escritura")
+    parser.add_argument("--slices", type=int, default=1000)
+    args = parser.parse_args()
+    n = int(args.years * 365 * 24 * 60)
+    start = 1_600_000_000 - 1_600_000_000 % MINUTE
+
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore("BTC-USD", "1MIN", root=root)
+        elapsed = 0.0
+        for offset in range(0, n, args.chunk):
+            rows = synthetic_rows(start + offset * MINUTE, min(args.chunk, n - offset), seed=offset)
+            t = time.perf_counter()
+            store.append(rows)
+            elapsed += time.perf_counter() - t
+        print(f"escritura:        {n:,} velas en {elapsed:.2f}s ({n / elapsed:,.0f} velas/s)")
+
+        reopened = HistoryStore("BTC-USD", "1MIN", root=root)
+        t = time.perf_counter()
+        close = reopened.closes()
+        returns = np.diff(np.log(close))
+        scan = time.perf_counter() - t
+        print(f"recorrido:        {len(close):,} cierres en {scan * 1000:.1f} ms ({len(close) / scan:,.0f} velas/s, "
+              f"vol={returns.std():.5f})")
+
+        rng = np.random.default_rng(1)
+        begins = start + MINUTE * rng.integers(0, n - 30 * 24 * 60, args.slices)
+        t = time.perf_counter()
+        total = sum(len(reopened.closes(b, b + 30 * 24 * 3600)) for b in begins.tolist())
+        per_slice = (time.perf_counter() - t) / args.slices
+        print(f"rango de 30 días: {per_slice * 1e6:.1f} µs por corte ({total // args.slices:,} velas, sin copia)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Tiempo de importación en frío de los módulos del bot.
+
+Cada medida se hace en un intérprete nuevo (como tras un despliegue o al
+crear un worker del pool) e indica qué dependencias pesadas se cargaron.
+
+    python -m trading_bot.benchmarks.bench_imports --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "trading_bot.config",
+    "trading_bot.utils",
+    "trading_bot.inference",
+    "trading_bot.backtesting",
+    "trading_bot.trading",
+]
+HEAVY = ["tensorflow", "sklearn", "bayes_opt", "textblob", "requests", "dydx_v4_client", "dydx4", "talib"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return statistics.median(run["seconds"] for run in runs), runs[-1]["heavy"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+    print(f"{'módulo':<28} {'mediana (ms)':>12}  dependencias pesadas cargadas")
+    for module in args.modules:
+        try:
+            seconds, heavy = measure(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<28} {'error':>12}  {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:<28} {seconds * 1000:>12.1f}  {', '.join(heavy) or '-'}")
+
+if __name__ == "__main__":
+    main()
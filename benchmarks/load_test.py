@@ -0,0 +1,64 @@
+"""Prueba de carga del bucle de trading contra el simulador local del exchange.
+
+Arranca el bot completo (AppContext + TradingSupervisor, con WebSocket) sobre
+ExchangeSimulator con los símbolos, la latencia, los errores y el límite de
+peticiones indicados, lo deja operar `--duration` segundos y muestra el
+throughput y las latencias por endpoint que ha visto el simulador.
+
+    python -m trading_bot.benchmarks.load_test --symbols 200 --duration 120 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from trading_bot.app import AppContext
+from trading_bot.simulator import ExchangeSimulator
+from trading_bot.trading import TradingSupervisor
+from trading_bot.config import BUDGET
+
+async def load_test(symbols, duration, simulator, budget=BUDGET):
+    async with AppContext(symbols=symbols, metrics=False, simulator=simulator) as app:
+        if not await app.start():
+            raise RuntimeError("No se pudo arrancar el bot contra el simulador")
+        supervisor = TradingSupervisor(app.exchange, symbols, budget, stream=app.stream, metadata=app.metadata,
+                                       ledger=app.ledger, risk=app.risk)
+        supervisor.start()
+        await asyncio.sleep(duration)
+        await supervisor.shutdown(timeout=5)
+    return simulator.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="peticiones/s que admite el simulador")
+    parser.add_argument("--bars", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="guarda las estadísticas en JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    symbols = [f"SIM{k}-USD" for k in range(args.symbols)]
+    simulator = ExchangeSimulator(symbols, bars=args.bars, seed=args.seed, latency=args.latency, jitter=args.jitter,
+                                  error_rate=args.error_rate, rate_limit=args.rate_limit)
+    output = os.path.abspath(args.output) if args.output else None
+    # Histórico, modelos y registro de transacciones van a un directorio temporal
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            stats = asyncio.run(load_test(symbols, args.duration, simulator))
+        finally:
+            os.chdir(cwd)
+    print(simulator.report())
+    if output:
+        with open(output, "w") as f:
+            json.dump(stats, f, indent=2)
+
+if __name__ == "__main__":
+    main()
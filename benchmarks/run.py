@@ -0,0 +1,224 @@
+"""Suite de rendimiento reproducible sobre datos de mercado sintéticos.
+
+Cada caso se mide con varias repeticiones (tras una de calentamiento) para
+cada tamaño del perfil: número de velas o número de símbolos. Los resultados
+se guardan en JSON y se comparan con los umbrales de thresholds.json (y,
+opcionalmente, con un resultado anterior) para detectar regresiones.
+
+    python -m trading_bot.benchmarks.run --profile quick --output resultados.json
+    python -m trading_bot.benchmarks.run --profile full --baseline anterior.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from trading_bot.benchmarks.synthetic import SyntheticClient, synthetic_candles, synthetic_returns
+
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+PROFILES = {
+    "quick": {"bars": [500, 10_000, 100_000], "symbols": [1, 10, 50]},
+    "full": {"bars": [500, 10_000, 100_000, 1_000_000, 10_000_000], "symbols": [1, 10, 50, 200, 500]},
+}
+
+CASES = {}
+
+def case(name, axis):
+    """Registra un caso: `setup(size, seed)` prepara los datos y devuelve la función que se cronometra."""
+    def register(setup):
+        CASES[name] = (axis, setup)
+        return setup
+    return register
+
+def _backtest_data(n, seed):
+    from trading_bot.backtesting import entry_exit_signals
+    from trading_bot.utils import get_technical_indicators
+    df = get_technical_indicators(pd.DataFrame({"close": synthetic_candles(n, seed)["close"]}))
+    entry, exit = entry_exit_signals(df)
+    return {"close": df["close"].to_numpy(dtype=np.float64), "entry": entry, "exit": exit,
+            "allow": np.ones(n, dtype=bool)}
+
+@case("get_technical_indicators", "bars")
+def _indicators(n, seed):
+    from trading_bot.utils import get_technical_indicators
+    close = synthetic_candles(n, seed)["close"]
+    return lambda: get_technical_indicators(pd.DataFrame({"close": close}))
+
+@case("calculate_var", "bars")
+def _var(n, seed):
+    from trading_bot.utils import calculate_var
+    returns = np.diff(np.log(synthetic_candles(n + 1, seed)["close"]))
+    return lambda: calculate_var(returns)
+
+@case("backtest", "bars")
+def _backtest(n, seed):
+    from trading_bot.backtesting import backtest
+    data = _backtest_data(n, seed)
+    return lambda: backtest(None, "BTC-USD", 0.03, 0.02, data=data)
+
+@case("optimize_parameters", "bars")
+def _optimize(n, seed):
+    # Sólo la búsqueda: la preparación de datos (histórico y modelo) se hace una vez fuera del cronómetro
+    from trading_bot.backtesting import optimize_parameters
+    data = _backtest_data(n, seed)
+    return lambda: optimize_parameters(None, "BTC-USD", strategy="random", n_evals=40, workers=1, data=data)
+
+@case("get_atr", "symbols")
+def _atr(n, seed):
+    from trading_bot.candles import get_candle_store
+    from trading_bot.utils import get_atr
+    symbols = [f"SYN{seed}-{k}-USD" for k in range(n)]
+    client = SyntheticClient(symbols, bars=200, seed=seed)
+
+    def run():
+        for symbol in symbols:
+            get_candle_store(symbol, "1H").clear()  # Cada repetición descarga y procesa las velas de nuevo
+            get_atr(client, symbol)
+    return run
+
+@case("optimize_portfolio", "symbols")
+def _portfolio(n, seed):
+    from trading_bot.utils import optimize_portfolio
+    returns = synthetic_returns(n, 720, seed)
+    return lambda: optimize_portfolio(returns, risk_free_rate=0.0)
+
+@case("optimize_weights", "symbols")
+def _weights(n, seed):
+    # Monte Carlo completo más el ajuste exacto con el límite de peso por activo de la configuración en vivo
+    from trading_bot.portfolio import optimize_weights
+    returns = synthetic_returns(n, 720, seed)
+    return lambda: optimize_weights(returns, max_weight=min(1.0, max(0.1, 2.0 / n)), n_portfolios=200_000,
+                                    seed=seed)
+
+@case("decision_tick", "symbols")
+def _decision_tick(n, seed):
+    # Un ciclo de entrada (buy_crypto) y una evaluación de salida (sell_crypto) por símbolo, todos a la vez
+    from trading_bot.candles import get_candle_store
+    from trading_bot.exchange import ExchangeClient
+    from trading_bot.trading import buy_crypto, sell_crypto
+    symbols = [f"SYN{seed}-{k}-USD" for k in range(n)]
+    client = SyntheticClient(symbols, bars=300, seed=seed)
+
+    async def tick(exchange, symbol):
+        get_candle_store(symbol, "1H").clear()
+        price, quantity = await buy_crypto(exchange, symbol, 1000.0)
+        if not price:
+            price, quantity = float(client.series[symbol]["close"][-1]), 1.0
+        # profit_threshold negativo: la salida se cumple en la primera evaluación
+        await sell_crypto(exchange, symbol, price, quantity, -1.0, 0.02)
+
+    async def run_all():
+        exchange = ExchangeClient(client)
+        try:
+            await asyncio.gather(*(tick(exchange, symbol) for symbol in symbols))
+        finally:
+            await exchange.close()
+    return lambda: asyncio.run(run_all())
+
+def measure(setup, size, repeat, seed):
+    run = setup(size, seed)
+    run()  # Calentamiento: compilación de numba, cachés y carga de módulos
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    median = statistics.median(times)
+    return {"median_seconds": median, "min_seconds": min(times), "per_item_seconds": median / size,
+            "items_per_second": size / median if median > 0 else None, "repeat": repeat}
+
+def run_suite(profile, cases=None, repeat=5, seed=42, max_bars=None, max_symbols=None):
+    sizes = PROFILES[profile]
+    results = []
+    for name in cases or CASES:
+        axis, setup = CASES[name]
+        limit = max_bars if axis == "bars" else max_symbols
+        for size in sizes[axis]:
+            if limit and size > limit:
+                continue
+            result = {"case": name, "axis": axis, "size": size, **measure(setup, size, repeat, seed)}
+            print(f"{name:<26} {axis:>7}={size:<10,} {result['median_seconds'] * 1000:>12.3f} ms "
+                  f"{result['items_per_second'] or 0:>16,.0f} {axis}/s", flush=True)
+            results.append(result)
+    return results
+
+def _key(result):
+    return f"{result['case']}@{result['size']}"
+
+def check(results, thresholds=None, baseline=None, tolerance=0.2):
+    """Lista de regresiones: medianas por encima de su umbral o más de `tolerance` peores que la base."""
+    regressions = []
+    limits = thresholds or {}
+    previous = {_key(r): r["median_seconds"] for r in (baseline or {}).get("results", [])}
+    for result in results:
+        key = _key(result)
+        seconds = result["median_seconds"]
+        if key in limits and seconds > limits[key]:
+            regressions.append(f"{key}: {seconds:.4f}s supera el umbral de {limits[key]:.4f}s")
+        if key in previous and seconds > previous[key] * (1 + tolerance):
+            regressions.append(f"{key}: {seconds:.4f}s frente a {previous[key]:.4f}s de la base "
+                               f"(+{seconds / previous[key] - 1:.0%})")
+    return regressions
+
+def environment():
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__, "numba": numba_version}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--cases", nargs="*", choices=sorted(CASES), help="por defecto, todos")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-bars", type=int, help="omite los tamaños mayores (por memoria)")
+    parser.add_argument("--max-symbols", type=int)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS, help="JSON {\"caso@tamaño\": segundos}; '' para omitir")
+    parser.add_argument("--baseline", help="resultados anteriores con los que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="empeoramiento admitido frente a la base")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    thresholds = baseline = None
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # Histórico, modelos y registro de transacciones van a un directorio temporal
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = run_suite(args.profile, args.cases, args.repeat, args.seed, args.max_bars, args.max_symbols)
+        finally:
+            from trading_bot.journal import get_journal
+            get_journal().close()
+            os.chdir(cwd)
+
+    regressions = check(results, thresholds, baseline, args.tolerance)
+    report = {"profile": args.profile, "seed": args.seed, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "environment": environment(), "results": results, "regressions": regressions}
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {output}")
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Datos de mercado sintéticos y reproducibles (misma semilla, mismos datos) para benchmarks y pruebas."""
+import time
+import numpy as np
+from trading_bot.candles import RESOLUTION_SECONDS, format_candle_time
+from trading_bot.replay import TICK_DTYPE
+
+def synthetic_candles(n, seed=0, interval=3600, end=None, price=30000.0, volatility=0.01):
+    """`n` velas OHLCV (dict de arrays) de un paseo aleatorio log-normal; la última empieza en `end`."""
+    rng = np.random.default_rng(seed)
+    end = time.time() if end is None else end
+    last = int(end // interval) * interval
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[price, close[:-1]]
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n)))
+    return {
+        "time": last - interval * np.arange(n - 1, -1, -1, dtype=np.int64),
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + wick[0]),
+        "low": np.minimum(open_, close) * (1 - wick[1]),
+        "close": close,
+        "volume": rng.lognormal(3, 0.5, n),
+    }
+
+def synthetic_ticks(n, seed=0, start=1_700_000_000.0, step=1.0, price=30000.0, volatility=0.0005):
+    """`n` operaciones (array TICK_DTYPE) separadas de media `step` segundos."""
+    rng = np.random.default_rng(seed)
+    ticks = np.empty(n, dtype=TICK_DTYPE)
+    ticks["time"] = start + np.cumsum(rng.exponential(step, n))
+    ticks["price"] = price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    ticks["size"] = rng.exponential(1.0, n)
+    return ticks
+
+def synthetic_returns(n_symbols, n_bars, seed=0):
+    """Rentabilidades (símbolos x velas) con un factor de mercado común."""
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, n_bars)
+    betas = rng.uniform(0.5, 1.5, n_symbols)
+    drift = rng.uniform(-0.0005, 0.002, n_symbols)
+    return drift[:, None] + betas[:, None] * factor + rng.normal(0, 0.01, (n_symbols, n_bars))
+
+def candle_payload(candles, start=0, end=None):
+    """Velas [start, end) en el formato del indexer (de la más reciente a la más antigua)."""
+    end = len(candles["time"]) if end is None else end
+    return [
+        {"startedAt": format_candle_time(int(candles["time"][i])), "open": str(candles["open"][i]),
+         "high": str(candles["high"][i]), "low": str(candles["low"][i]), "close": str(candles["close"][i]),
+         "baseTokenVolume": str(candles["volume"][i])}
+        for i in range(end - 1, start - 1, -1)
+    ]
+
+class SyntheticClient:
+    """Cliente síncrono con la forma del SDK (client.public / client.private) servido con velas sintéticas.
+
+    Cada símbolo tiene su propia serie (semilla `seed` + posición); el precio
+    y el volumen de 24h salen de las últimas velas. Las órdenes sólo se anotan.
+    """
+
+    def __init__(self, symbols, bars=1000, seed=0, resolution="1H", balance=1_000_000.0):
+        self.interval = RESOLUTION_SECONDS.get(resolution, 3600)
+        self.series = {symbol: synthetic_candles(bars, seed + k, self.interval) for k, symbol in enumerate(symbols)}
+        self.balance = balance
+        self.orders = []
+        self.public = self.private = self
+
+    def get_candles(self, market, resolution=None, limit=100, **kwargs):
+        n = len(self.series[market]["time"])
+        return {"candles": candle_payload(self.series[market], max(n - (limit or n), 0), n)}
+
+    def get_ticker(self, market):
+        return {"ticker": {"price": str(self.series[market]["close"][-1])}}
+
+    def get_24_hr_stats(self, market):
+        day = max(86400 // self.interval, 1)
+        return {"markets": {market: {"volume": str(self.series[market]["volume"][-day:].sum())}}}
+
+    def get_markets(self, market=None):
+        symbols = [market] if market else list(self.series)
+        return {"markets": {symbol: {"tickSize": "0.01", "stepSize": "0.0001"} for symbol in symbols}}
+
+    def get_account(self):
+        return {"account": {"quoteBalance": str(self.balance)}}
+
+    def create_order(self, **kwargs):
+        self.orders.append(kwargs)
+        return {"order": {"id": str(len(self.orders)), **kwargs}}
@@ -0,0 +1,166 @@
+import logging
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from trading_bot.config import CANDLE_CACHE_SIZE
+
+RESOLUTION_SECONDS = {
+    "1MIN": 60, "1M": 60,
+    "5MINS": 300, "5M": 300,
+    "15MINS": 900, "15M": 900,
+    "30MINS": 1800, "30M": 1800,
+    "1HOUR": 3600, "1H": 3600,
+    "4HOURS": 14400, "4H": 14400,
+    "1DAY": 86400, "1D": 86400,
+}
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+def parse_candle_time(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+def format_candle_time(timestamp):
+    """Timestamp en segundos con el formato ISO del indexer (inverso de parse_candle_time)."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+def parse_candles(candles):
+    """Convierte las velas de la API en filas (tiempo, open, high, low, close, volume) ordenadas."""
+    rows = [
+        (parse_candle_time(k["startedAt"]), float(k["open"]), float(k["high"]), float(k["low"]),
+         float(k["close"]), float(k.get("volume", k.get("baseTokenVolume", 0.0))))
+        for k in candles
+    ]
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+class CandleStore:
+    """Velas OHLCV de un (símbolo, resolución) en buffers circulares de NumPy.
+
+    Cada valor se escribe dos veces (en p y p + capacity), de modo que las
+    últimas n velas siempre forman una vista contigua sin copias.
+    """
+
+    def __init__(self, symbol, resolution="1H", capacity=CANDLE_CACHE_SIZE):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.capacity = capacity
+        self.interval = RESOLUTION_SECONDS.get(resolution, 3600)
+        self._time = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(FIELDS), 2 * capacity), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_time(self):
+        if not self._size:
+            return None
+        return int(self._time[self._head - 1 + self.capacity])
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def _write(self, pos, row):
+        for p in (pos, pos + self.capacity):
+            self._time[p] = row[0]
+            self._values[:, p] = row[1:]
+
+    def append(self, row):
+        """Inserta o actualiza una vela; devuelve True si cambió el buffer."""
+        last = self.last_time
+        if last is not None and row[0] < last:
+            return False
+        if last is not None and row[0] == last:
+            self._write((self._head - 1) % self.capacity, row)
+            return True
+        self._write(self._head, row)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def warm_up(self, history):
+        """Carga las últimas velas de un HistoryStore para no pedirlas al indexer al arrancar."""
+        n = min(len(history), self.capacity)
+        if not n:
+            return self
+        self.clear()
+        columns = [history.column(column)[-n:] for column in ("time",) + FIELDS]
+        for row in zip(*columns):
+            self.append(row)
+        return self
+
+    def update(self, candles):
+        """Incorpora velas crudas de la API (en cualquier orden)."""
+        self._append_rows(parse_candles(candles))
+
+    def _append_rows(self, rows):
+        if rows and self._size and rows[0][0] > self.last_time + self.interval:
+            # Hueco respecto a lo que tenemos: la caché ya no es contigua
+            self.clear()
+        for row in rows:
+            self.append(row)
+
+    def missing(self, limit=None, now=None):
+        """Número de velas que hay que pedir para tener `limit` velas al día."""
+        limit = min(limit or self.capacity, self.capacity)
+        if self._size < limit:
+            return limit
+        now = time.time() if now is None else now
+        # +1 para refrescar la vela en curso
+        return min(int((now - self.last_time) // self.interval) + 1, limit)
+
+    def refresh(self, client, limit=None):
+        """Descarga sólo las velas que faltan y las añade al buffer."""
+        count = self.missing(limit)
+        klines = client.public.get_candles(market=self.symbol, resolution=self.resolution, limit=count)
+        self._ingest(klines["candles"], count)
+        return self
+
+    async def arefresh(self, exchange, limit=None):
+        """Como refresh(), a través del ExchangeClient asíncrono."""
+        count = self.missing(limit)
+        klines = await exchange.get_candles(self.symbol, self.resolution, count)
+        self._ingest(klines["candles"], count)
+        return self
+
+    def _ingest(self, candles, count):
+        if count > self._size:
+            # Ventana completa: reconstruir en lugar de mezclar con datos antiguos
+            self.clear()
+        self._append_rows(parse_candles(candles))
+        logging.debug(f"{self.symbol}: {len(candles)} velas {self.resolution} descargadas ({self._size} en caché)")
+
+    def column(self, field, n=None):
+        """Vista de solo lectura de las últimas n velas de un campo."""
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        if field == "time":
+            view = self._time[end - n:end]
+        else:
+            view = self._values[FIELDS.index(field), end - n:end]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def closes(self, n=None):
+        return self.column("close", n)
+
+    def frame(self, n=None):
+        data = {field: self.column(field, n) for field in FIELDS}
+        return pd.DataFrame(data, index=pd.to_datetime(self.column("time", n), unit="s"))
+
+_stores = {}
+
+def get_candle_store(symbol, resolution="1H"):
+    """Devuelve la caché compartida de velas para (símbolo, resolución)."""
+    key = (symbol, resolution)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = CandleStore(symbol, resolution)
+    return store
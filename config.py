@@ -14,7 +14,136 @@ DEFAULT_PROFIT_THRESHOLD = 0.03
 DEFAULT_TRAILING_STOP = 0.02
 PROFIT_THRESHOLD_RANGE = (0.01, 0.1)
 TRAILING_STOP_RANGE = (0.01, 0.1)
+OPTIMIZER_BATCH_SIZE = 8  # Candidatos evaluados por lote
+OPTIMIZER_WORKERS = 1  # Procesos para evaluar cada lote (1 = secuencial)
+ML_EPOCHS = 50  # Épocas de entrenamiento del modelo de entrada
+ML_BATCH_SIZE = 32
+ML_FINE_TUNE_EPOCHS = 5  # Épocas al continuar un modelo cuando sólo hay velas nuevas
+ML_FINE_TUNE_OVERLAP = 200  # Velas ya vistas que se repasan junto a las nuevas al continuar el entrenamiento
+MODEL_REGISTRY_PATH = "modelos"  # Directorio con los modelos entrenados
+MODEL_REGISTRY_MAX_BYTES = 500 * 1024 * 1024  # Tamaño máximo en disco; se borran los menos usados
+ML_INFERENCE_BATCH_SIZE = 1024  # Filas por llamada al modelo en los backtests
+ML_INFERENCE_CHUNK_ROWS = 50000  # Filas por bloque al repartir la inferencia entre hilos
+ML_INFERENCE_WORKERS = 1  # Hilos de inferencia (1 = una sola pasada)
+ML_INFERENCE_DTYPE = "float32"  # Precisión del runtime NumPy (la de Keras es float32)
 REAL_MARKET = False
+MAX_CONCURRENT_SYMBOLS = 20  # Símbolos consultando el exchange a la vez
+ENTRY_RETRY_INTERVAL = 60  # Segundos entre intentos de entrada por símbolo
+ENTRY_VOLUME_FACTOR = 1.2  # Volumen de 24h mínimo frente al volumen medio por vela para entrar
+SHUTDOWN_TIMEOUT = 30  # Segundos para cerrar posiciones abiertas al detener el bot
+
+# Cliente del exchange
+EXCHANGE_MAX_CONNECTIONS = 16  # Conexiones (e hilos para el SDK síncrono) compartidas por todos los símbolos
+EXCHANGE_KEEPALIVE_TIMEOUT = 30  # Segundos que se mantiene abierta una conexión ociosa
+EXCHANGE_TIMEOUTS = {  # Timeout en segundos por endpoint
+    "default": 10,
+    "ticker": 3,
+    "stats": 5,
+    "candles": 10,
+    "markets": 10,
+    "account": 5,
+    "order": 15,
+    "http": 10,
+}
+
+REQUEST_RATE_LIMIT = 10  # Peticiones por segundo al exchange para todos los símbolos juntos
+REQUEST_BURST = 20  # Peticiones que se pueden hacer de golpe antes de esperar
+# Reintentos y circuit breaker
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5  # Segundos; la espera crece como base * 2^intento con jitter
+RETRY_MAX_DELAY = 8
+ORDER_DEADLINE = 15  # Segundos máximos para colocar una orden, reintentos incluidos
+CIRCUIT_FAILURE_THRESHOLD = 5  # Fallos seguidos que abren el circuito de un endpoint
+CIRCUIT_RESET_TIMEOUT = 30  # Segundos con el circuito abierto antes de probar otra vez
+MARKET_METADATA_REFRESH = 3600  # Segundos entre recargas de tick/step de todos los mercados
+BALANCE_RECONCILE_INTERVAL = 60  # Segundos entre conciliaciones del saldo local con el exchange
+
+# Frecuencia de consulta adaptativa
+DEFAULT_POLL_INTERVAL = 5  # Segundos cuando aún no hay precio/ATR
+MIN_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 60
+POLL_REFERENCE_MOVE = 0.002  # Movimiento relativo a vigilar cuando no hay posición abierta
+POLL_SAFETY_FACTOR = 0.25  # Fracción del tiempo esperado hasta alcanzar una salida
+ENTRY_PRIORITY = 100.0  # Prioridad de las peticiones de entrada (las salidas cercanas usan valores menores)
+
+# Métricas de Prometheus (prometheus.yml consulta localhost:8000)
+METRICS_ENABLED = True
+METRICS_PORT = 8000
+
+# Feed de mercado por WebSocket
+STREAMING_ENABLED = True
+STREAM_QUEUE_SIZE = 100  # Actualizaciones pendientes por consumidor antes de descartar las antiguas
+STREAM_RECONNECT_DELAY = 1  # Segundos antes del primer reintento de conexión
+STREAM_MAX_RECONNECT_DELAY = 30
+REST_FALLBACK_INTERVAL = 5  # Segundos entre consultas REST mientras el WebSocket está caído
+
+# Registro de transacciones
+JOURNAL_PATH = "transacciones.csv"
+JOURNAL_FORMAT = "csv"  # "csv" o "parquet" (requiere pyarrow)
+JOURNAL_FLUSH_SIZE = 100  # Filas por escritura
+JOURNAL_FLUSH_INTERVAL = 1.0  # Segundos máximos antes de escribir lo pendiente
+JOURNAL_MAX_BYTES = 50 * 1024 * 1024  # Tamaño a partir del cual se rota el fichero
+JOURNAL_ROTATE_INTERVAL = 24 * 3600  # Antigüedad a partir de la cual se rota el fichero
+
+# Velas OHLCV que se mantienen en memoria por (símbolo, resolución)
+CANDLE_CACHE_SIZE = 1000
+HISTORY_PATH = "historico"  # Directorio del histórico OHLCV en disco
+HISTORY_PAGE_SIZE = 1000  # Velas por petición al rellenar el histórico
+HISTORY_BACKFILL_DAYS = 365  # Días que se descargan la primera vez
+
+# Ticks grabados y replay
+TICKS_PATH = "ticks"  # Directorio de las operaciones grabadas del feed
+TICK_RECORDING_ENABLED = False  # Graba las operaciones del canal v4_trades para el replay
+TICK_FLUSH_SIZE = 1000  # Ticks en memoria antes de escribirlos a disco
+REPLAY_BATCH_SIZE = 1_000_000  # Ticks por lote leído del disco
+REPLAY_ORDER_LATENCY = 0.25  # Segundos entre la decisión y la ejecución simulada
+REPLAY_SLIPPAGE = 0.0005  # Deslizamiento relativo en contra en cada ejecución
+
+# Simulador local del exchange (pruebas de carga sin testnet)
+EXCHANGE_SIMULATOR = False  # True: initialize_client devuelve el simulador en lugar de los clientes de dYdX
+SIMULATOR_BARS = 1000  # Velas sintéticas por símbolo
+SIMULATOR_LATENCY = 0.05  # Segundos de latencia media por petición
+SIMULATOR_JITTER = 0.02  # Variación uniforme (+/-) de la latencia
+SIMULATOR_ERROR_RATE = 0.0  # Probabilidad de que una petición falle
+SIMULATOR_RATE_LIMIT = None  # Peticiones por segundo admitidas (None = sin límite)
+SIMULATOR_BALANCE = 100_000.0  # Saldo inicial de la cuenta simulada
+SIMULATOR_TICK_INTERVAL = 1.0  # Segundos entre movimientos de precio (y mensajes del WebSocket)
+SIMULATOR_VOLATILITY = 0.0002  # Desviación del logaritmo del precio por raíz de segundo
+
+# Reparto de símbolos entre procesos
+SHARD_WORKERS = 1  # Procesos de decisión (1 = todo en el proceso principal)
+SHARD_START_METHOD = "spawn"  # Método de multiprocessing para arrancar los workers
+SHARD_MONITOR_INTERVAL = 5  # Segundos entre comprobaciones de workers caídos
+SHARD_RESPAWN = True  # Sustituye a los workers caídos (si no, sus símbolos pasan a los demás)
+SHARD_PRICE_INTERVAL = 1.0  # Segundos mínimos entre precios enviados al coordinador por símbolo
+
+# Sentimiento de mercado (fuera del camino de las órdenes: sólo se lee el último valor)
+SENTIMENT_ENABLED = True  # Refresca el índice Fear & Greed en segundo plano
+SENTIMENT_TTL = 900  # Segundos que el índice se considera fresco; después se revalida en segundo plano
+SENTIMENT_MAX_AGE = 2 * 86400  # Segundos a partir de los cuales un valor caducado ya no se usa
+SENTIMENT_RETRY_INTERVAL = 60  # Segundos de espera tras una descarga fallida
+SENTIMENT_HISTORY_DAYS = 365  # Días de histórico del índice que se descargan al arrancar (para backtests)
+SENTIMENT_INDEX_WEIGHT = 0.5  # Peso del índice frente a la puntuación de textos del símbolo
+SENTIMENT_MIN_SCORE = -0.6  # Por debajo (en [-1, 1]) no se abren posiciones; None = sin filtro
+SENTIMENT_MEMO_SIZE = 10_000  # Textos cuya puntuación se recuerda (LRU)
+SENTIMENT_BATCH_SIZE = 64  # Textos por tarea del pool de puntuación
+SENTIMENT_WORKERS = 2  # Hilos que puntúan textos
+
+# Cartera: fracción del presupuesto por símbolo
+DEFAULT_ALLOCATION = 0.25  # Fracción usada mientras no haya asignación optimizada
+PORTFOLIO_MAX_WEIGHT = 0.5  # Peso máximo de un activo
+PORTFOLIO_RISK_FREE_RATE = 0.0  # Por vela, en la misma unidad que las rentabilidades
+PORTFOLIO_LOOKBACK = 720  # Velas de 1H para estimar rentabilidades y covarianzas (30 días)
+PORTFOLIO_SAMPLES = 200_000  # Carteras aleatorias evaluadas por el Monte Carlo
+PORTFOLIO_BATCH_SIZE = 50_000
+PORTFOLIO_REBALANCE_INTERVAL = 3600  # Segundos entre recálculos de la asignación
+
+# Riesgo
+RISK_PERCENTAGE = 0.01  # Fracción del presupuesto que se arriesga por operación
+RISK_CONFIDENCE = 0.95  # Nivel de confianza de VaR/CVaR
+RISK_WINDOW = 720  # Rentabilidades por ventana (30 días de velas de 1H)
+RISK_RETURN_INTERVAL = 3600  # Segundos entre rentabilidades en vivo
+RISK_MAX_PORTFOLIO_CVAR = 0.05  # CVaR máximo de la cartera como fracción del presupuesto
 
 # Credenciales de la API de dYdX v4
 DYDX_API_KEY = "your_api_key"
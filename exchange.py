@@ -0,0 +1,131 @@
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from trading_bot.metadata import decimals
+from trading_bot.retry import CircuitBreaker
+from trading_bot.metrics import EXCHANGE_REQUEST_SECONDS, EXCHANGE_COALESCED
+from trading_bot.config import EXCHANGE_MAX_CONNECTIONS, EXCHANGE_KEEPALIVE_TIMEOUT, EXCHANGE_TIMEOUTS
+
+class ExchangeClient:
+    """Fachada asíncrona del exchange para datos de mercado y cuenta.
+
+    Las llamadas idénticas en curso se agrupan en una sola (varios símbolos que
+    piden los mismos mercados o la misma cuenta comparten la respuesta), cada
+    endpoint tiene su propio timeout y circuit breaker, y las conexiones se
+    reutilizan desde un pool.
+    """
+
+    def __init__(self, client, max_connections=EXCHANGE_MAX_CONNECTIONS, timeouts=None, rate_limiter=None):
+        self.client = client
+        # Presupuesto de peticiones compartido; una llamada agrupada consume un solo token
+        self.rate_limiter = rate_limiter
+        self.timeouts = {**EXCHANGE_TIMEOUTS, **(timeouts or {})}
+        self.max_connections = max_connections
+        # Las llamadas del SDK síncrono comparten un número acotado de hilos (y de conexiones)
+        self._executor = ThreadPoolExecutor(max_connections, thread_name_prefix="exchange")
+        self._session = None
+        self._inflight = {}
+        self._breakers = {}
+
+    async def _session_for_http(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=EXCHANGE_KEEPALIVE_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _invoke(self, endpoint, func, args, kwargs):
+        with EXCHANGE_REQUEST_SECONDS.labels(endpoint).time():
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    def breaker(self, endpoint):
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(endpoint)
+        return self._breakers[endpoint]
+
+    async def _guarded(self, endpoint, func, args, kwargs):
+        # Con el circuito abierto se falla al instante en vez de esperar al timeout
+        breaker = self.breaker(endpoint)
+        breaker.before_call()
+        timeout = self.timeouts.get(endpoint, self.timeouts["default"])
+        try:
+            # Sólo gasta token la llamada que se va a enviar; la espera es cola local y no cuenta para el timeout
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            result = await asyncio.wait_for(self._invoke(endpoint, func, args, kwargs), timeout)
+        except asyncio.CancelledError:
+            # Sin esto una prueba cancelada (plazo de retry_async, apagado) dejaría el circuito abierto para siempre
+            breaker.record_cancelled()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
+
+    async def call(self, endpoint, func, *args, coalesce=True, **kwargs):
+        """Ejecuta `func` con el timeout de `endpoint`, compartiendo la llamada si ya hay una idéntica en curso."""
+        if not coalesce:
+            return await self._guarded(endpoint, func, args, kwargs)
+        key = (endpoint, func, args, tuple(sorted(kwargs.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._guarded(endpoint, func, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            EXCHANGE_COALESCED.labels(endpoint).inc()
+        # shield: si un llamador se cancela, la llamada compartida sigue para los demás
+        return await asyncio.shield(task)
+
+    async def get_markets(self, symbol=None):
+        if symbol is None:
+            return await self.call("markets", self.client.public.get_markets)
+        return await self.call("markets", self.client.public.get_markets, market=symbol)
+
+    async def get_precision(self, symbol):
+        """Decimales de (cantidad, precio) a partir del step y tick del mercado."""
+        market = (await self.get_markets(symbol))['markets'][symbol]
+        return decimals(market['stepSize']), decimals(market['tickSize'])
+
+    async def get_price(self, symbol):
+        ticker = await self.call("ticker", self.client.public.get_ticker, market=symbol)
+        return float(ticker['ticker']['price'])
+
+    async def get_volume(self, symbol):
+        volume = await self.call("stats", self.client.public.get_24_hr_stats, market=symbol)
+        return float(volume['markets'][symbol]['volume'])
+
+    async def get_candles(self, symbol, resolution="1H", limit=100):
+        return await self.call("candles", self.client.public.get_candles, market=symbol, resolution=resolution,
+                               limit=limit)
+
+    async def get_account(self):
+        return await self.call("account", self.client.private.get_account)
+
+    async def get_balance(self):
+        account = await self.get_account()
+        return float(account['account']['quoteBalance'])
+
+    async def create_order(self, **kwargs):
+        # Las órdenes nunca se agrupan: dos órdenes iguales son dos órdenes
+        return await self.call("order", self.client.private.create_order, coalesce=False, **kwargs)
+
+    async def _fetch_json(self, url):
+        session = await self._session_for_http()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_json(self, url, endpoint="http"):
+        return await self.call(endpoint, self._fetch_json, url)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._executor.shutdown(wait=False)
+        logging.info("Cliente del exchange cerrado")
@@ -0,0 +1,171 @@
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from trading_bot.candles import FIELDS, RESOLUTION_SECONDS, parse_candles, format_candle_time
+from trading_bot.config import HISTORY_PATH, HISTORY_PAGE_SIZE, HISTORY_BACKFILL_DAYS
+
+COLUMNS = ("time",) + FIELDS
+DTYPES = {"time": np.int64, **{field: np.float64 for field in FIELDS}}
+
+def _dedupe(rows):
+    """Filas ordenadas por tiempo, quedándose con la última versión de cada vela."""
+    return sorted({row[0]: row for row in rows}.values(), key=lambda row: row[0])
+
+class HistoryStore:
+    """Histórico OHLCV en disco de un (símbolo, resolución), un fichero binario por columna.
+
+    Los ficheros sólo crecen por el final y se leen con np.memmap: column()
+    devuelve vistas de un rango de tiempo sin copiar, aunque el histórico
+    ocupe años de velas de 1 minuto.
+    """
+
+    def __init__(self, symbol, resolution="1H", root=HISTORY_PATH):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.interval = RESOLUTION_SECONDS.get(resolution, 3600)
+        self.path = os.path.join(root, symbol, resolution)
+        os.makedirs(self.path, exist_ok=True)
+        self._maps = {}
+
+    def _file(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def __len__(self):
+        # El fichero de tiempos se escribe el último: su tamaño marca las filas completas
+        path = self._file("time")
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _map(self, column):
+        n = len(self)
+        view = self._maps.get(column)
+        if view is None or len(view) != n:
+            if n:
+                view = np.memmap(self._file(column), dtype=DTYPES[column], mode="r", shape=(n,))
+            else:
+                view = np.empty(0, dtype=DTYPES[column])
+            self._maps[column] = view
+        return view
+
+    @property
+    def first_time(self):
+        times = self._map("time")
+        return int(times[0]) if len(times) else None
+
+    @property
+    def last_time(self):
+        times = self._map("time")
+        return int(times[-1]) if len(times) else None
+
+    def append(self, rows):
+        """Añade filas (tiempo, open, high, low, close, volume) al final; devuelve cuántas son nuevas.
+
+        La vela con el mismo tiempo que la última guardada (la vela en curso)
+        se sobrescribe; las anteriores se ignoran.
+        """
+        rows = _dedupe(rows)
+        last = self.last_time
+        if last is not None:
+            if rows and rows[0][0] <= last:
+                current = [row for row in rows if row[0] == last]
+                if current:
+                    self._overwrite_last(current[-1])
+                rows = [row for row in rows if row[0] > last]
+        if not rows:
+            return 0
+        n = len(self)
+        values = np.array(rows, dtype=np.float64)
+        for k, column in reversed(list(enumerate(COLUMNS))):
+            path = self._file(column)
+            if os.path.exists(path) and os.path.getsize(path) > 8 * n:
+                os.truncate(path, 8 * n)  # Restos de una escritura interrumpida
+            data = np.array([row[0] for row in rows], dtype=np.int64) if column == "time" else values[:, k]
+            with open(path, "ab") as f:
+                f.write(np.ascontiguousarray(data, dtype=DTYPES[column]).tobytes())
+        return len(rows)
+
+    def _overwrite_last(self, row):
+        n = len(self)
+        for k, column in enumerate(FIELDS, start=1):
+            view = np.memmap(self._file(column), dtype=np.float64, mode="r+", shape=(n,))
+            view[-1] = row[k]
+            view.flush()
+
+    def _rewrite(self, rows):
+        """Sustituye el histórico completo (sólo al añadir velas anteriores a la primera guardada)."""
+        existing = list(zip(*(self._map(column).tolist() for column in COLUMNS)))
+        rows = _dedupe(rows + existing)
+        self._maps = {}
+        for column in COLUMNS:
+            if os.path.exists(self._file(column)):
+                os.remove(self._file(column))
+        self.append(rows)
+
+    def range(self, start=None, end=None):
+        """Índices [i, j) de las velas con start <= tiempo < end."""
+        times = self._map("time")
+        i = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        j = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+        return i, j
+
+    def column(self, field, start=None, end=None):
+        """Vista de solo lectura (sin copia) de un campo entre start y end (timestamps)."""
+        i, j = self.range(start, end)
+        return self._map(field)[i:j]
+
+    def closes(self, start=None, end=None):
+        return self.column("close", start, end)
+
+    def frame(self, start=None, end=None):
+        data = {field: self.column(field, start, end) for field in FIELDS}
+        return pd.DataFrame(data, index=pd.to_datetime(self.column("time", start, end), unit="s"))
+
+    def _fetch(self, client, start, end, page):
+        """Descarga velas entre start y end paginando hacia atrás desde end."""
+        rows = []
+        to = end
+        while to > start:
+            candles = client.public.get_candles(market=self.symbol, resolution=self.resolution,
+                                                from_iso=format_candle_time(start), to_iso=format_candle_time(to),
+                                                limit=page)["candles"]
+            if not candles:
+                break
+            batch = parse_candles(candles)
+            rows.extend(batch)
+            if len(candles) < page or batch[0][0] >= to:
+                break
+            to = batch[0][0]
+        return [row for row in rows if row[0] >= start]
+
+    def backfill(self, client, start, end=None, page=HISTORY_PAGE_SIZE):
+        """Descarga en bloque el rango [start, end) que aún no esté guardado."""
+        end = time.time() if end is None else end
+        added = 0
+        first, last = self.first_time, self.last_time
+        if first is not None and start < first:
+            older = self._fetch(client, start, first, page)
+            if older:
+                self._rewrite(older)
+                added += len(older)
+        from_time = start if last is None else max(start, last)
+        if from_time < end:
+            added += self.append(self._fetch(client, from_time, end, page))
+        logging.info(f"{self.symbol}: {added} velas {self.resolution} añadidas al histórico ({len(self)} en total)")
+        return added
+
+    def sync(self, client, days=HISTORY_BACKFILL_DAYS):
+        """Rellena `days` días si el histórico está vacío; si no, sólo descarga las velas nuevas."""
+        if not len(self):
+            return self.backfill(client, time.time() - days * 86400)
+        return self.backfill(client, self.last_time)
+
+_stores = {}
+
+def get_history_store(symbol, resolution="1H"):
+    """Devuelve el histórico en disco compartido para (símbolo, resolución)."""
+    key = (symbol, resolution)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = HistoryStore(symbol, resolution)
+    return store
@@ -0,0 +1,205 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+class EMA:
+    """Media exponencial incremental.
+
+    seed="first" replica pandas ewm(adjust=False) (arranca con el primer valor);
+    seed="sma" replica talib.EMA (NaN hasta `period` valores, arranca con su media).
+    """
+
+    def __init__(self, period, seed="first"):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.value = math.nan
+        self._count = 0
+        self._sum = 0.0
+
+    def _next(self, x):
+        if self._count >= self.period or (self.seed == "first" and self._count):
+            return self.alpha * x + (1 - self.alpha) * self.value, self._sum
+        if self.seed == "first":
+            return x, 0.0
+        total = self._sum + x
+        if self._count + 1 == self.period:
+            return total / self.period, total
+        return math.nan, total
+
+    def update(self, x):
+        self.value, self._sum = self._next(x)
+        self._count += 1
+        return self.value
+
+    def peek(self, x):
+        return self._next(x)[0]
+
+class SMA:
+    """Media simple incremental (NaN hasta tener `period` valores, como talib.SMA)."""
+
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.value = math.nan
+        self._window = deque(maxlen=self.period)
+        self._sum = 0.0
+
+    def _next(self, x):
+        total = self._sum + x
+        if len(self._window) == self.period:
+            total -= self._window[0]
+            return total / self.period, total
+        if len(self._window) + 1 == self.period:
+            return total / self.period, total
+        return math.nan, total
+
+    def update(self, x):
+        self.value, self._sum = self._next(x)
+        self._window.append(x)
+        return self.value
+
+    def peek(self, x):
+        return self._next(x)[0]
+
+class RSI:
+    """RSI de Wilder incremental con el mismo arranque que talib.RSI."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.value = math.nan
+        self._prev = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def _next(self, x):
+        if self._prev is None:
+            return math.nan, 0.0, 0.0
+        change = x - self._prev
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self._count < self.period:
+            gain, loss = self._gain + gain, self._loss + loss
+            if self._count + 1 < self.period:
+                return math.nan, gain, loss
+            gain, loss = gain / self.period, loss / self.period
+        else:
+            gain = (self._gain * (self.period - 1) + gain) / self.period
+            loss = (self._loss * (self.period - 1) + loss) / self.period
+        total = gain + loss
+        return (100 * gain / total if total else 0.0), gain, loss
+
+    def update(self, x):
+        self.value, self._gain, self._loss = self._next(x)
+        if self._prev is not None:
+            self._count += 1
+        self._prev = x
+        return self.value
+
+    def peek(self, x):
+        return self._next(x)[0]
+
+COLUMNS = ("RSI", "EMA12", "EMA26", "MACD", "Signal", "SMA50", "EMA200")
+
+class IndicatorEngine:
+    """Indicadores técnicos actualizados en O(1) por vela o tick."""
+
+    def __init__(self):
+        self.rsi = RSI(14)
+        self.ema12 = EMA(12)
+        self.ema26 = EMA(26)
+        self.signal = EMA(9)
+        self.sma50 = SMA(50)
+        self.ema200 = EMA(200, seed="sma")
+        self.last_time = None
+
+    def reset(self):
+        for indicator in (self.rsi, self.ema12, self.ema26, self.signal, self.sma50, self.ema200):
+            indicator.reset()
+        self.last_time = None
+
+    def _values(self, rsi, ema12, ema26, signal_of, sma50, ema200):
+        macd = ema12 - ema26
+        return {"RSI": rsi, "EMA12": ema12, "EMA26": ema26, "MACD": macd, "Signal": signal_of(macd),
+                "SMA50": sma50, "EMA200": ema200}
+
+    def update(self, close):
+        """Incorpora una vela cerrada y devuelve los indicadores actualizados."""
+        return self._values(self.rsi.update(close), self.ema12.update(close), self.ema26.update(close),
+                            self.signal.update, self.sma50.update(close), self.ema200.update(close))
+
+    def peek(self, close):
+        """Indicadores si `close` fuese la siguiente vela, sin modificar el estado (vela en curso)."""
+        return self._values(self.rsi.peek(close), self.ema12.peek(close), self.ema26.peek(close),
+                            self.signal.peek, self.sma50.peek(close), self.ema200.peek(close))
+
+    def sync(self, store):
+        """Avanza con las velas cerradas nuevas de un CandleStore y evalúa la vela en curso."""
+        times = store.column("time")
+        closes = store.closes()
+        if not len(closes):
+            return None
+        if self.last_time is not None and times[0] > self.last_time + store.interval:
+            # La caché ya no solapa con lo procesado: se vuelve a calentar desde cero
+            self.reset()
+        start = 0 if self.last_time is None else int(np.searchsorted(times, self.last_time, side="right"))
+        for i in range(start, len(closes) - 1):
+            self.update(float(closes[i]))
+            self.last_time = int(times[i])
+        return self.peek(float(closes[-1]))
+
+def _recursive_mean(seed, values, alpha):
+    return pd.Series(np.concatenate(([seed], values))).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+def _talib_ema(close, period):
+    out = np.full(len(close), np.nan)
+    if len(close) >= period:
+        out[period - 1:] = _recursive_mean(close[:period].mean(), close[period:], 2.0 / (period + 1))
+    return out
+
+def _talib_rsi(close, period=14):
+    out = np.full(len(close), np.nan)
+    if len(close) > period:
+        change = np.diff(close)
+        gains, losses = np.clip(change, 0, None), np.clip(-change, 0, None)
+        gain = _recursive_mean(gains[:period].mean(), gains[period:], 1.0 / period)
+        loss = _recursive_mean(losses[:period].mean(), losses[period:], 1.0 / period)
+        total = gain + loss
+        out[period:] = np.divide(100 * gain, total, out=np.zeros_like(total), where=total != 0)
+    return out
+
+def compute_indicators(close):
+    """Modo por lotes: las mismas columnas que IndicatorEngine, vectorizadas sobre todo el histórico."""
+    close = np.asarray(close, dtype=np.float64)
+    series = pd.Series(close)
+    ema12 = series.ewm(span=12, adjust=False).mean().to_numpy()
+    ema26 = series.ewm(span=26, adjust=False).mean().to_numpy()
+    macd = ema12 - ema26
+    return {
+        "RSI": _talib_rsi(close, 14),
+        "EMA12": ema12,
+        "EMA26": ema26,
+        "MACD": macd,
+        "Signal": pd.Series(macd).ewm(span=9, adjust=False).mean().to_numpy(),
+        "SMA50": series.rolling(50).mean().to_numpy(),
+        "EMA200": _talib_ema(close, 200),
+    }
+
+_engines = {}
+
+def get_indicator_engine(symbol, resolution="1H"):
+    """Devuelve el motor de indicadores compartido para (símbolo, resolución)."""
+    key = (symbol, resolution)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = IndicatorEngine()
+    return engine
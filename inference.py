@@ -0,0 +1,84 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from trading_bot.config import ML_INFERENCE_BATCH_SIZE, ML_INFERENCE_CHUNK_ROWS, ML_INFERENCE_WORKERS, \
+    ML_INFERENCE_DTYPE
+
+# Este módulo no importa TensorFlow: el proceso de trading sólo necesita NumPy para puntuar
+
+def _sigmoid(x):
+    # Forma estable para valores muy negativos
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1 / (1 + np.exp(-x[positive]))
+    exp = np.exp(x[~positive])
+    out[~positive] = exp / (1 + exp)
+    return out
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+class DenseModel:
+    """Red densa exportada con export_model, evaluada con productos de matrices de NumPy.
+
+    Expone predict() con la misma firma que Keras para poder usarse en su lugar.
+    """
+
+    def __init__(self, weights, biases, activations, dtype=ML_INFERENCE_DTYPE):
+        unknown = set(activations) - set(ACTIVATIONS)
+        if unknown:
+            raise ValueError(f"Activaciones no soportadas: {sorted(unknown)}")
+        self.dtype = np.dtype(dtype)
+        self.weights = [np.ascontiguousarray(w, dtype=self.dtype) for w in weights]
+        self.biases = [np.asarray(b, dtype=self.dtype) for b in biases]
+        self.activations = list(activations)
+
+    def predict(self, X, batch_size=ML_INFERENCE_BATCH_SIZE, verbose=0):
+        X = np.asarray(X, dtype=self.dtype)
+        batch_size = batch_size or len(X)
+        out = np.empty((len(X), self.weights[-1].shape[1]), dtype=self.dtype)
+        for start in range(0, len(X), batch_size):
+            h = X[start:start + batch_size]
+            for w, b, activation in zip(self.weights, self.biases, self.activations):
+                h = ACTIVATIONS[activation](h @ w + b)
+            out[start:start + batch_size] = h
+        return out
+
+def export_model(model, path):
+    """Guarda los pesos y activaciones de un modelo Keras secuencial de capas densas en un .npz."""
+    arrays = {}
+    activations = []
+    for k, layer in enumerate(layer for layer in model.layers if layer.get_weights()):
+        weights, bias = layer.get_weights()
+        arrays[f"w{k}"] = weights
+        arrays[f"b{k}"] = bias
+        activations.append(layer.get_config().get("activation", "linear"))
+    np.savez_compressed(path, activations=np.array(activations), **arrays)
+
+def load_model(path, dtype=ML_INFERENCE_DTYPE):
+    with np.load(path) as f:
+        activations = [str(a) for a in f["activations"]]
+        layers = range(len(activations))
+        return DenseModel([f[f"w{k}"] for k in layers], [f[f"b{k}"] for k in layers], activations, dtype)
+
+def _predict_chunk(model, X, batch_size):
+    return np.asarray(model.predict(X, batch_size=batch_size, verbose=0), dtype=np.float64).reshape(-1)
+
+def predict_scores(model, data, batch_size=ML_INFERENCE_BATCH_SIZE, workers=ML_INFERENCE_WORKERS,
+                   chunk_rows=ML_INFERENCE_CHUNK_ROWS):
+    """Probabilidad de "buy" para todas las filas en una sola pasada de inferencia.
+
+    Con `workers` > 1 y más de `chunk_rows` filas, los bloques se infieren en
+    un pool de hilos y se concatenan en orden.
+    """
+    X = data.drop(columns=["target"], errors="ignore").to_numpy(dtype=np.float32)
+    if not len(X):
+        return np.empty(0, dtype=np.float64)
+    if workers <= 1 or len(X) <= chunk_rows:
+        return _predict_chunk(model, X, batch_size)
+    chunks = [X[i:i + chunk_rows] for i in range(0, len(X), chunk_rows)]
+    with ThreadPoolExecutor(workers, thread_name_prefix="ml-inference") as pool:
+        return np.concatenate(list(pool.map(lambda chunk: _predict_chunk(model, chunk, batch_size), chunks)))
@@ -0,0 +1,217 @@
+import csv
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+from trading_bot.metrics import JOURNAL_FLUSH_SECONDS
+from trading_bot.config import JOURNAL_PATH, JOURNAL_FORMAT, JOURNAL_FLUSH_SIZE, JOURNAL_FLUSH_INTERVAL, \
+    JOURNAL_MAX_BYTES, JOURNAL_ROTATE_INTERVAL
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pa = None
+    pq = None
+
+COLUMNS = ["Fecha", "Acción", "Símbolo", "Precio", "Cambio %", "Cantidad", "Saldo Restante"]
+# Cabecera de los registros anteriores al registro en segundo plano, sin fecha
+LEGACY_COLUMNS = COLUMNS[1:]
+
+class TransactionJournal:
+    """Registro de transacciones sólo de anexado con escritura en segundo plano.
+
+    record() sólo encola la fila; un hilo escribe por lotes cada `flush_size`
+    filas o `flush_interval` segundos y rota el fichero por tamaño o antigüedad.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, fmt=JOURNAL_FORMAT, flush_size=JOURNAL_FLUSH_SIZE,
+                 flush_interval=JOURNAL_FLUSH_INTERVAL, max_bytes=JOURNAL_MAX_BYTES,
+                 rotate_interval=JOURNAL_ROTATE_INTERVAL):
+        if fmt == "parquet" and pq is None:
+            raise ImportError("pyarrow es necesario para guardar el registro en formato Parquet")
+        self.path = path
+        self.fmt = fmt
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._writer = None
+        self._segment = None
+        self._opened_at = None
+        self._flushed = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="transaction-journal", daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, action, symbol, price, change, quantity, remaining_balance):
+        """Encola una transacción sin bloquear al llamador."""
+        self._queue.put((time.time(), action, symbol, float(price), float(change), float(quantity),
+                         float(remaining_balance)))
+
+    def flush(self, timeout=5):
+        """Fuerza la escritura de lo encolado y espera a que termine."""
+        if self._thread is None:
+            return
+        self._flushed.clear()
+        self._queue.put(self._flushed)
+        self._flushed.wait(timeout)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._close_segment()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = False
+            if isinstance(item, tuple):
+                batch.append(item)
+                if len(batch) < self.flush_size:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def _write(self, rows):
+        try:
+            if self._should_rotate():
+                self._rotate()
+            with JOURNAL_FLUSH_SECONDS.time():
+                if self.fmt == "parquet":
+                    self._write_parquet(rows)
+                else:
+                    self._write_csv(rows)
+        except Exception as e:
+            logging.error(f"Error al escribir el registro de transacciones: {e}")
+
+    def _write_csv(self, rows):
+        if self._writer is None:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            if not new_file and _csv_header(self.path) != COLUMNS:
+                # Un registro con otra cabecera (p. ej. sin "Fecha") se aparta como segmento en vez de mezclar filas
+                os.replace(self.path, _segment_path(self.path, "csv"))
+                new_file = True
+            self._writer = open(self.path, mode="a", newline="")
+            self._segment = self.path
+            self._opened_at = time.time()
+            if new_file:
+                csv.writer(self._writer).writerow(COLUMNS)
+        csv.writer(self._writer).writerows(rows)
+        self._writer.flush()
+
+    def _write_parquet(self, rows):
+        table = pa.Table.from_pylist([dict(zip(COLUMNS, row)) for row in rows])
+        if self._writer is None:
+            self._segment = _segment_path(self.path, "parquet")
+            self._writer = pq.ParquetWriter(self._segment, table.schema)
+            self._opened_at = time.time()
+        self._writer.write_table(table)
+
+    def _should_rotate(self):
+        if self._writer is None:
+            return False
+        too_old = time.time() - self._opened_at >= self.rotate_interval
+        return too_old or os.path.getsize(self._segment) >= self.max_bytes
+
+    def _close_segment(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _rotate(self):
+        self._close_segment()
+        if self.fmt == "csv":
+            os.replace(self.path, _segment_path(self.path, "csv"))
+        logging.info(f"Registro de transacciones rotado: {self._segment}")
+
+def _segment_path(path, ext):
+    stem = os.path.splitext(path)[0]
+    return f"{stem}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.{ext}"
+
+def _csv_header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+def _journal_segments(path=JOURNAL_PATH):
+    """Ficheros del registro: `path` y sus segmentos rotados `<stem>-<fecha>.{csv,parquet}`, en orden."""
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    pattern = re.compile(rf"{re.escape(stem)}(-\d{{8}}T\d{{12}})?\.(csv|parquet)")
+    try:
+        names = os.listdir(directory or ".")
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.join(directory, n) for n in names if pattern.fullmatch(n))
+
+def _parquet_closed(path):
+    """True si el segmento ya tiene el pie de Parquet: el que el writer tiene abierto aún no lo ha escrito."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < 8:
+            return False
+        f.seek(-4, os.SEEK_END)
+        return f.read(4) == b"PAR1"
+
+def read_journal(path=JOURNAL_PATH, start=None, end=None):
+    """Carga todos los segmentos (CSV y Parquet) del registro en un DataFrame ordenado por fecha.
+
+    Las filas de registros antiguos sin "Fecha" quedan con fecha vacía al
+    principio, y los filtros `start`/`end` las descartan. El segmento Parquet
+    que se está escribiendo no se lee hasta que se rota o se cierra el registro.
+    """
+    frames = []
+    for name in _journal_segments(path):
+        if name.endswith(".parquet") and pq is not None:
+            if not _parquet_closed(name):
+                continue
+            frames.append(pq.read_table(name).to_pandas())
+        elif name.endswith(".csv"):
+            frame = pd.read_csv(name, engine="pyarrow" if pa is not None else "c")
+            if list(frame.columns) == LEGACY_COLUMNS:
+                frame.insert(0, "Fecha", float("nan"))
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values("Fecha", kind="stable", na_position="first", ignore_index=True)
+    if start is not None:
+        df = df[df["Fecha"] >= start]
+    if end is not None:
+        df = df[df["Fecha"] < end]
+    return df.reset_index(drop=True)
+
+_journal = None
+
+def set_journal(journal):
+    """Sustituye el registro compartido del proceso (p. ej. por uno que reenvía las filas a otro proceso)."""
+    global _journal
+    _journal = journal
+
+def get_journal():
+    """Devuelve el registro compartido del proceso, arrancándolo en el primer uso."""
+    global _journal
+    if _journal is None:
+        _journal = TransactionJournal().start()
+    return _journal
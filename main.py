@@ -3,19 +3,9 @@ import sys
 import logging
 import time
 import pandas as pd
-from dydx4 import Client
-from dydx4.constants import MARKET_BTC_USD, MARKET_ETH_USD, ORDER_SIDE_BUY, ORDER_SIDE_SELL
-from dydx4.helpers.request_helpers import generate_now_iso
-from dydx_v4_client import NodeClient, QueryNodeClient, IndexerClient, FaucetClient
-from dydx_v4_client.network import secure_channel, TESTNET, TESTNET_FAUCET
-from dotenv import load_dotenv
 import asyncio
-
-# Cargar variables de entorno
-load_dotenv()
-
-# Configuración del log
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from trading_bot.exchange import ExchangeClient
+from trading_bot.scheduler import TokenBucket
 
 # Configuración
 SYMBOLS = ['BTC-USD']  # dYdX utiliza diferentes símbolos
@@ -23,20 +13,31 @@ BUDGET = 1000
 DEFAULT_PROFIT_THRESHOLD = 0.03
 DEFAULT_TRAILING_STOP = 0.02
 REAL_MARKET = False  # Cambiar a True para operar en el mercado real
-DYDX_API_KEY = os.getenv('DYDX_API_KEY')
-DYDX_API_SECRET = os.getenv('DYDX_API_SECRET')
-DYDX_API_PASSPHRASE = os.getenv('DYDX_API_PASSPHRASE')
 DYDX_API_HOST = 'https://api.dydx.exchange'
 
-# Inicialización del cliente de dYdX
-client = Client(
-    host=DYDX_API_HOST,
-    api_key=DYDX_API_KEY,
-    api_secret=DYDX_API_SECRET,
-    passphrase=DYDX_API_PASSPHRASE
-)
+_exchange = None
+
+def get_exchange():
+    """Crea el cliente de dYdX la primera vez que se usa (no al importar el módulo)."""
+    global _exchange
+    if _exchange is None:
+        from dotenv import load_dotenv
+        from dydx4 import Client
+
+        # Cargar variables de entorno
+        load_dotenv()
+        client = Client(
+            host=DYDX_API_HOST,
+            api_key=os.getenv('DYDX_API_KEY'),
+            api_secret=os.getenv('DYDX_API_SECRET'),
+            passphrase=os.getenv('DYDX_API_PASSPHRASE')
+        )
+        _exchange = ExchangeClient(client, rate_limiter=TokenBucket())
+    return _exchange
 
 async def initialize_clients():
+    from dydx_v4_client import NodeClient, IndexerClient, FaucetClient
+    from dydx_v4_client.network import secure_channel, TESTNET, TESTNET_FAUCET
     try:
         node = await NodeClient(secure_channel("test-dydx-grpc.kingnodes.com"))
         indexer = IndexerClient(TESTNET.rest_indexer)
@@ -49,7 +50,9 @@ async def initialize_clients():
 
 async def get_historical_data(symbol, interval='1h', limit=100):
     """Obtiene datos históricos de una criptomoneda."""
-    candles = await client.public.get_candles(
+    from dydx4.helpers.request_helpers import generate_now_iso
+    exchange = get_exchange()
+    candles = await exchange.call("candles", exchange.client.public.get_candles,
         market=symbol,
         resolution=interval,
         from_iso=generate_now_iso(),
@@ -61,7 +64,7 @@ async def get_historical_data(symbol, interval='1h', limit=100):
 async def place_order(market, side, size, price):
     """Coloca una orden en dYdX."""
     if REAL_MARKET:
-        await client.private.create_order(
+        await get_exchange().create_order(
             market=market,
             side=side,
             size=size,
@@ -74,6 +77,10 @@ async def place_order(market, side, size, price):
         logging.info(f"Simulación de orden {side}: {size} {market} a {price}")
 
 async def main():
+    from dydx4.constants import ORDER_SIDE_BUY
+
+    # Configuración del log
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     node, indexer, faucet = await initialize_clients()
     if node and indexer and faucet:
         # Ejemplo de obtención de datos históricos
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from decimal import Decimal
+from trading_bot.config import MARKET_METADATA_REFRESH, BALANCE_RECONCILE_INTERVAL
+
+def decimals(step):
+    """Número de decimales de un tamaño de tick/step ("0.001" -> 3)."""
+    return max(0, -Decimal(str(step)).normalize().as_tuple().exponent)
+
+class MarketMetadata:
+    """Tamaños de tick y step de todos los mercados, cargados en una sola petición y refrescados periódicamente."""
+
+    def __init__(self, exchange, refresh_interval=MARKET_METADATA_REFRESH):
+        self.exchange = exchange
+        self.refresh_interval = refresh_interval
+        self._precision = {}
+        self._min_size = {}
+
+    async def load(self):
+        markets = await self.exchange.get_markets()
+        self._precision = {
+            symbol: (decimals(market['stepSize']), decimals(market['tickSize']))
+            for symbol, market in markets['markets'].items()
+        }
+        self._min_size = {symbol: float(market.get('minOrderSize', 0)) for symbol, market in markets['markets'].items()}
+        logging.info(f"Metadatos cargados para {len(self._precision)} mercados")
+
+    def precision(self, symbol):
+        """Decimales de (cantidad, precio) para `symbol`, sin consultar al exchange."""
+        return self._precision[symbol]
+
+    def min_order_size(self, symbol):
+        """Cantidad mínima de una orden en `symbol` (0 si el exchange no la publica)."""
+        return self._min_size.get(symbol, 0.0)
+
+    def __contains__(self, symbol):
+        return symbol in self._precision
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                # Se conservan los metadatos anteriores hasta el próximo intento
+                logging.error(f"Error al refrescar los metadatos de mercado: {e}")
+
+class BalanceLedger:
+    """Saldo en moneda de cotización mantenido a partir de nuestras propias operaciones.
+
+    Se concilia con el exchange cada `reconcile_interval` segundos; entre
+    conciliaciones ninguna decisión necesita consultar la cuenta.
+    """
+
+    def __init__(self, exchange, reconcile_interval=BALANCE_RECONCILE_INTERVAL):
+        self.exchange = exchange
+        self.reconcile_interval = reconcile_interval
+        self.balance = 0.0
+        self.reserved = 0.0  # Importe de órdenes de compra en curso
+
+    def available(self):
+        return self.balance - self.reserved
+
+    async def reserve(self, amount, symbol=None):
+        """Aparta `amount` para una compra; False si no hay saldo libre. Se devuelve con release()."""
+        if amount > self.available():
+            return False
+        self.reserved += amount
+        return True
+
+    def release(self, amount, symbol=None):
+        self.reserved = max(self.reserved - amount, 0.0)
+
+    def apply_fill(self, side, price, quantity):
+        notional = price * quantity
+        self.balance += notional if side == "sell" else -notional
+
+    async def reconcile(self):
+        balance = await self.exchange.get_balance()
+        drift = balance - self.balance
+        if abs(drift) > 1e-9 and self.balance:
+            logging.warning(f"Saldo local desviado {drift:+.4f} respecto al exchange; se corrige")
+        self.balance = balance
+        return balance
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logging.error(f"Error al conciliar el saldo: {e}")
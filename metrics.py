@@ -0,0 +1,41 @@
+import logging
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from trading_bot.config import METRICS_PORT
+
+# Cubos pensados para latencias de red y de cálculo (de 1 ms a 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+EXCHANGE_REQUEST_SECONDS = Histogram(
+    "trading_bot_exchange_request_seconds", "Latencia de las llamadas al exchange", ["endpoint"],
+    buckets=LATENCY_BUCKETS)
+EXCHANGE_COALESCED = Counter(
+    "trading_bot_exchange_coalesced_total", "Peticiones resueltas con una llamada idéntica en curso", ["endpoint"])
+ORDER_ROUNDTRIP_SECONDS = Histogram(
+    "trading_bot_order_roundtrip_seconds", "Tiempo desde el envío de la orden hasta la respuesta", ["side"],
+    buckets=LATENCY_BUCKETS)
+DECISION_TICK_SECONDS = Histogram(
+    "trading_bot_decision_tick_seconds", "Duración de cada evaluación de entrada/salida", ["symbol", "phase"],
+    buckets=LATENCY_BUCKETS)
+INDICATOR_SECONDS = Histogram(
+    "trading_bot_indicator_seconds", "Tiempo de cálculo de indicadores", ["mode"], buckets=LATENCY_BUCKETS)
+JOURNAL_FLUSH_SECONDS = Histogram(
+    "trading_bot_journal_flush_seconds", "Tiempo de escritura de cada lote del registro", buckets=LATENCY_BUCKETS)
+RETRIES = Counter("trading_bot_retries_total", "Reintentos de execute_with_retry", ["function"])
+CIRCUIT_OPEN = Gauge("trading_bot_circuit_open", "1 si el circuito del endpoint está abierto", ["endpoint"])
+BACKTEST_BARS = Counter("trading_bot_backtest_bars_total", "Velas simuladas en backtests")
+BACKTEST_BARS_PER_SECOND = Gauge("trading_bot_backtest_bars_per_second", "Velas por segundo del último backtest")
+REPLAY_EVENTS = Counter("trading_bot_replay_events_total", "Ticks procesados por el replay")
+REPLAY_EVENTS_PER_SECOND = Gauge("trading_bot_replay_events_per_second", "Ticks por segundo del último replay")
+OPTIMIZER_EVALUATIONS = Counter("trading_bot_optimizer_evaluations_total", "Candidatos evaluados por el optimizador")
+OPTIMIZER_EVALUATIONS_PER_SECOND = Gauge(
+    "trading_bot_optimizer_evaluations_per_second", "Candidatos por segundo de la última búsqueda")
+
+def record_throughput(total, gauge, count, elapsed):
+    total.inc(count)
+    if elapsed > 0:
+        gauge.set(count / elapsed)
+
+def start_metrics_server(port=METRICS_PORT):
+    """Arranca el exportador HTTP que Prometheus consulta (ver prometheus.yml)."""
+    start_http_server(port)
+    logging.info(f"Métricas de Prometheus disponibles en el puerto {port}")
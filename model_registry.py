@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import pandas as pd
+from trading_bot.inference import export_model, load_model
+from trading_bot.config import ML_EPOCHS, ML_BATCH_SIZE, ML_FINE_TUNE_EPOCHS, ML_FINE_TUNE_OVERLAP, \
+    MODEL_REGISTRY_PATH, MODEL_REGISTRY_MAX_BYTES
+
+INDEX_FILE = "index.json"
+
+def _row_hashes(data):
+    # Un hash por fila: el hash de un prefijo de los datos es el de un prefijo de este array
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+def _digest(row_hashes):
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+def _key(features, rows_hash):
+    return hashlib.sha256(f"{features}:{rows_hash}".encode()).hexdigest()
+
+def feature_key(data, hyperparams):
+    """Huella del conjunto de columnas (y sus tipos) y de los hiperparámetros."""
+    schema = [(column, str(dtype)) for column, dtype in data.dtypes.items()]
+    payload = json.dumps({"features": schema, "hyperparams": hyperparams}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def fingerprint(data, hyperparams):
+    """Huella de la ventana de entrenamiento completa: datos, columnas e hiperparámetros."""
+    return _key(feature_key(data, hyperparams), _digest(_row_hashes(data)))
+
+class ModelRegistry:
+    """Modelos entrenados guardados en disco y reutilizados por huella.
+
+    Si los datos coinciden con un modelo guardado se carga sin entrenar; si
+    sólo se han añadido velas al final, se continúa el entrenamiento de ese
+    modelo con las velas nuevas. Los modelos menos usados se borran cuando el
+    directorio supera `max_bytes`.
+
+    Cada modelo se guarda también exportado a .npz: get_or_train devuelve el
+    runtime de NumPy y sólo carga TensorFlow cuando hay que entrenar.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_PATH, max_bytes=MODEL_REGISTRY_MAX_BYTES, train=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.train = train
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.root, INDEX_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _model_path(self, key, ext="keras"):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _touch(self, key):
+        self._index[key]["last_used"] = time.time()
+        self._save_index()
+
+    def _load_keras(self, key):
+        import tensorflow as tf
+        self._touch(key)
+        return tf.keras.models.load_model(self._model_path(key))
+
+    def _train(self, *args, **kwargs):
+        if self.train is None:
+            from trading_bot.ml_models import train_ml_model
+            self.train = train_ml_model
+        return self.train(*args, **kwargs)
+
+    def _base_for(self, row_hashes, features):
+        """Modelo guardado cuyos datos son un prefijo de los actuales (el más largo)."""
+        candidates = [(entry["rows"], key) for key, entry in self._index.items()
+                      if entry["features"] == features and entry["rows"] < len(row_hashes)]
+        for rows, key in sorted(candidates, reverse=True):
+            if self._index[key]["rows_hash"] == _digest(row_hashes[:rows]):
+                return key, rows
+        return None, 0
+
+    def get_or_train(self, data, epochs=ML_EPOCHS, batch_size=ML_BATCH_SIZE):
+        """Devuelve un modelo para `data`, entrenándolo sólo si no hay uno reutilizable."""
+        hyperparams = {"epochs": epochs, "batch_size": batch_size}
+        features = feature_key(data, hyperparams)
+        row_hashes = _row_hashes(data)
+        rows_hash = _digest(row_hashes)
+        key = _key(features, rows_hash)
+        if key in self._index and os.path.exists(self._model_path(key, "npz")):
+            logging.info(f"Modelo {key[:12]} reutilizado del registro")
+            self._touch(key)
+            return load_model(self._model_path(key, "npz"))
+
+        base, rows = self._base_for(row_hashes, features)
+        if base is not None:
+            # Sólo hay velas nuevas: se continúa el modelo anterior con ellas y un tramo ya visto
+            logging.info(f"Modelo {base[:12]} ampliado con {len(data) - rows} velas nuevas")
+            model = self._train(data.iloc[max(rows - ML_FINE_TUNE_OVERLAP, 0):], epochs=ML_FINE_TUNE_EPOCHS,
+                                batch_size=batch_size, model=self._load_keras(base))
+        else:
+            model = self._train(data, epochs=epochs, batch_size=batch_size)
+        self._store(key, model, features, rows_hash, len(data))
+        return load_model(self._model_path(key, "npz"))
+
+    def _store(self, key, model, features, rows_hash, rows):
+        model.save(self._model_path(key))
+        export_model(model, self._model_path(key, "npz"))
+        size = sum(os.path.getsize(self._model_path(key, ext)) for ext in ("keras", "npz"))
+        self._index[key] = {"features": features, "rows_hash": rows_hash, "rows": rows,
+                            "bytes": size, "last_used": time.time()}
+        self._evict(keep=key)
+        self._save_index()
+
+    def _evict(self, keep=None):
+        """Borra los modelos usados hace más tiempo hasta quedar por debajo de `max_bytes`."""
+        total = sum(entry["bytes"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for ext in ("keras", "npz"):
+                if os.path.exists(self._model_path(key, ext)):
+                    os.remove(self._model_path(key, ext))
+            total -= entry["bytes"]
+            del self._index[key]
+            logging.info(f"Modelo {key[:12]} eliminado del registro")
+
+_registry = None
+
+def get_model_registry():
+    """Registro compartido del proceso."""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
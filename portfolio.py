@@ -0,0 +1,157 @@
+import logging
+import numpy as np
+from trading_bot.candles import get_candle_store
+from trading_bot.config import PORTFOLIO_SAMPLES, PORTFOLIO_BATCH_SIZE, PORTFOLIO_MAX_WEIGHT, \
+    PORTFOLIO_RISK_FREE_RATE, PORTFOLIO_LOOKBACK, DEFAULT_ALLOCATION
+
+def portfolio_stats(weights, mean_returns, cov_matrix, risk_free_rate=PORTFOLIO_RISK_FREE_RATE):
+    """Rentabilidad, volatilidad y Sharpe de una o varias carteras (una por fila de `weights`)."""
+    weights = np.atleast_2d(weights)
+    returns = weights @ mean_returns
+    # Varianza de todas las carteras con un solo producto de matrices: sum((W Σ) * W, axis=1)
+    volatility = np.sqrt(np.einsum("ij,ij->i", weights @ cov_matrix, weights))
+    sharpe = np.divide(returns - risk_free_rate, volatility, out=np.zeros_like(returns), where=volatility > 0)
+    return returns, volatility, sharpe
+
+def cap_weights(weights, max_weight):
+    """Recorta cada peso a `max_weight` y reparte el exceso entre los que no llegan, fila a fila."""
+    weights = np.array(weights, dtype=np.float64, copy=True)
+    for _ in range(weights.shape[-1]):
+        excess = np.clip(weights - max_weight, 0, None).sum(axis=-1, keepdims=True)
+        if not excess.any():
+            break
+        np.minimum(weights, max_weight, out=weights)
+        room = np.where(weights < max_weight, weights, 0)
+        total = room.sum(axis=-1, keepdims=True)
+        weights += excess * np.divide(room, total, out=np.zeros_like(room), where=total > 0)
+    return weights
+
+def _check_feasible(n_assets, max_weight):
+    if max_weight is not None and max_weight * n_assets < 1 - 1e-12:
+        raise ValueError(f"Con {n_assets} activos el peso máximo debe ser al menos {1 / n_assets:.4f}")
+
+def monte_carlo_frontier(mean_returns, cov_matrix, n_portfolios=PORTFOLIO_SAMPLES, batch_size=PORTFOLIO_BATCH_SIZE,
+                         max_weight=PORTFOLIO_MAX_WEIGHT, risk_free_rate=PORTFOLIO_RISK_FREE_RATE, seed=None):
+    """Evalúa `n_portfolios` carteras aleatorias (sólo largos) por lotes.
+
+    Devuelve los pesos de máximo Sharpe y de mínima volatilidad y la nube
+    (rentabilidad, volatilidad) para dibujar la frontera.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    n_assets = len(mean_returns)
+    _check_feasible(n_assets, max_weight)
+    rng = np.random.default_rng(seed)
+    returns = np.empty(n_portfolios)
+    volatility = np.empty(n_portfolios)
+    best_sharpe = min_vol = None
+    for start in range(0, n_portfolios, batch_size):
+        size = min(batch_size, n_portfolios - start)
+        weights = rng.dirichlet(np.ones(n_assets), size)
+        if max_weight is not None:
+            weights = cap_weights(weights, max_weight)
+        r, v, s = portfolio_stats(weights, mean_returns, cov_matrix, risk_free_rate)
+        returns[start:start + size] = r
+        volatility[start:start + size] = v
+        i, j = int(np.argmax(s)), int(np.argmin(v))
+        if best_sharpe is None or s[i] > best_sharpe[0]:
+            best_sharpe = (s[i], weights[i])
+        if min_vol is None or v[j] < min_vol[0]:
+            min_vol = (v[j], weights[j])
+    return {"max_sharpe": best_sharpe[1], "min_volatility": min_vol[1], "returns": returns,
+            "volatility": volatility}
+
+def _solve(objective, n_assets, max_weight, x0):
+    from scipy.optimize import minimize  # Carga diferida: sólo la usa el optimizador exacto
+    bounds = [(0.0, 1.0 if max_weight is None else max_weight)] * n_assets
+    constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones_like(w)}]
+    result = minimize(objective, x0, jac=True, method="SLSQP", bounds=bounds, constraints=constraints,
+                      options={"maxiter": 500, "ftol": 1e-12})
+    if not result.success:
+        logging.warning(f"Optimización de cartera sin converger: {result.message}")
+    weights = np.clip(result.x, 0, None)
+    return weights / weights.sum()
+
+def max_sharpe_weights(mean_returns, cov_matrix, max_weight=PORTFOLIO_MAX_WEIGHT,
+                       risk_free_rate=PORTFOLIO_RISK_FREE_RATE, x0=None):
+    """Pesos de máximo Sharpe (sólo largos, con tope por activo) resolviendo el problema exacto.
+
+    Si la cartera tangente sin restricciones (Σ⁻¹(μ - rf)) ya las cumple, se
+    devuelve directamente.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+    n_assets = len(mean_returns)
+    _check_feasible(n_assets, max_weight)
+    excess = mean_returns - risk_free_rate
+    try:
+        tangent = np.linalg.solve(cov_matrix, excess)
+        if tangent.sum() > 0:
+            tangent /= tangent.sum()
+            if tangent.min() >= 0 and (max_weight is None or tangent.max() <= max_weight):
+                return tangent
+    except np.linalg.LinAlgError:
+        pass
+
+    def negative_sharpe(w):
+        variance = w @ cov_matrix @ w
+        volatility = np.sqrt(max(variance, 1e-18))
+        ret = excess @ w
+        gradient = -(excess * volatility - ret * (cov_matrix @ w) / volatility) / variance
+        return -ret / volatility, gradient
+
+    x0 = np.full(n_assets, 1 / n_assets) if x0 is None else x0
+    return _solve(negative_sharpe, n_assets, max_weight, x0)
+
+def min_variance_weights(cov_matrix, max_weight=PORTFOLIO_MAX_WEIGHT):
+    """Pesos de mínima varianza (sólo largos, con tope por activo)."""
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+    n_assets = len(cov_matrix)
+    _check_feasible(n_assets, max_weight)
+
+    def variance(w):
+        product = cov_matrix @ w
+        return w @ product, 2 * product
+
+    return _solve(variance, n_assets, max_weight, np.full(n_assets, 1 / n_assets))
+
+def optimize_weights(returns, max_weight=PORTFOLIO_MAX_WEIGHT, risk_free_rate=PORTFOLIO_RISK_FREE_RATE,
+                     n_portfolios=PORTFOLIO_SAMPLES, seed=None):
+    """Cartera de máximo Sharpe para una matriz de rentabilidades (activos x periodos).
+
+    El Monte Carlo da el punto de partida y el resultado exacto lo afina.
+    """
+    mean_returns = np.mean(returns, axis=1)
+    cov_matrix = np.atleast_2d(np.cov(returns))
+    frontier = monte_carlo_frontier(mean_returns, cov_matrix, n_portfolios, max_weight=max_weight,
+                                    risk_free_rate=risk_free_rate, seed=seed)
+    weights = max_sharpe_weights(mean_returns, cov_matrix, max_weight, risk_free_rate, x0=frontier["max_sharpe"])
+    candidates = np.vstack([weights, frontier["max_sharpe"]])
+    _, _, sharpe = portfolio_stats(candidates, mean_returns, cov_matrix, risk_free_rate)
+    return candidates[int(np.argmax(sharpe))]
+
+def portfolio_allocations(symbols, resolution="1H", lookback=PORTFOLIO_LOOKBACK, max_weight=PORTFOLIO_MAX_WEIGHT,
+                          seed=None):
+    """Fracción del presupuesto para cada símbolo a partir de las velas en caché.
+
+    Con menos de dos símbolos o sin historia suficiente se usa DEFAULT_ALLOCATION.
+    """
+    return allocations_from_closes(symbols, snapshot_closes(symbols, resolution, lookback), max_weight, seed)
+
+def snapshot_closes(symbols, resolution="1H", lookback=PORTFOLIO_LOOKBACK):
+    """Copia de los últimos cierres en caché de cada símbolo.
+
+    Las cachés son vistas de buffers que el bucle de eventos sigue escribiendo:
+    hay que copiarlas en el bucle antes de optimizar en otro hilo.
+    """
+    return [get_candle_store(symbol, resolution).closes(lookback).copy() for symbol in symbols]
+
+def allocations_from_closes(symbols, closes, max_weight=PORTFOLIO_MAX_WEIGHT, seed=None):
+    """Como portfolio_allocations, sobre cierres ya copiados (seguro en un hilo aparte)."""
+    n = min((len(c) for c in closes), default=0)
+    if len(symbols) < 2 or n < 3 or (max_weight is not None and max_weight * len(symbols) < 1):
+        return {symbol: DEFAULT_ALLOCATION for symbol in symbols}
+    returns = np.diff(np.log(np.vstack([c[-n:] for c in closes])), axis=1)
+    weights = optimize_weights(returns, max_weight, seed=seed)
+    allocations = dict(zip(symbols, weights.tolist()))
+    logging.info("Asignación de cartera: " + ", ".join(f"{s}={w:.1%}" for s, w in allocations.items()))
+    return allocations
@@ -0,0 +1,259 @@
+import os
+import time
+import numpy as np
+from trading_bot import strategy
+from trading_bot.backtesting import WARMUP_BARS, trade_metrics
+from trading_bot.history import get_history_store
+from trading_bot.indicators import compute_indicators
+from trading_bot.metrics import REPLAY_EVENTS, REPLAY_EVENTS_PER_SECOND, record_throughput
+from trading_bot.config import BUDGET, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, DEFAULT_ALLOCATION, \
+    ENTRY_RETRY_INTERVAL, RISK_PERCENTAGE, TICKS_PATH, TICK_FLUSH_SIZE, REPLAY_BATCH_SIZE, REPLAY_ORDER_LATENCY, \
+    REPLAY_SLIPPAGE
+
+try:
+    from numba import njit  # Opcional: compila el bucle de eventos
+except ImportError:
+    njit = None
+
+TICK_DTYPE = np.dtype([("time", "<f8"), ("price", "<f8"), ("size", "<f8")])
+TRADE_DTYPE = np.dtype([("entry_time", "<f8"), ("entry_price", "<f8"), ("exit_time", "<f8"), ("exit_price", "<f8"),
+                        ("quantity", "<f8")])
+
+def parse_trades(trades):
+    """Convierte las operaciones del canal v4_trades en un array TICK_DTYPE ordenado por tiempo."""
+    ticks = np.empty(len(trades), dtype=TICK_DTYPE)
+    created = np.array([t["createdAt"].rstrip("Z") for t in trades], dtype="datetime64[ns]")
+    ticks["time"] = created.astype(np.int64) / 1e9
+    ticks["price"] = [float(t["price"]) for t in trades]
+    ticks["size"] = [float(t["size"]) for t in trades]
+    return np.sort(ticks, order="time", kind="stable")
+
+class TickStore:
+    """Ticks grabados de un símbolo en un fichero binario de registros TICK_DTYPE, leído con np.memmap."""
+
+    def __init__(self, symbol, root=TICKS_PATH):
+        self.symbol = symbol
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, f"{symbol}.bin")
+
+    def __len__(self):
+        return os.path.getsize(self.path) // TICK_DTYPE.itemsize if os.path.exists(self.path) else 0
+
+    def append(self, ticks):
+        ticks = np.asarray(ticks, dtype=TICK_DTYPE)
+        n = len(self)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > n * TICK_DTYPE.itemsize:
+            os.truncate(self.path, n * TICK_DTYPE.itemsize)  # Restos de una escritura interrumpida
+        with open(self.path, "ab") as f:
+            f.write(ticks.tobytes())
+        return len(ticks)
+
+    def ticks(self, start=None, end=None):
+        """Vista de solo lectura (sin copia) de los ticks con start <= tiempo < end."""
+        n = len(self)
+        if not n:
+            return np.empty(0, dtype=TICK_DTYPE)
+        view = np.memmap(self.path, dtype=TICK_DTYPE, mode="r", shape=(n,))
+        times = view["time"]
+        i = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        j = n if end is None else int(np.searchsorted(times, end, side="left"))
+        return view[i:j]
+
+    def batches(self, batch_size=REPLAY_BATCH_SIZE, start=None, end=None):
+        ticks = self.ticks(start, end)
+        for i in range(0, len(ticks), batch_size):
+            yield ticks[i:i + batch_size]
+
+class TickRecorder:
+    """Acumula las operaciones del feed y las escribe por bloques en el TickStore de cada símbolo."""
+
+    def __init__(self, root=TICKS_PATH, flush_size=TICK_FLUSH_SIZE):
+        self.root = root
+        self.flush_size = flush_size
+        self._stores = {}
+        self._pending = {}
+        self._count = 0
+
+    def record(self, symbol, trades):
+        if not trades:
+            return
+        self._pending.setdefault(symbol, []).append(parse_trades(trades))
+        self._count += len(trades)
+        if self._count >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        for symbol, chunks in self._pending.items():
+            if symbol not in self._stores:
+                self._stores[symbol] = TickStore(symbol, self.root)
+            self._stores[symbol].append(np.sort(np.concatenate(chunks), order="time", kind="stable"))
+        self._pending = {}
+        self._count = 0
+
+    def close(self):
+        self.flush()
+
+_tick_stores = {}
+
+def get_tick_store(symbol):
+    """Devuelve el TickStore compartido de `symbol` en TICKS_PATH."""
+    store = _tick_stores.get(symbol)
+    if store is None:
+        store = _tick_stores[symbol] = TickStore(symbol)
+    return store
+
+def candles_from_ticks(ticks, interval=3600):
+    """Velas OHLCV (dict de arrays) agregando los ticks por intervalos de `interval` segundos."""
+    times = np.asarray(ticks["time"], dtype=np.float64)
+    price = np.asarray(ticks["price"], dtype=np.float64)
+    start = np.floor(times / interval) * interval
+    bounds = np.flatnonzero(np.r_[True, start[1:] != start[:-1]]) if len(start) else np.empty(0, dtype=np.int64)
+    last = np.r_[bounds[1:] - 1, len(price) - 1] if len(bounds) else bounds
+    return {
+        "time": start[bounds],
+        "open": price[bounds],
+        "high": np.maximum.reduceat(price, bounds) if len(bounds) else price[:0],
+        "low": np.minimum.reduceat(price, bounds) if len(bounds) else price[:0],
+        "close": price[last],
+        "volume": np.add.reduceat(np.asarray(ticks["size"], dtype=np.float64), bounds) if len(bounds) else price[:0],
+    }
+
+def _rolling_mean(values, window):
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        total = np.cumsum(np.r_[0.0, values])
+        out[window - 1:] = (total[window:] - total[:-window]) / window
+    return out
+
+def candle_context(candles, interval=3600, atr_period=14, volume_period=30):
+    """Lo que el bucle en vivo sabe al cerrar cada vela: instante de cierre, señal de entrada y ATR.
+
+    Mismas fórmulas que trading.py: volumen de 24h frente a la media de
+    `volume_period` velas, MACD por encima de su señal y ATR de `atr_period`.
+    """
+    high, low, close, volume = (np.asarray(candles[f], dtype=np.float64) for f in ("high", "low", "close", "volume"))
+    tr = high - low
+    tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+    day = max(int(86400 // interval), 1)
+    indicators = compute_indicators(close)
+    entry = strategy.entry_signal(_rolling_mean(volume, day) * day, _rolling_mean(volume, volume_period),
+                                  indicators["MACD"], indicators["Signal"])
+    closed_at = np.asarray(candles["time"], dtype=np.float64) + interval
+    return closed_at, np.asarray(entry, dtype=bool), _rolling_mean(tr, atr_period)
+
+# Estado del bucle que se conserva entre lotes
+_HOLDING, _PENDING, _DUE, _NEXT_CHECK, _CANDLE, _BUY_PRICE, _QUANTITY, _ENTRY_TIME = range(8)
+_STATE_SIZE = 8
+
+if njit is not None:
+    # Las mismas reglas de strategy.py, compiladas para llamarlas desde el bucle
+    _exit_levels = njit(strategy.exit_levels)
+    _should_exit = njit(strategy.should_exit)
+    _order_quantity = njit(strategy.order_quantity)
+    _risk_quantity = njit(strategy.risk_quantity)
+else:
+    _exit_levels = strategy.exit_levels
+    _should_exit = strategy.should_exit
+    _order_quantity = strategy.order_quantity
+    _risk_quantity = strategy.risk_quantity
+
+def _replay_kernel(times, prices, closed_at, entry, atr_values, profit_threshold, trailing_stop, latency, slippage,
+                   budget, allocation, retry_interval, risk_percentage, state, trades):
+    count = 0
+    k = int(state[_CANDLE])
+    n_candles = len(closed_at)
+    for i in range(len(times)):
+        t = times[i]
+        price = prices[i]
+        while k + 1 < n_candles and closed_at[k + 1] <= t:
+            k += 1
+        atr = atr_values[k] if k >= 0 else np.nan
+        if state[_PENDING] != 0:
+            # Orden en vuelo: se ejecuta con el primer tick tras la latencia
+            if t < state[_DUE]:
+                continue
+            if state[_PENDING] > 0:
+                state[_BUY_PRICE] = price * (1 + slippage)
+                state[_ENTRY_TIME] = t
+                state[_HOLDING] = 1
+            else:
+                trades[count, 0] = state[_ENTRY_TIME]
+                trades[count, 1] = state[_BUY_PRICE]
+                trades[count, 2] = t
+                trades[count, 3] = price * (1 - slippage)
+                trades[count, 4] = state[_QUANTITY]
+                count += 1
+                state[_HOLDING] = 0
+                state[_NEXT_CHECK] = t + retry_interval
+            state[_PENDING] = 0
+        if state[_HOLDING]:
+            take_profit, stop_price = _exit_levels(state[_BUY_PRICE], atr, profit_threshold, trailing_stop)
+            if _should_exit(price, take_profit, stop_price):
+                state[_PENDING] = -1
+                state[_DUE] = t + latency
+        elif t >= state[_NEXT_CHECK]:
+            if k >= 0 and entry[k]:
+                max_quantity = _risk_quantity(atr, budget, risk_percentage) if atr > 0 else np.nan
+                state[_QUANTITY] = _order_quantity(budget, allocation, price, max_quantity)
+                state[_PENDING] = 1
+                state[_DUE] = t + latency
+            else:
+                state[_NEXT_CHECK] = t + retry_interval
+    state[_CANDLE] = k
+    return count
+
+if njit is not None:
+    _replay_kernel = njit(cache=True)(_replay_kernel)
+
+def replay(ticks, candles, profit_threshold=DEFAULT_PROFIT_THRESHOLD, trailing_stop=DEFAULT_TRAILING_STOP,
+           interval=3600, latency=REPLAY_ORDER_LATENCY, slippage=REPLAY_SLIPPAGE, budget=BUDGET,
+           allocation=DEFAULT_ALLOCATION, retry_interval=ENTRY_RETRY_INTERVAL):
+    """Reproduce ticks (un array TICK_DTYPE o un iterable de lotes) con las reglas de entrada y salida en vivo.
+
+    Como con el feed activo, las salidas se evalúan en cada tick y las
+    entradas cada `retry_interval` segundos sin posición; las órdenes se
+    ejecutan con el primer tick tras `latency` segundos, con `slippage` en
+    contra. Los indicadores son los de la última vela cerrada de `candles`.
+    """
+    batches = [ticks] if isinstance(ticks, np.ndarray) else ticks
+    closed_at, entry, atr = candle_context(candles, interval)
+    state = np.zeros(_STATE_SIZE)
+    state[_CANDLE] = -1
+    state[_NEXT_CHECK] = -np.inf
+    buffer = np.empty((0, len(TRADE_DTYPE)))
+    chunks = []
+    events = 0
+    started = time.perf_counter()
+    for batch in batches:
+        times = np.ascontiguousarray(batch["time"], dtype=np.float64)
+        prices = np.ascontiguousarray(batch["price"], dtype=np.float64)
+        if len(buffer) < len(times) // 2 + 1:
+            # Cada operación cerrada necesita al menos dos ticks
+            buffer = np.empty((len(times) // 2 + 1, len(TRADE_DTYPE)))
+        count = _replay_kernel(times, prices, closed_at, entry, atr, float(profit_threshold), float(trailing_stop),
+                               float(latency), float(slippage), float(budget), float(allocation),
+                               float(retry_interval), float(RISK_PERCENTAGE), state, buffer)
+        chunks.append(buffer[:count].copy())
+        events += len(times)
+    elapsed = time.perf_counter() - started
+    record_throughput(REPLAY_EVENTS, REPLAY_EVENTS_PER_SECOND, events, elapsed)
+    rows = np.concatenate(chunks) if chunks else buffer
+    trades = np.empty(len(rows), dtype=TRADE_DTYPE)
+    for k, name in enumerate(TRADE_DTYPE.names):
+        trades[name] = rows[:, k]
+    result = trade_metrics(trades["entry_price"], trades["exit_price"], trades["quantity"])
+    result.update(trades=trades, events=events, open_position=bool(state[_HOLDING]),
+                  events_per_second=events / elapsed if elapsed > 0 else 0.0)
+    return result
+
+def replay_symbol(symbol, profit_threshold=DEFAULT_PROFIT_THRESHOLD, trailing_stop=DEFAULT_TRAILING_STOP,
+                  start=None, end=None, resolution="1H", **kwargs):
+    """Replay de los ticks grabados de `symbol` con las velas del histórico local como contexto."""
+    store = get_tick_store(symbol)
+    ticks = store.ticks(start, end)
+    history = get_history_store(symbol, resolution)
+    first = ticks["time"][0] - WARMUP_BARS * history.interval if len(ticks) else None
+    last = ticks["time"][-1] if len(ticks) else None
+    candles = {field: history.column(field, first, last) for field in ("time", "high", "low", "close", "volume")}
+    return replay(store.batches(start=start, end=end), candles, profit_threshold, trailing_stop,
+                  interval=history.interval, **kwargs)
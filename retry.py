@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import random
+import time
+from trading_bot.metrics import RETRIES, CIRCUIT_OPEN
+from trading_bot.config import RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, ORDER_DEADLINE, \
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+class CircuitOpenError(Exception):
+    """El endpoint acumula fallos y se rechaza la llamada sin contactar con el exchange."""
+
+class CircuitBreaker:
+    """Corta las llamadas a un endpoint tras `failure_threshold` fallos seguidos.
+
+    Pasados `reset_timeout` segundos deja pasar una única llamada de prueba:
+    si va bien el circuito se cierra y si falla vuelve a abrirse.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError(f"Circuito abierto para '{self.name}' tras {self.failures} fallos")
+        if state == "half_open":
+            self._probing = True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logging.info(f"Circuito de '{self.name}' cerrado de nuevo")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def record_cancelled(self):
+        """Una llamada cancelada no cuenta como éxito ni como fallo, pero libera la plaza de prueba."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logging.warning(f"Circuito de '{self.name}' abierto durante {self.reset_timeout}s")
+            self.opened_at = time.monotonic()
+            self._probing = False
+            CIRCUIT_OPEN.labels(self.name).set(1)
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Espera con "full jitter": aleatoria entre 0 y min(cap, base * 2^intento)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+async def retry_async(func, *args, attempts=RETRY_ATTEMPTS, deadline=ORDER_DEADLINE, retry_on_timeout=True,
+                      **kwargs):
+    """Reintenta la corrutina `func` con backoff aleatorio sin pasarse de `deadline` segundos en total.
+
+    Los intentos se cortan al agotar el plazo y el último error se propaga;
+    un circuito abierto no se reintenta, y un timeout tampoco si
+    `retry_on_timeout` es False (la llamada puede seguir en curso).
+    """
+    name = getattr(func, "__name__", "unknown")
+    expires = time.monotonic() + deadline
+    for attempt in range(attempts):
+        remaining = expires - time.monotonic()
+        try:
+            return await asyncio.wait_for(func(*args, **kwargs), remaining)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and not retry_on_timeout:
+                raise
+            remaining = expires - time.monotonic()
+            delay = backoff_delay(attempt)
+            if attempt == attempts - 1 or delay >= remaining:
+                raise
+            logging.error(f"Error al ejecutar {name} (intento {attempt + 1}/{attempts}): {e}")
+            RETRIES.labels(name).inc()
+            await asyncio.sleep(delay)
@@ -0,0 +1,207 @@
+import functools
+import itertools
+import math
+import time
+from bisect import bisect_left, insort
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from trading_bot.config import RISK_WINDOW, RISK_CONFIDENCE, RISK_RETURN_INTERVAL, RISK_MAX_PORTFOLIO_CVAR, BUDGET
+
+def _quantile_index(n, confidence):
+    # Misma interpolación lineal que np.percentile
+    position = (1 - confidence) * (n - 1)
+    lo = int(math.floor(position))
+    return lo, position - lo
+
+class RollingWindow:
+    """Últimas `size` rentabilidades en orden de llegada y ordenadas a la vez.
+
+    Insertar y expulsar cuesta O(log n) de búsqueda más un desplazamiento de
+    memoria; VaR y CVaR se calculan sobre la lista ordenada y se guardan hasta
+    el siguiente cambio. Cada rentabilidad puede llevar el periodo en el que
+    cierra, para alinear ventanas de varios símbolos.
+    """
+
+    def __init__(self, size=RISK_WINDOW, confidence=RISK_CONFIDENCE):
+        self.size = size
+        self.confidence = confidence
+        self._values = deque()
+        self._periods = deque()
+        self._sorted = []
+        self._cached = None
+
+    def __len__(self):
+        return len(self._values)
+
+    def append(self, value, period=-1):
+        if len(self._values) == self.size:
+            old = self._values.popleft()
+            self._periods.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+        self._values.append(value)
+        self._periods.append(period)
+        insort(self._sorted, value)
+        self._cached = None
+
+    def extend(self, values, periods=None):
+        periods = itertools.repeat(-1) if periods is None else periods
+        for value, period in zip(values, periods):
+            self.append(float(value), int(period))
+
+    def values(self):
+        return np.fromiter(self._values, dtype=np.float64, count=len(self._values))
+
+    def periods(self):
+        return np.fromiter(self._periods, dtype=np.int64, count=len(self._periods))
+
+    def risk(self):
+        """(VaR, CVaR) como pérdidas positivas, o (0, 0) con menos de dos datos."""
+        if self._cached is None:
+            n = len(self._sorted)
+            if n < 2:
+                self._cached = (0.0, 0.0)
+            else:
+                lo, frac = _quantile_index(n, self.confidence)
+                hi = min(lo + 1, n - 1)
+                quantile = self._sorted[lo] + frac * (self._sorted[hi] - self._sorted[lo])
+                tail = self._sorted[:lo + 1]
+                self._cached = (max(-quantile, 0.0), max(-sum(tail) / len(tail), 0.0))
+        return self._cached
+
+class RiskEngine:
+    """VaR/CVaR por símbolo y de la cartera abierta, actualizado con cada precio y cada ejecución.
+
+    Las rentabilidades se muestrean cada `interval` segundos (una por vela) y
+    sólo entre periodos consecutivos: un hueco (arranque, reconexión, sin
+    precios entre posiciones) no se cuenta como una única rentabilidad. El
+    riesgo de la cartera es la simulación histórica de la exposición actual
+    sobre los periodos comunes a todos los símbolos.
+    """
+
+    def __init__(self, window=RISK_WINDOW, confidence=RISK_CONFIDENCE, interval=RISK_RETURN_INTERVAL,
+                 max_portfolio_cvar=RISK_MAX_PORTFOLIO_CVAR, budget=BUDGET):
+        self.window = window
+        self.confidence = confidence
+        self.interval = interval
+        self.max_portfolio_cvar = max_portfolio_cvar
+        self.budget = budget
+        self._windows = {}
+        self._period = {}  # símbolo -> (periodo en curso, último precio)
+        self._closes = {}  # símbolo -> (periodo anterior, su cierre)
+        self._positions = {}  # símbolo -> cantidad
+        self._prices = {}
+        self._portfolio = None
+
+    def _window(self, symbol):
+        if symbol not in self._windows:
+            self._windows[symbol] = RollingWindow(self.window, self.confidence)
+        return self._windows[symbol]
+
+    def seed(self, symbol, closes, times):
+        """Carga velas de `interval` segundos (p. ej. de la caché) para tener riesgo desde el arranque.
+
+        `times` son los inicios de cada vela; la última se toma como el periodo
+        en curso y sólo aportan rentabilidad las velas cerradas y consecutivas.
+        """
+        closes = np.asarray(closes, dtype=np.float64)[-self.window - 2:]
+        periods = np.asarray(times, dtype=np.int64)[-self.window - 2:] // self.interval
+        if len(closes) < 2:
+            return
+        adjacent = np.diff(periods[:-1]) == 1
+        returns = closes[1:-1] / closes[:-2] - 1
+        self._windows[symbol] = RollingWindow(self.window, self.confidence)
+        self._windows[symbol].extend(returns[adjacent], periods[1:-1][adjacent])
+        self._closes[symbol] = (int(periods[-2]), float(closes[-2]))
+        self._period[symbol] = (int(periods[-1]), float(closes[-1]))
+        self._prices[symbol] = float(closes[-1])
+        self._portfolio = None
+
+    def update_price(self, symbol, price, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        period = int(timestamp // self.interval)
+        self._prices[symbol] = price
+        current = self._period.get(symbol)
+        if current is not None and period > current[0]:
+            # Empieza un periodo nuevo: el último precio cierra el anterior y, si el cierre previo es el del
+            # periodo inmediatamente anterior, da una rentabilidad; tras un hueco sólo se guarda el cierre
+            previous = self._closes.get(symbol)
+            if previous is not None and previous[0] == current[0] - 1 and previous[1]:
+                self._window(symbol).append(current[1] / previous[1] - 1, current[0])
+                self._portfolio = None
+            self._closes[symbol] = current
+        self._period[symbol] = (period, price)
+        if symbol in self._positions:
+            self._portfolio = None
+
+    def on_fill(self, symbol, side, price, quantity):
+        held = self._positions.get(symbol, 0.0) + (quantity if side == "buy" else -quantity)
+        if held > 1e-12:
+            self._positions[symbol] = held
+        else:
+            self._positions.pop(symbol, None)
+        self._prices[symbol] = price
+        self._portfolio = None
+
+    def symbol_risk(self, symbol):
+        """(VaR, CVaR) de un símbolo como fracción del valor de la posición."""
+        window = self._windows.get(symbol)
+        return window.risk() if window is not None else (0.0, 0.0)
+
+    def exposure(self, extra=None):
+        exposure = {s: q * self._prices.get(s, 0.0) for s, q in self._positions.items()}
+        for symbol, notional in (extra or {}).items():
+            exposure[symbol] = exposure.get(symbol, 0.0) + notional
+        return exposure
+
+    def _portfolio_risk(self, exposure):
+        symbols = [s for s, value in exposure.items() if value and len(self._windows.get(s, ()))]
+        if not symbols:
+            return 0.0, 0.0
+        windows = [self._windows[s] for s in symbols]
+        common = functools.reduce(np.intersect1d, [window.periods() for window in windows])
+        n = len(common)
+        if n < 2:
+            return 0.0, 0.0
+        returns = np.vstack([window.values()[np.isin(window.periods(), common)] for window in windows])
+        pnl = np.sort(np.array([exposure[s] for s in symbols]) @ returns)
+        lo, frac = _quantile_index(n, self.confidence)
+        quantile = pnl[lo] + frac * (pnl[min(lo + 1, n - 1)] - pnl[lo])
+        return max(-quantile, 0.0), max(-pnl[:lo + 1].mean(), 0.0)
+
+    def portfolio_risk(self):
+        """(VaR, CVaR) en USD de las posiciones abiertas."""
+        if self._portfolio is None:
+            self._portfolio = self._portfolio_risk(self.exposure())
+        return self._portfolio
+
+    def allows_entry(self, symbol, notional):
+        """True si con la nueva posición el CVaR de la cartera sigue por debajo del límite."""
+        _, cvar = self._portfolio_risk(self.exposure({symbol: notional}))
+        return cvar <= self.max_portfolio_cvar * self.budget
+
+def rolling_var(returns, window=RISK_WINDOW, confidence=RISK_CONFIDENCE):
+    """VaR y CVaR históricos de cada ventana móvil de `returns` (modo por lotes para backtests).
+
+    El valor i corresponde a la ventana que termina en la vela i; las primeras
+    window - 1 posiciones son NaN.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    var = np.full(len(returns), np.nan)
+    cvar = np.full(len(returns), np.nan)
+    if len(returns) < window or window < 2:
+        return var, cvar
+    windows = np.sort(sliding_window_view(returns, window), axis=1)
+    lo, frac = _quantile_index(window, confidence)
+    quantile = windows[:, lo] + frac * (windows[:, min(lo + 1, window - 1)] - windows[:, lo])
+    var[window - 1:] = np.maximum(-quantile, 0)
+    cvar[window - 1:] = np.maximum(-windows[:, :lo + 1].mean(axis=1), 0)
+    return var, cvar
+
+def bootstrap_var(returns, confidence=RISK_CONFIDENCE, horizon=1, n_samples=10_000, seed=None):
+    """VaR y CVaR a `horizon` velas remuestreando rentabilidades históricas con reemplazo."""
+    returns = np.asarray(returns, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    paths = np.prod(1 + rng.choice(returns, size=(n_samples, horizon)), axis=1) - 1
+    quantile = np.percentile(paths, (1 - confidence) * 100)
+    return max(-quantile, 0.0), max(-paths[paths <= quantile].mean(), 0.0)
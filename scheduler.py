@@ -0,0 +1,88 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from trading_bot.config import REQUEST_RATE_LIMIT, REQUEST_BURST, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL, \
+    DEFAULT_POLL_INTERVAL, POLL_REFERENCE_MOVE, POLL_SAFETY_FACTOR, ENTRY_PRIORITY
+
+# Prioridad de las peticiones de la tarea actual: menor valor = se atiende antes
+_request_priority = ContextVar("request_priority", default=ENTRY_PRIORITY)
+
+@contextmanager
+def request_priority(priority):
+    """Fija la prioridad de las peticiones al exchange hechas dentro del bloque."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+def current_priority():
+    return _request_priority.get()
+
+class TokenBucket:
+    """Presupuesto global de peticiones por segundo compartido por todos los símbolos.
+
+    Cuando no quedan tokens, las peticiones esperan en un heap y se atienden
+    por prioridad (las posiciones cerca de una salida primero).
+    """
+
+    def __init__(self, rate=REQUEST_RATE_LIMIT, capacity=REQUEST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._dispatcher = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority=None):
+        priority = current_priority() if priority is None else priority
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            self._refill()
+            while self._waiters and self._tokens >= 1:
+                _, _, future = heapq.heappop(self._waiters)
+                if future.done():  # El llamador se canceló mientras esperaba
+                    continue
+                self._tokens -= 1
+                future.set_result(None)
+            if self._waiters:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def poll_interval(price=None, atr=None, exit_prices=()):
+    """Segundos hasta la próxima consulta de un símbolo según su volatilidad y la distancia a las salidas.
+
+    Con volatilidad horaria relativa v (ATR / precio), el tiempo típico para
+    recorrer una distancia relativa d es 3600 * (d / v)^2 segundos.
+    """
+    if not price or not atr or math.isnan(atr):
+        return DEFAULT_POLL_INTERVAL
+    volatility = atr / price
+    distance = min([abs(price - level) / price for level in exit_prices], default=POLL_REFERENCE_MOVE)
+    seconds = POLL_SAFETY_FACTOR * 3600 * (distance / volatility) ** 2
+    return min(max(seconds, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+def exit_priority(price, atr, exit_prices):
+    """Distancia a la salida más cercana en unidades de ATR (menor = más urgente)."""
+    if not price or not atr or math.isnan(atr) or not exit_prices:
+        return ENTRY_PRIORITY
+    return min(min(abs(price - level) for level in exit_prices) / atr, ENTRY_PRIORITY)
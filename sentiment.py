@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from trading_bot.config import SENTIMENT_TTL, SENTIMENT_MAX_AGE, SENTIMENT_RETRY_INTERVAL, SENTIMENT_HISTORY_DAYS, \
+    SENTIMENT_INDEX_WEIGHT, SENTIMENT_MEMO_SIZE, SENTIMENT_BATCH_SIZE, SENTIMENT_WORKERS
+
+# Ninguna lectura de este módulo hace E/S: el índice y las puntuaciones se refrescan en segundo plano
+# y las decisiones de entrada (y los backtests) sólo leen el último valor guardado.
+
+FEAR_AND_GREED_URL = "https://api.alternative.me/fng/?limit={limit}"
+
+def parse_fear_and_greed(response):
+    """(timestamps, valores, clasificación más reciente) de una respuesta de la API, en orden cronológico."""
+    data = sorted(response["data"], key=lambda row: int(row["timestamp"]))
+    times = np.array([int(row["timestamp"]) for row in data], dtype=np.int64)
+    values = np.array([float(row["value"]) for row in data], dtype=np.float64)
+    return times, values, data[-1]["value_classification"]
+
+def fetch_fear_and_greed(limit=1):
+    import requests
+    response = requests.get(FEAR_AND_GREED_URL.format(limit=limit), timeout=10)
+    response.raise_for_status()
+    return parse_fear_and_greed(response.json())
+
+class SentimentIndex:
+    """Índice Fear & Greed cacheado durante `ttl` segundos con revalidación en segundo plano.
+
+    Un valor caducado se sigue devolviendo mientras un hilo lo refresca
+    (stale-while-revalidate); pasados `max_age` segundos deja de usarse. El
+    histórico diario descargado queda en memoria para los backtests.
+    """
+
+    def __init__(self, ttl=SENTIMENT_TTL, max_age=SENTIMENT_MAX_AGE, retry_interval=SENTIMENT_RETRY_INTERVAL,
+                 fetch=fetch_fear_and_greed):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.fetch = fetch
+        self.value = self.classification = None
+        self.updated = None  # time.monotonic() de la última descarga
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._failed = -np.inf
+
+    def store(self, times, values, classification):
+        with self._lock:
+            merged = dict(zip(self.times.tolist(), self.values.tolist()))
+            merged.update(zip(times.tolist(), values.tolist()))
+            order = sorted(merged)
+            self.times = np.array(order, dtype=np.int64)
+            self.values = np.array([merged[t] for t in order], dtype=np.float64)
+            self.value = float(values[-1])
+            self.classification = classification
+            self.updated = time.monotonic()
+
+    def refresh(self, limit=1):
+        self.store(*self.fetch(limit))
+
+    async def arefresh(self, exchange, limit=1):
+        response = await exchange.get_json(FEAR_AND_GREED_URL.format(limit=limit))
+        self.store(*parse_fear_and_greed(response))
+
+    def age(self):
+        return np.inf if self.updated is None else time.monotonic() - self.updated
+
+    def peek(self, revalidate=True):
+        """(valor, clasificación) sin esperar nunca; None si no hay un valor utilizable."""
+        age, current = self.age(), (self.value, self.classification)
+        if revalidate and age > self.ttl:
+            self._revalidate()
+        return None if age > self.max_age else current
+
+    def get(self):
+        """Como peek(), pero si aún no hay ningún valor lo descarga y espera."""
+        if self.updated is None:
+            try:
+                self.refresh()
+            except Exception as e:
+                self._failed = time.monotonic()
+                logging.error(f"Error al obtener el índice Fear & Greed: {e}")
+        return self.peek()
+
+    def _revalidate(self):
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._failed < self.retry_interval:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="sentiment-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self._failed = time.monotonic()
+            logging.error(f"Error al revalidar el índice Fear & Greed: {e}")
+        finally:
+            self._refreshing = False
+
+    def score(self):
+        """Índice actual llevado a [-1, 1] (0 = neutral); NaN si no hay valor utilizable."""
+        current = self.peek(revalidate=False)
+        return np.nan if current is None else (current[0] - 50.0) / 50.0
+
+    def scores_at(self, times):
+        """Índice en [-1, 1] vigente en cada timestamp (el último publicado antes); NaN sin datos."""
+        times = np.asarray(times)
+        scores = np.full(len(times), np.nan)
+        if len(self.times):
+            i = np.searchsorted(self.times, times, side="right") - 1
+            known = i >= 0
+            scores[known] = (self.values[i[known]] - 50.0) / 50.0
+        return scores
+
+def _text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def _polarity(texts):
+    from textblob import TextBlob  # Carga diferida: sólo la usa el análisis de sentimiento
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+class TextScorer:
+    """Polaridad de textos por lotes: sin duplicados, con memoria LRU por hash y repartida en un pool de hilos."""
+
+    def __init__(self, memo_size=SENTIMENT_MEMO_SIZE, batch_size=SENTIMENT_BATCH_SIZE, workers=SENTIMENT_WORKERS,
+                 polarity=_polarity):
+        self.memo_size = memo_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.polarity = polarity
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def score(self, texts):
+        """Polaridad en [-1, 1] de cada texto (array alineado con `texts`)."""
+        keys = [_text_key(text) for text in texts]
+        known, missing = {}, {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    known[key] = self._memo[key]
+                elif key not in missing:
+                    missing[key] = text
+        if missing:
+            known.update(self._remember(list(missing), self._score_missing(list(missing.values()))))
+        return np.array([known[key] for key in keys], dtype=np.float64)
+
+    def _score_missing(self, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.workers <= 1 or len(batches) == 1:
+            return [score for batch in batches for score in self.polarity(batch)]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="sentiment")
+        return [score for scores in self._pool.map(self.polarity, batches) for score in scores]
+
+    def _remember(self, keys, scores):
+        scored = dict(zip(keys, scores))
+        with self._lock:
+            self._memo.update(scored)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return scored
+
+    async def ascore(self, texts):
+        return await asyncio.to_thread(self.score, texts)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+class SentimentFeed:
+    """Valor de sentimiento por símbolo en [-1, 1], leído en O(1) por buy_crypto y los backtests.
+
+    Combina el índice Fear & Greed (común a todos los símbolos) con la última
+    puntuación de textos de cada símbolo; si sólo se conoce una parte se usa
+    ésa y, sin ninguna, el valor es NaN (desconocido, no bloquea entradas).
+    """
+
+    def __init__(self, index=None, scorer=None, index_weight=SENTIMENT_INDEX_WEIGHT, refresh_interval=SENTIMENT_TTL):
+        self.index = index or SentimentIndex()
+        self.scorer = scorer or TextScorer()
+        self.index_weight = index_weight
+        self.refresh_interval = refresh_interval
+        self.text_scores = {}
+
+    def feature(self, symbol):
+        index = self.index.score()
+        text = self.text_scores.get(symbol, np.nan)
+        if np.isnan(index):
+            return text
+        if np.isnan(text):
+            return index
+        return self.index_weight * index + (1 - self.index_weight) * text
+
+    def series(self, times):
+        """Sentimiento vigente en cada timestamp para los backtests (sólo el índice tiene histórico)."""
+        return self.index.scores_at(times)
+
+    async def update_texts(self, symbol, texts):
+        """Puntúa `texts` (noticias, mensajes...) fuera del bucle de eventos y guarda su media para el símbolo."""
+        if not texts:
+            return self.text_scores.get(symbol, np.nan)
+        self.text_scores[symbol] = float(np.mean(await self.scorer.ascore(texts)))
+        return self.text_scores[symbol]
+
+    async def run(self, exchange, history_days=SENTIMENT_HISTORY_DAYS):
+        # La primera descarga trae el histórico diario; después sólo el último valor
+        limit = history_days
+        while True:
+            try:
+                await self.index.arefresh(exchange, limit=limit)
+                limit = 1
+                await asyncio.sleep(self.refresh_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Se conserva el valor anterior hasta que caduca del todo
+                logging.error(f"Error al refrescar el índice Fear & Greed: {e}")
+                await asyncio.sleep(self.index.retry_interval)
+
+    def close(self):
+        self.scorer.close()
+
+_feed = None
+
+def set_sentiment_feed(feed):
+    """Sustituye el feed compartido del proceso (p. ej. por uno que recibe los valores de otro proceso)."""
+    global _feed
+    _feed = feed
+
+def get_sentiment_feed():
+    """Devuelve el feed de sentimiento compartido del proceso."""
+    global _feed
+    if _feed is None:
+        _feed = SentimentFeed()
+    return _feed
@@ -8,11 +8,14 @@ setup(
         'numpy',
         'pandas',
         'ta-lib',
-        'bayesian-optimization',
+        'bayesian-optimization<2',
         'binance',
         'prometheus-client',
         'pytest',
         'dydx_v4_client',
+        'websockets',
+        'aiohttp',
+        'scipy',
     ],
     entry_points={
         'console_scripts': [
@@ -0,0 +1,549 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import signal
+import time
+import zlib
+import numpy as np
+from trading_bot.app import AppContext, initialize_client
+from trading_bot.candles import get_candle_store
+from trading_bot.exchange import ExchangeClient
+from trading_bot.journal import get_journal, set_journal
+from trading_bot.metadata import BalanceLedger
+from trading_bot.portfolio import snapshot_closes, allocations_from_closes
+from trading_bot.risk import RiskEngine
+from trading_bot.scheduler import TokenBucket
+from trading_bot.sentiment import get_sentiment_feed, set_sentiment_feed
+from trading_bot.config import SYMBOLS, BUDGET, METRICS_PORT, EXCHANGE_SIMULATOR, SHUTDOWN_TIMEOUT, SHARD_WORKERS, \
+    SHARD_START_METHOD, SHARD_MONITOR_INTERVAL, SHARD_RESPAWN, SHARD_PRICE_INTERVAL, PORTFOLIO_REBALANCE_INTERVAL, \
+    PORTFOLIO_LOOKBACK, REQUEST_RATE_LIMIT, REQUEST_BURST, SENTIMENT_ENABLED
+
+# Los mensajes entre procesos son tuplas pequeñas (tipo, ...) por un Pipe; los cierres y tiempos para
+# sembrar el riesgo y optimizar la cartera viajan como bytes de float64/int64, nunca como DataFrames.
+
+def rate_share(workers):
+    """(peticiones/s, ráfaga) de cada proceso: el coordinador y los workers se reparten el límite global."""
+    processes = max(workers, 1) + 1
+    return REQUEST_RATE_LIMIT / processes, max(REQUEST_BURST / processes, 1)
+
+def assign_shards(symbols, workers):
+    """símbolo -> worker con rendezvous hashing: al quitar o añadir un worker sólo se mueven sus símbolos."""
+    if not workers:
+        return {}
+    return {symbol: max(workers, key=lambda worker: zlib.crc32(f"{worker}:{symbol}".encode()))
+            for symbol in symbols}
+
+# Lado del worker
+
+class CoordinatorChannel:
+    """Extremo del worker: envía mensajes al coordinador y atiende sus respuestas desde el bucle de eventos.
+
+    "stop" sólo activa `stopping`: el canal sigue abierto mientras el worker
+    cierra posiciones, para que ventas y registros lleguen al coordinador, y
+    se cierra con close() o cuando el coordinador desaparece.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.balance = 0.0
+        self.symbols = None
+        self.on_assign = None
+        self.on_allocations = None
+        self.sentiment = {}  # símbolo -> último valor de sentimiento calculado por el coordinador
+        self.stopping = asyncio.Event()
+        self.closed = asyncio.Event()
+        self._ids = itertools.count()
+        self._pending = {}
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_readable)
+
+    def send(self, message):
+        if not self.closed.is_set():
+            try:
+                self.conn.send(message)
+            except (BrokenPipeError, OSError):
+                self.close()
+
+    async def request(self, kind, *args):
+        """Envía (kind, id, *args) y espera la respuesta del coordinador con ese id; False sin coordinador."""
+        if self.closed.is_set():
+            return False
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self.send((kind, request_id, *args))
+        return await future
+
+    def _on_readable(self):
+        try:
+            while self.conn.poll():
+                self._handle(self.conn.recv())
+        except (EOFError, OSError):
+            self.close()
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == "reply":
+            future = self._pending.pop(message[1], None)
+            if future is not None and not future.done():
+                future.set_result(message[2])
+        elif kind == "balance":
+            self.balance = message[1]
+        elif kind == "assign":
+            self.symbols = list(message[1])
+            if self.on_assign is not None:
+                self.on_assign(self.symbols)
+        elif kind == "allocations":
+            if self.on_allocations is not None:
+                self.on_allocations(dict(message[1]))
+        elif kind == "sentiment":
+            self.sentiment.update(message[1])
+        elif kind == "stop":
+            self.stopping.set()
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        self.conn.close()
+        self.closed.set()
+        self.stopping.set()
+        # Sin coordinador no se concede ninguna reserva pendiente
+        for future in self._pending.values():
+            if not future.done():
+                future.set_result(False)
+        self._pending.clear()
+
+class SharedLedger:
+    """Saldo del coordinador visto desde un worker, con la interfaz de BalanceLedger.
+
+    Cada compra reserva su importe en el coordinador antes de enviar la
+    orden, así que dos workers nunca gastan el mismo presupuesto.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def available(self):
+        return self.channel.balance
+
+    async def reserve(self, amount, symbol=None):
+        return await self.channel.request("reserve", symbol, amount)
+
+    def release(self, amount, symbol=None):
+        self.channel.send(("release", symbol))
+
+    def apply_fill(self, side, price, quantity):
+        self.channel.send(("ledger_fill", side, price, quantity))
+
+class SharedRisk:
+    """RiskEngine local del worker que además informa al coordinador de precios, ejecuciones y cierres.
+
+    El riesgo de cada símbolo se calcula aquí; el límite de CVaR de la cartera
+    completa lo aplica el coordinador al conceder cada reserva.
+    """
+
+    def __init__(self, channel, local, price_interval=SHARD_PRICE_INTERVAL):
+        self.channel = channel
+        self.local = local
+        self.price_interval = price_interval
+        self._sent = {}
+
+    def symbol_risk(self, symbol):
+        return self.local.symbol_risk(symbol)
+
+    def allows_entry(self, symbol, notional):
+        return self.local.allows_entry(symbol, notional)
+
+    def update_price(self, symbol, price, timestamp=None):
+        self.local.update_price(symbol, price, timestamp)
+        now = time.monotonic()
+        if now - self._sent.get(symbol, -np.inf) >= self.price_interval:
+            self._sent[symbol] = now
+            self.channel.send(("price", symbol, price, time.time() if timestamp is None else timestamp))
+
+    def on_fill(self, symbol, side, price, quantity):
+        self.local.on_fill(symbol, side, price, quantity)
+        self.channel.send(("fill", symbol, side, price, quantity))
+
+    def share_seed(self, symbol):
+        store = get_candle_store(symbol, "1H")
+        closes = np.ascontiguousarray(store.closes(), dtype=np.float64)
+        times = np.ascontiguousarray(store.column("time"), dtype=np.int64)
+        self.channel.send(("seed", symbol, closes.tobytes(), times.tobytes()))
+
+async def _share_closes(channel, supervisor, interval=PORTFOLIO_REBALANCE_INTERVAL):
+    # La cartera se optimiza en el coordinador sobre todos los símbolos: cada worker le manda sus cierres
+    while not channel.closed.is_set():
+        await asyncio.sleep(interval)
+        for symbol, closes in zip(supervisor.symbols, snapshot_closes(supervisor.symbols)):
+            channel.send(("closes", symbol, np.ascontiguousarray(closes, dtype=np.float64).tobytes()))
+
+class RemoteSentiment:
+    """Feed de sentimiento del worker: sólo lee los valores que publica el coordinador, sin descargar nada."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def feature(self, symbol):
+        return self.channel.sentiment.get(symbol, np.nan)
+
+    def series(self, times):
+        return np.full(len(times), np.nan)
+
+    def close(self):
+        pass
+
+class RemoteJournal:
+    """Registro de transacciones que reenvía cada fila al coordinador, dueño del fichero."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def record(self, action, symbol, price, change, quantity, remaining_balance):
+        self.channel.send(("journal", action, symbol, float(price), float(change), float(quantity),
+                           float(remaining_balance)))
+
+    def flush(self, timeout=5):
+        pass
+
+    def close(self):
+        pass
+
+def _worker_process(worker_id, conn, symbols, simulator, universe, rate_limit):
+    # Ctrl+C llega a todo el grupo de procesos: sólo el coordinador decide cuándo parar
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=f"[shard-{worker_id}] %(levelname)s %(message)s")
+    asyncio.run(_run_worker(worker_id, conn, symbols, simulator, universe, rate_limit))
+
+async def _run_worker(worker_id, conn, symbols, simulator, universe, rate_limit):
+    from trading_bot.trading import TradingSupervisor
+    channel = CoordinatorChannel(conn)
+    set_journal(RemoteJournal(channel))
+    set_sentiment_feed(RemoteSentiment(channel))
+    if simulator is True:
+        from trading_bot.simulator import ExchangeSimulator
+        simulator = ExchangeSimulator(universe)
+    # Saldo y sentimiento los lleva el coordinador: el worker no los consulta por su cuenta
+    rate, burst = rate_limit
+    async with AppContext(symbols=symbols, simulator=simulator, metrics_port=METRICS_PORT + 1 + worker_id,
+                          rate_limit=rate, burst=burst, reconcile_balance=False, sentiment=False) as app:
+        if not await app.start():
+            logging.error("No se pudo conectar con el exchange; el worker termina")
+            return
+        risk = SharedRisk(channel, app.risk)
+        for symbol in symbols:
+            risk.share_seed(symbol)
+        supervisor = TradingSupervisor(app.exchange, symbols, BUDGET, stream=app.stream, metadata=app.metadata,
+                                       ledger=SharedLedger(channel), risk=risk, rebalance_interval=0)
+
+        def assign(new_symbols):
+            added = [symbol for symbol in new_symbols if symbol not in supervisor.symbols]
+            app.warm_up(added)
+            for symbol in added:
+                risk.share_seed(symbol)
+            supervisor.assign(new_symbols)
+            logging.info(f"Símbolos asignados: {len(new_symbols)} ({len(added)} nuevos)")
+
+        def allocate(allocations):
+            supervisor.allocations = allocations
+
+        channel.on_assign = assign
+        channel.on_allocations = allocate
+        supervisor.start()
+        sharing = asyncio.create_task(_share_closes(channel, supervisor))
+        await channel.stopping.wait()
+        sharing.cancel()
+        # El canal sigue abierto: las ventas del cierre llegan al coordinador antes de salir
+        await supervisor.shutdown()
+    channel.close()
+
+# Lado del coordinador
+
+class _Worker:
+    def __init__(self, worker_id, process, conn, symbols):
+        self.id = worker_id
+        self.process = process
+        self.conn = conn
+        self.symbols = symbols
+        self.reserved = {}  # símbolo -> importe apartado para una compra en curso
+        self.started = time.monotonic()
+
+class ShardCoordinator:
+    """Reparte los símbolos entre procesos worker y es el único dueño del estado compartido.
+
+    Cada worker ejecuta su propio TradingSupervisor con sus símbolos; el
+    coordinador lleva el presupuesto comprometido (posiciones abiertas más
+    reservas en curso), el límite de CVaR de la cartera completa, la
+    asignación óptima de la cartera (que envía a los workers) y el registro
+    de transacciones. Si un worker muere, su sustituto hereda su id y sus
+    símbolos; si no se sustituye, sólo sus símbolos se reparten entre el resto.
+    """
+
+    def __init__(self, symbols=SYMBOLS, workers=SHARD_WORKERS, budget=BUDGET, ledger=None, risk=None,
+                 simulator=EXCHANGE_SIMULATOR, respawn=SHARD_RESPAWN, monitor_interval=SHARD_MONITOR_INTERVAL,
+                 start_method=SHARD_START_METHOD, target=_worker_process,
+                 rebalance_interval=PORTFOLIO_REBALANCE_INTERVAL):
+        self.symbols = list(symbols)
+        self.n_workers = workers
+        self.budget = budget
+        self.ledger = ledger
+        self.risk = risk or RiskEngine(budget=budget)
+        self.simulator = simulator
+        self.respawn = respawn
+        self.monitor_interval = monitor_interval
+        self.target = target
+        self.rebalance_interval = rebalance_interval
+        self.allocations = {}
+        self._closes = {}  # símbolo -> últimos cierres recibidos de su worker
+        self.positions = {}  # símbolo -> (cantidad, coste)
+        self.workers = {}
+        self.assignment = {}
+        self._context = multiprocessing.get_context(start_method)
+        self._ids = itertools.count()
+        self._monitor_task = None
+        self._rebalance_task = None
+        self._stopping = False
+
+    # Presupuesto
+
+    def reserved(self):
+        return sum(sum(worker.reserved.values()) for worker in self.workers.values())
+
+    def deployed(self):
+        return sum(cost for _, cost in self.positions.values()) + self.reserved()
+
+    def available_balance(self):
+        if self.ledger is not None:
+            return self.ledger.available() - self.reserved()
+        return self.budget - self.deployed()
+
+    def _reserve(self, worker, symbol, amount):
+        if self.deployed() + amount > self.budget or amount > self.available_balance():
+            return False
+        if not self.risk.allows_entry(symbol, amount):
+            return False
+        worker.reserved[symbol] = worker.reserved.get(symbol, 0.0) + amount
+        return True
+
+    def _apply_fill(self, symbol, side, price, quantity):
+        self.risk.on_fill(symbol, side, price, quantity)
+        held, cost = self.positions.get(symbol, (0.0, 0.0))
+        if side == "buy":
+            held, cost = held + quantity, cost + price * quantity
+        else:
+            cost -= cost * min(quantity / held, 1.0) if held else 0.0
+            held -= quantity
+        if held > 1e-12:
+            self.positions[symbol] = (held, cost)
+        else:
+            self.positions.pop(symbol, None)
+
+    # Mensajes
+
+    def _send(self, worker, message):
+        try:
+            worker.conn.send(message)
+        except (BrokenPipeError, OSError):
+            pass  # El monitor se encarga del worker caído
+
+    def _broadcast_balance(self):
+        balance = self.available_balance()
+        for worker in list(self.workers.values()):
+            self._send(worker, ("balance", balance))
+
+    def _on_readable(self, worker_id):
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            return
+        try:
+            while worker.conn.poll():
+                self._handle(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            self._worker_lost(worker_id)
+
+    def _handle(self, worker, message):
+        kind = message[0]
+        if kind == "reserve":
+            _, request_id, symbol, amount = message
+            granted = self._reserve(worker, symbol, amount)
+            self._send(worker, ("reply", request_id, granted))
+            if granted:
+                self._broadcast_balance()
+        elif kind == "release":
+            if worker.reserved.pop(message[1], None) is not None:
+                self._broadcast_balance()
+        elif kind == "fill":
+            self._apply_fill(*message[1:])
+        elif kind == "ledger_fill":
+            if self.ledger is not None:
+                self.ledger.apply_fill(*message[1:])
+            self._broadcast_balance()
+        elif kind == "price":
+            self.risk.update_price(*message[1:])
+        elif kind == "seed":
+            closes = np.frombuffer(message[2], dtype=np.float64)
+            self.risk.seed(message[1], closes, np.frombuffer(message[3], dtype=np.int64))
+            self._closes[message[1]] = closes[-PORTFOLIO_LOOKBACK:]
+        elif kind == "closes":
+            self._closes[message[1]] = np.frombuffer(message[2], dtype=np.float64)
+        elif kind == "journal":
+            get_journal().record(*message[1:])
+
+    # Workers
+
+    def _spawn(self, worker_id, symbols):
+        parent, child = self._context.Pipe()
+        process = self._context.Process(target=self.target, name=f"shard-{worker_id}", daemon=True,
+                                        args=(worker_id, child, symbols, self.simulator, self.symbols,
+                                              rate_share(self.n_workers)))
+        process.start()
+        child.close()
+        self.workers[worker_id] = _Worker(worker_id, process, parent, symbols)
+        asyncio.get_running_loop().add_reader(parent.fileno(), self._on_readable, worker_id)
+        self._send(self.workers[worker_id], ("balance", self.available_balance()))
+        if self.allocations:
+            self._send(self.workers[worker_id], ("allocations", self.allocations))
+        logging.info(f"Worker {worker_id} arrancado con {len(symbols)} símbolos (pid {process.pid})")
+
+    def _shards(self, worker_ids):
+        self.assignment = assign_shards(self.symbols, worker_ids)
+        return {worker_id: sorted(s for s, w in self.assignment.items() if w == worker_id) for worker_id in worker_ids}
+
+    async def start(self):
+        worker_ids = [next(self._ids) for _ in range(max(self.n_workers, 1))]
+        for worker_id, symbols in self._shards(worker_ids).items():
+            self._spawn(worker_id, symbols)
+        self._monitor_task = asyncio.create_task(self._monitor())
+        if self.rebalance_interval:
+            self._rebalance_task = asyncio.create_task(self._rebalance_loop())
+
+    def rebalance(self):
+        """Recalcula el reparto con los workers vivos y envía a cada uno su lista si ha cambiado."""
+        for worker_id, symbols in self._shards(list(self.workers)).items():
+            worker = self.workers[worker_id]
+            if symbols != worker.symbols:
+                worker.symbols = symbols
+                self._send(worker, ("assign", symbols))
+
+    def add_symbols(self, symbols):
+        self.symbols.extend(symbol for symbol in symbols if symbol not in self.symbols)
+        self.rebalance()
+
+    def _drain(self, worker):
+        # Mensajes que el worker envió antes de terminar y aún no se han leído (ventas, registro)
+        try:
+            while worker.conn.poll():
+                self._handle(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+
+    def _worker_lost(self, worker_id):
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            return
+        self._drain(worker)
+        del self.workers[worker_id]
+        asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        if self._stopping:
+            return
+        orphans = [symbol for symbol in worker.symbols if symbol in self.positions]
+        logging.error(f"Worker {worker_id} caído (código {worker.process.exitcode}); "
+                      f"se liberan {sum(worker.reserved.values()):.2f} reservados y se reasignan "
+                      f"{len(worker.symbols)} símbolos")
+        if orphans:
+            logging.warning(f"Posiciones abiertas sin vigilancia tras la caída: {', '.join(orphans)}")
+        # Un worker que cae nada más arrancar falla en la inicialización: sustituirlo entraría en bucle.
+        # El sustituto hereda el id, así el reparto no cambia y ningún superviviente pierde sus símbolos
+        # (ni las posiciones abiertas que vigila)
+        if self.respawn and time.monotonic() - worker.started >= self.monitor_interval:
+            self._spawn(worker_id, worker.symbols)
+        if not self.workers:
+            logging.error("No queda ningún worker vivo")
+        self.rebalance()
+        self._broadcast_balance()
+
+    async def rebalance_portfolio(self):
+        """Optimiza la cartera con los cierres de todos los workers y envía las fracciones a cada uno."""
+        symbols = list(self.symbols)
+        # Los arrays recibidos no se modifican después (cada mensaje trae uno nuevo): el hilo puede leerlos
+        closes = [self._closes[symbol] for symbol in symbols]
+        self.allocations = await asyncio.to_thread(allocations_from_closes, symbols, closes)
+        for worker in list(self.workers.values()):
+            self._send(worker, ("allocations", self.allocations))
+        return self.allocations
+
+    async def _rebalance_loop(self):
+        while True:
+            # Hasta que todos los workers han enviado sus cierres se vuelve a mirar a menudo
+            if not all(symbol in self._closes for symbol in self.symbols):
+                await asyncio.sleep(self.monitor_interval)
+                continue
+            try:
+                await self.rebalance_portfolio()
+            except Exception as e:
+                logging.error(f"Error al recalcular la cartera: {e}")
+            await asyncio.sleep(self.rebalance_interval)
+
+    def _broadcast_sentiment(self):
+        feed = get_sentiment_feed()
+        values = {symbol: float(feed.feature(symbol)) for symbol in self.symbols}
+        for worker in list(self.workers.values()):
+            self._send(worker, ("sentiment", values))
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            self._broadcast_sentiment()
+            for worker_id, worker in list(self.workers.items()):
+                if not worker.process.is_alive():
+                    self._worker_lost(worker_id)
+
+    async def stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """Pide a los workers que cierren sus posiciones y termina los que no lo hagan en `timeout` segundos."""
+        self._stopping = True
+        for task in (self._monitor_task, self._rebalance_task):
+            if task is not None:
+                task.cancel()
+        for worker in self.workers.values():
+            self._send(worker, ("stop",))
+        deadline = time.monotonic() + timeout
+        # Mientras esperan se siguen atendiendo sus mensajes (ventas, registro)
+        for worker in list(self.workers.values()):
+            await asyncio.to_thread(worker.process.join, max(deadline - time.monotonic(), 0))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                await asyncio.to_thread(worker.process.join)
+        for worker_id in list(self.workers):
+            self._worker_lost(worker_id)
+
+async def run_sharded(symbols=SYMBOLS, workers=SHARD_WORKERS, simulator=EXCHANGE_SIMULATOR):
+    """Ejecuta el bot repartido en `workers` procesos hasta recibir SIGINT/SIGTERM."""
+    client, _, _ = await initialize_client(simulator, symbols)
+    if not client:
+        return
+    # El coordinador también consume del límite global de peticiones (saldo y sentimiento)
+    exchange = ExchangeClient(client, rate_limiter=TokenBucket(*rate_share(workers)))
+    ledger = BalanceLedger(exchange)
+    await ledger.reconcile()
+    tasks = [asyncio.create_task(ledger.run())]
+    if SENTIMENT_ENABLED and not simulator:
+        tasks.append(asyncio.create_task(get_sentiment_feed().run(exchange)))
+    coordinator = ShardCoordinator(symbols, workers, ledger=ledger, simulator=simulator)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    await coordinator.start()
+    try:
+        await stopping.wait()
+    finally:
+        await coordinator.stop()
+        for task in tasks:
+            task.cancel()
+        await exchange.close()
+        get_sentiment_feed().close()
+        get_journal().close()
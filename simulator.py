@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+import numpy as np
+from trading_bot.benchmarks.synthetic import SyntheticClient, candle_payload
+from trading_bot.candles import RESOLUTION_SECONDS, format_candle_time
+from trading_bot.history import get_history_store
+from trading_bot.config import SYMBOLS, SIMULATOR_BARS, SIMULATOR_LATENCY, SIMULATOR_JITTER, SIMULATOR_ERROR_RATE, \
+    SIMULATOR_RATE_LIMIT, SIMULATOR_BALANCE, SIMULATOR_TICK_INTERVAL, SIMULATOR_VOLATILITY
+
+class SimulatedExchangeError(Exception):
+    """Fallo inyectado por el simulador (equivale a un 5xx del exchange)."""
+
+class RateLimitExceeded(SimulatedExchangeError):
+    """Petición rechazada por superar el límite del simulador (equivale a un 429)."""
+
+class EndpointStats:
+    def __init__(self, window=10_000):
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    def summary(self, elapsed):
+        latencies = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {"requests": self.requests, "errors": self.errors, "rejected": self.rejected,
+                "requests_per_second": self.requests / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+                "max_ms": float(latencies.max()) if len(latencies) else 0.0}
+
+class ExchangeSimulator:
+    """Exchange local con la forma del cliente del SDK (client.public / client.private).
+
+    Sirve velas (sintéticas o del histórico local), ticker, mercados y cuenta
+    con latencia, jitter, errores y límite de peticiones configurables, y
+    acepta órdenes que se ejecutan al precio actual. serve() abre además un
+    WebSocket en localhost con los canales v4_trades, v4_candles y v4_markets
+    del indexer para MarketStream. stats() resume throughput y latencias.
+    """
+
+    def __init__(self, symbols=SYMBOLS, bars=SIMULATOR_BARS, seed=0, latency=SIMULATOR_LATENCY,
+                 jitter=SIMULATOR_JITTER, error_rate=SIMULATOR_ERROR_RATE, rate_limit=SIMULATOR_RATE_LIMIT,
+                 balance=SIMULATOR_BALANCE, tick_interval=SIMULATOR_TICK_INTERVAL, volatility=SIMULATOR_VOLATILITY,
+                 resolution="1H", series=None):
+        self.interval = RESOLUTION_SECONDS.get(resolution, 3600)
+        self.series = series or SyntheticClient(symbols, bars, seed, resolution).series
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.balance = balance
+        self.tick_interval = tick_interval
+        self.volatility = volatility
+        self.positions = {}
+        self.orders = []
+        self._client_orders = {}
+        self.url = None
+        self.public = self.private = self
+        self._rng = np.random.default_rng(seed)
+        self._stats = {}
+        self._tokens = float(rate_limit or 0)
+        self._refilled = self._last_step = self._started = time.monotonic()
+        self._trades = {}
+        self._ws_messages = 0
+        self._connections = {}
+        self._server = None
+        self._broadcaster = None
+
+    @classmethod
+    def from_history(cls, symbols=SYMBOLS, resolution="1H", **kwargs):
+        """Simulador que sirve las velas del histórico local, desplazadas para que la última sea la actual."""
+        interval = RESOLUTION_SECONDS.get(resolution, 3600)
+        now = int(time.time() // interval) * interval
+        series = {}
+        for symbol in symbols:
+            history = get_history_store(symbol, resolution)
+            series[symbol] = {field: np.array(history.column(field))
+                              for field in ("time", "open", "high", "low", "close", "volume")}
+            if len(series[symbol]["time"]):
+                series[symbol]["time"] += now - series[symbol]["time"][-1]
+        return cls(symbols, resolution=resolution, series=series, **kwargs)
+
+    # Mercado
+
+    def price(self, symbol):
+        return float(self.series[symbol]["close"][-1])
+
+    def step(self, now=None):
+        """Mueve los precios por el tiempo transcurrido (como mucho una vez por `tick_interval`)."""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_step
+        if elapsed < self.tick_interval:
+            return False
+        self._last_step = now
+        candle_time = int(time.time() // self.interval) * self.interval
+        moves = self._rng.normal(0, self.volatility * math.sqrt(elapsed), len(self.series))
+        sizes = self._rng.exponential(1.0, len(self.series))
+        for (symbol, candles), move, size in zip(self.series.items(), moves, sizes):
+            price = float(candles["close"][-1]) * math.exp(move)
+            if candle_time > candles["time"][-1]:
+                # Nueva vela: abre al último cierre
+                for field, value in (("time", candle_time), ("open", candles["close"][-1]), ("high", price),
+                                     ("low", price), ("close", price), ("volume", 0.0)):
+                    candles[field] = np.append(candles[field], value)
+            candles["high"][-1] = max(candles["high"][-1], price)
+            candles["low"][-1] = min(candles["low"][-1], price)
+            candles["close"][-1] = price
+            candles["volume"][-1] += size
+            if self._server is not None:
+                self._trades.setdefault(symbol, []).append(
+                    {"id": str(self._rng.integers(1 << 62)), "side": "BUY" if move >= 0 else "SELL",
+                     "size": str(size), "price": str(price), "createdAt": format_candle_time(time.time())})
+        return True
+
+    # Peticiones
+
+    def _take_token(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def _request(self, endpoint):
+        stats = self._stats.setdefault(endpoint, EndpointStats())
+        stats.requests += 1
+        started = time.perf_counter()
+        if self.rate_limit and not self._take_token():
+            stats.rejected += 1
+            raise RateLimitExceeded(f"{endpoint}: límite de {self.rate_limit} peticiones/s superado")
+        await asyncio.sleep(max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            stats.errors += 1
+            raise SimulatedExchangeError(f"{endpoint}: error simulado del exchange")
+        if self._broadcaster is None:
+            self.step()
+        stats.latencies.append(time.perf_counter() - started)
+
+    async def get_candles(self, market, resolution=None, limit=100, **kwargs):
+        await self._request("candles")
+        n = len(self.series[market]["time"])
+        return {"candles": candle_payload(self.series[market], max(n - (limit or n), 0), n)}
+
+    async def get_ticker(self, market):
+        await self._request("ticker")
+        return {"ticker": {"price": str(self.price(market))}}
+
+    async def get_24_hr_stats(self, market):
+        await self._request("stats")
+        day = max(86400 // self.interval, 1)
+        return {"markets": {market: {"volume": str(self.series[market]["volume"][-day:].sum())}}}
+
+    def _markets(self, symbols):
+        return {symbol: {"ticker": symbol, "tickSize": "0.01", "stepSize": "0.0001",
+                         "oraclePrice": str(self.price(symbol))} for symbol in symbols}
+
+    async def get_markets(self, market=None):
+        await self._request("markets")
+        return {"markets": self._markets([market] if market else list(self.series))}
+
+    async def get_account(self):
+        await self._request("account")
+        return {"account": {"quoteBalance": str(self.balance),
+                            "openPositions": {s: {"size": str(q)} for s, q in self.positions.items() if q}}}
+
+    async def create_order(self, market, side, size, price=None, **kwargs):
+        """Ejecuta la orden completa al precio actual (el precio límite sólo se anota).
+
+        Un client_id ya visto devuelve la orden existente, como el exchange real.
+        """
+        await self._request("order")
+        client_id = kwargs.get("client_id")
+        if client_id is not None and client_id in self._client_orders:
+            return {"order": self._client_orders[client_id]}
+        size = float(size)
+        fill = self.price(market)
+        if side == "buy":
+            if size * fill > self.balance:
+                raise SimulatedExchangeError(f"{market}: saldo insuficiente para la orden")
+            self.balance -= size * fill
+            self.positions[market] = self.positions.get(market, 0.0) + size
+        else:
+            self.balance += size * fill
+            self.positions[market] = self.positions.get(market, 0.0) - size
+        order = {"id": str(len(self.orders) + 1), "market": market, "side": side, "size": str(size),
+                 "price": str(fill), "status": "FILLED"}
+        self.orders.append(order)
+        if client_id is not None:
+            self._client_orders[client_id] = order
+        return {"order": order}
+
+    # WebSocket del indexer
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """Abre el WebSocket en localhost y empieza a publicar; devuelve la URL para MarketStream."""
+        import websockets
+        self._server = await websockets.serve(self._handle_ws, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{host}:{port}"
+        self._broadcaster = asyncio.create_task(self._broadcast_loop())
+        logging.info(f"Simulador del exchange escuchando en {self.url}")
+        return self.url
+
+    async def _send(self, ws, message):
+        self._ws_messages += 1
+        await ws.send(json.dumps(message))
+
+    async def _handle_ws(self, ws, *args):
+        subscriptions = self._connections[ws] = {"v4_trades": set(), "v4_candles": set(), "v4_markets": False}
+        try:
+            await self._send(ws, {"type": "connected"})
+            async for raw in ws:
+                message = json.loads(raw)
+                if message.get("type") != "subscribe":
+                    continue
+                channel, key = message.get("channel"), message.get("id")
+                if channel == "v4_markets":
+                    subscriptions[channel] = True
+                    contents = {"markets": self._markets(list(self.series))}
+                elif channel == "v4_trades" and key in self.series:
+                    subscriptions[channel].add(key)
+                    contents = {"trades": list(reversed(self._trades.get(key, [])[-10:]))}
+                elif channel == "v4_candles" and key.split("/")[0] in self.series:
+                    subscriptions[channel].add(key)
+                    contents = {"candles": candle_payload(self.series[key.split("/")[0]],
+                                                          len(self.series[key.split("/")[0]]["time"]) - 1)}
+                else:
+                    continue
+                await self._send(ws, {"type": "subscribed", "channel": channel, "id": key, "contents": contents})
+        finally:
+            self._connections.pop(ws, None)
+
+    async def _broadcast_loop(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.step()
+            trades, self._trades = self._trades, {}
+            for ws, subscriptions in list(self._connections.items()):
+                try:
+                    for symbol in subscriptions["v4_trades"] & trades.keys():
+                        await self._send(ws, {"type": "channel_data", "channel": "v4_trades", "id": symbol,
+                                              "contents": {"trades": list(reversed(trades[symbol]))}})
+                    for key in subscriptions["v4_candles"]:
+                        candles = self.series[key.split("/")[0]]
+                        await self._send(ws, {"type": "channel_data", "channel": "v4_candles", "id": key,
+                                              "contents": candle_payload(candles, len(candles["time"]) - 1)[0]})
+                    if subscriptions["v4_markets"]:
+                        prices = {s: {"oraclePrice": str(self.price(s))} for s in self.series}
+                        await self._send(ws, {"type": "channel_data", "channel": "v4_markets",
+                                              "contents": {"oraclePrices": prices}})
+                except Exception as e:
+                    logging.debug(f"Simulador: cliente WebSocket desconectado: {e}")
+
+    async def close(self):
+        if self._broadcaster is not None:
+            self._broadcaster.cancel()
+            self._broadcaster = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # Estadísticas
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started
+        return {"elapsed_seconds": elapsed, "orders": len(self.orders), "balance": self.balance,
+                "ws_messages": self._ws_messages,
+                "endpoints": {name: stats.summary(elapsed) for name, stats in sorted(self._stats.items())}}
+
+    def report(self):
+        stats = self.stats()
+        lines = [f"{'endpoint':<10} {'peticiones':>10} {'errores':>8} {'rechazos':>8} {'pet/s':>8} "
+                 f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+        for name, s in stats["endpoints"].items():
+            lines.append(f"{name:<10} {s['requests']:>10} {s['errors']:>8} {s['rejected']:>8} "
+                         f"{s['requests_per_second']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+        lines.append(f"órdenes: {stats['orders']} | mensajes WebSocket: {stats['ws_messages']} | "
+                     f"saldo: {stats['balance']:.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,41 @@
+import math
+import numpy as np
+from trading_bot.config import ENTRY_VOLUME_FACTOR, RISK_PERCENTAGE, BUDGET, SENTIMENT_MIN_SCORE
+
+# Reglas de entrada y salida sin E/S: las usan el bucle en vivo (trading.py) y el replay de ticks (replay.py).
+# Sólo operaciones aritméticas para que numba pueda compilarlas dentro del bucle del replay.
+
+def volume_confirmation(volume, avg_volume):
+    """Volumen de 24h por encima de ENTRY_VOLUME_FACTOR veces el volumen medio por vela."""
+    return volume >= ENTRY_VOLUME_FACTOR * avg_volume
+
+def entry_signal(volume, avg_volume, macd, signal):
+    """Condición de entrada completa; admite escalares o arrays (se combina con &)."""
+    return volume_confirmation(volume, avg_volume) & (macd > signal)
+
+def sentiment_confirmation(score, min_score=SENTIMENT_MIN_SCORE):
+    """False sólo si el sentimiento se conoce y está por debajo de `min_score`; admite arrays (NaN = desconocido)."""
+    if min_score is None:
+        return np.full(np.shape(score), True)[()]
+    return np.logical_not(np.less(score, min_score))
+
+def risk_quantity(stop_distance, budget=BUDGET, risk_percentage=RISK_PERCENTAGE):
+    """Cantidad máxima para que tocar el stop cueste `risk_percentage` del presupuesto."""
+    return budget * risk_percentage / stop_distance
+
+def order_quantity(budget, allocation, price, max_quantity):
+    """Cantidad a comprar: la asignación del presupuesto, limitada por el riesgo (si se conoce)."""
+    quantity = budget * allocation / price
+    if not math.isnan(max_quantity) and max_quantity < quantity:
+        return max_quantity
+    return quantity
+
+def exit_levels(buy_price, atr, profit_threshold, trailing_stop):
+    """Precios de toma de beneficio y de stop; el stop se ensancha hasta el ATR si éste es mayor."""
+    stop = trailing_stop
+    if not math.isnan(atr) and atr / buy_price > stop:
+        stop = atr / buy_price
+    return buy_price * (1 + profit_threshold), buy_price * (1 - stop)
+
+def should_exit(price, take_profit, stop_price):
+    return price >= take_profit or price < stop_price
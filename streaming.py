@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import time
+import websockets
+from trading_bot.candles import get_candle_store
+from trading_bot.config import TESTNET, STREAM_QUEUE_SIZE, STREAM_RECONNECT_DELAY, STREAM_MAX_RECONNECT_DELAY, \
+    REST_FALLBACK_INTERVAL
+
+# Resolución del canal de velas del indexer -> clave de la caché de velas
+CANDLE_RESOLUTIONS = {"1HOUR": "1H", "1MIN": "1MIN", "5MINS": "5MINS", "15MINS": "15MINS", "1DAY": "1D"}
+
+class MarketStream:
+    """Feed de mercado por WebSocket con colas acotadas por símbolo y respaldo REST."""
+
+    def __init__(self, exchange=None, url=None, resolution="1HOUR", queue_size=STREAM_QUEUE_SIZE, recorder=None,
+                 risk=None, symbols=()):
+        self.exchange = exchange
+        self.recorder = recorder  # Opcional: graba las operaciones para el replay (replay.TickRecorder)
+        # Opcional: cada precio recibido de `symbols` (o de un símbolo suscrito) llega al motor de riesgo
+        self.risk = risk
+        self.symbols = set(symbols)
+        self.url = url or TESTNET.websocket_indexer
+        self.resolution = resolution
+        self.queue_size = queue_size
+        self.prices = {}
+        self.connected = asyncio.Event()
+        self._consumers = {}
+        self._ws = None
+        self._stopping = asyncio.Event()
+        self._fallback = None
+
+    def subscribe(self, symbol):
+        """Devuelve una cola nueva que recibirá las actualizaciones de `symbol`."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        new_symbol = symbol not in self._watched()
+        self._consumers.setdefault(symbol, []).append(queue)
+        if new_symbol and self._ws is not None:
+            asyncio.create_task(self._send_subscriptions(self._ws, [symbol]))
+        return queue
+
+    def unsubscribe(self, symbol, queue):
+        queues = self._consumers.get(symbol, [])
+        if queue in queues:
+            queues.remove(queue)
+
+    async def next_update(self, queue, timeout):
+        """Siguiente actualización de la cola, o None si no llega nada en `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _watched(self):
+        return self.symbols.union(self._consumers)
+
+    def _update_risk(self, symbol, price):
+        if self.risk is not None and price:
+            self.risk.update_price(symbol, price)
+
+    def _publish(self, symbol, channel, price, data=None):
+        update = {"symbol": symbol, "channel": channel, "price": price, "time": time.time(), "data": data}
+        if price:
+            self.prices[symbol] = price
+            self._update_risk(symbol, price)
+        for queue in self._consumers.get(symbol, ()):
+            if queue.full():
+                # Consumidor lento: se descarta la actualización más antigua
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    def _subscription_messages(self, symbols, markets=False):
+        messages = [{"type": "subscribe", "channel": "v4_markets"}] if markets else []
+        for symbol in symbols:
+            messages.append({"type": "subscribe", "channel": "v4_trades", "id": symbol})
+            messages.append({"type": "subscribe", "channel": "v4_candles", "id": f"{symbol}/{self.resolution}"})
+        return messages
+
+    async def _send_subscriptions(self, ws, symbols, markets=False):
+        for message in self._subscription_messages(symbols, markets):
+            await ws.send(json.dumps(message))
+
+    def handle_message(self, message):
+        channel = message.get("channel")
+        contents = message.get("contents") or {}
+        if channel == "v4_trades":
+            trades = contents.get("trades") or []
+            if trades and self.recorder is not None and message.get("type") != "subscribed":
+                # El mensaje de suscripción repite operaciones antiguas: sólo se graban las nuevas
+                self.recorder.record(message["id"], trades)
+            if trades:
+                # Las operaciones llegan de la más reciente a la más antigua
+                self._publish(message["id"], "trades", float(trades[0]["price"]), trades)
+        elif channel == "v4_markets":
+            markets = contents.get("oraclePrices") or contents.get("markets") or {}
+            watched = self._watched()
+            for symbol, market in markets.items():
+                if symbol in watched and market.get("oraclePrice"):
+                    self._publish(symbol, "ticker", float(market["oraclePrice"]), market)
+        elif channel == "v4_candles":
+            symbol, resolution = message["id"].split("/")
+            candles = contents.get("candles") or [contents]
+            store = get_candle_store(symbol, CANDLE_RESOLUTIONS.get(resolution, resolution))
+            store.update(candles)
+            if len(store):
+                # La vela en curso también es un precio vivo aunque no se publique como tal
+                self._update_risk(symbol, float(store.closes()[-1]))
+            self._publish(symbol, "candles", None, candles)
+
+    async def _poll_rest(self):
+        while not self.connected.is_set() and self.exchange is not None:
+            for symbol in list(self._consumers):
+                try:
+                    price = await self.exchange.get_price(symbol)
+                    self._publish(symbol, "rest", price)
+                except Exception as e:
+                    logging.error(f"{symbol}: Error al consultar el precio por REST: {e}")
+            await asyncio.sleep(REST_FALLBACK_INTERVAL)
+
+    def _start_fallback(self):
+        if self._fallback is None or self._fallback.done():
+            self._fallback = asyncio.create_task(self._poll_rest())
+
+    async def run(self):
+        delay = STREAM_RECONNECT_DELAY
+        while not self._stopping.is_set():
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await self._send_subscriptions(ws, list(self._watched()), markets=True)
+                    self._ws = ws
+                    self.connected.set()
+                    delay = STREAM_RECONNECT_DELAY
+                    logging.info(f"Conectado al WebSocket del indexer: {self.url}")
+                    async for raw in ws:
+                        self.handle_message(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"WebSocket del indexer desconectado: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+            if self._stopping.is_set():
+                break
+            self._start_fallback()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, STREAM_MAX_RECONNECT_DELAY)
+
+    async def stop(self):
+        self._stopping.set()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._fallback is not None:
+            self._fallback.cancel()
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from trading_bot.app import AppContext
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_has_no_side_effects(self):
+        code = ("import sys, trading_bot.trading; "
+                "print([m for m in ('tensorflow', 'bayes_opt', 'textblob', 'dydx4') if m in sys.modules])")
+        with tempfile.TemporaryDirectory() as cwd:
+            output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+                                    check=True).stdout
+            self.assertEqual(output.strip(), "[]")
+            self.assertEqual(os.listdir(cwd), [])
+
+class TestAppContext(unittest.IsolatedAsyncioTestCase):
+
+    async def test_start_once_and_close(self):
+        sdk = MagicMock()
+        sdk.public.get_markets.return_value = {'markets': {'BTC-USD': {'tickSize': '1', 'stepSize': '0.001'}}}
+        sdk.private.get_account.return_value = {'account': {'quoteBalance': '1000'}}
+        connect = AsyncMock(return_value=(sdk, MagicMock(), MagicMock()))
+        with patch('trading_bot.app.initialize_client', connect), patch('trading_bot.app.get_journal'):
+            async with AppContext(symbols=(), streaming=False, metrics=False) as app:
+                self.assertTrue(await app.start())
+                self.assertTrue(await app.start())
+                self.assertEqual(app.ledger.available(), 1000.0)
+                self.assertEqual(app.metadata.precision('BTC-USD'), (3, 0))
+            connect.assert_awaited_once()
+            await asyncio.sleep(0)
+            self.assertTrue(all(task.cancelled() for task in app._tasks))
+
+    async def test_start_without_connection(self):
+        with patch('trading_bot.app.initialize_client', AsyncMock(return_value=(None, None, None))):
+            app = AppContext(symbols=(), streaming=False, metrics=False)
+            self.assertFalse(await app.start())
+            self.assertIsNone(app.exchange)
+            await app.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,29 +1,158 @@
 import unittest
-from unittest.mock import patch, MagicMock
-from ..trading_bot.backtesting import backtest, optimize_parameters  # Importación relativa
+import numpy as np
+import pandas as pd
+from trading_bot.backtesting import backtest, optimize_parameters, entry_exit_signals, simulate_positions, \
+    evaluate_batch, search_parameters, ml_entry_filter
+from trading_bot.ml_models import predict_with_ml_model, predict_scores
+from trading_bot.benchmarks.synthetic import synthetic_candles
+from trading_bot.utils import get_technical_indicators
+from trading_bot.config import BUDGET, PROFIT_THRESHOLD_RANGE, TRAILING_STOP_RANGE, DEFAULT_ALLOCATION
+
+def synthetic_backtest_data(n=2000, seed=0):
+    df = get_technical_indicators(pd.DataFrame({'close': synthetic_candles(n, seed)['close']}))
+    entry, exit = entry_exit_signals(df)
+    return {'close': df['close'].to_numpy(), 'entry': entry, 'exit': exit, 'allow': np.ones(n, dtype=bool)}
 
 class TestBacktesting(unittest.TestCase):
 
-    @patch('..trading_bot.backtesting.Client')
-    def test_backtest(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_klines.return_value = [
-            [0, 0, 0, 0, 100], [0, 0, 0, 0, 200], [0, 0, 0, 0, 300]
-        ]
-        result = backtest(mock_client, 'BTCUSDT', 0.05, 0.02)
+    def test_backtest(self):
+        result = backtest(None, 'BTC-USD', 0.05, 0.02, data=synthetic_backtest_data())
         self.assertIn('total_profit', result)
         self.assertIn('max_drawdown', result)
         self.assertIn('sharpe_ratio', result)
 
-    @patch('..trading_bot.backtesting.Client')
-    def test_optimize_parameters(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_klines.return_value = [
-            [0, 0, 0, 0, 100], [0, 0, 0, 0, 200], [0, 0, 0, 0, 300]
-        ]
-        best_params = optimize_parameters(mock_client, 'BTCUSDT')
-        self.assertIn('profit_threshold', best_params)
-        self.assertIn('trailing_stop', best_params)
+    def test_optimize_parameters(self):
+        best_params = optimize_parameters(None, 'BTC-USD', strategy='random', n_evals=8, workers=1,
+                                          data=synthetic_backtest_data())
+        self.assertGreaterEqual(best_params['profit_threshold'], min(PROFIT_THRESHOLD_RANGE))
+        self.assertLessEqual(best_params['trailing_stop'], max(TRAILING_STOP_RANGE))
+
+def reference_backtest(df, trailing_stop, allow):
+    # Bucle original por vela, usado como referencia del motor vectorizado
+    total_profit = 0
+    position = None
+    buy_price = 0
+    quantity = 0
+    max_drawdown = 0
+    peak = -float("inf")
+    returns = []
+    for i in range(200, len(df)):
+        if df["RSI"].iloc[i] < 30 and df["MACD"].iloc[i] > df["Signal"].iloc[i] and \
+                df["close"].iloc[i] > df["SMA50"].iloc[i] and df["close"].iloc[i] > df["EMA200"].iloc[i]:
+            if position is None:
+                if allow[i]:
+                    position = "long"
+                    buy_price = df["close"].iloc[i]
+                    quantity = BUDGET * DEFAULT_ALLOCATION / buy_price
+        elif (df["RSI"].iloc[i] > 70 or df["MACD"].iloc[i] < df["Signal"].iloc[i]) or \
+                (position == "long" and df["close"].iloc[i] < buy_price * (1 - trailing_stop)):
+            if position == "long":
+                sell_price = df["close"].iloc[i]
+                profit = (sell_price - buy_price) * quantity
+                total_profit += profit
+                returns.append(profit / (buy_price * quantity))
+                peak = max(peak, total_profit)
+                drawdown = (peak - total_profit) / peak if peak != 0 else 0
+                max_drawdown = max(max_drawdown, drawdown)
+                position = None
+    sharpe_ratio = np.mean(returns) / np.std(returns) if returns else 0
+    return {"total_profit": total_profit, "max_drawdown": max_drawdown, "sharpe_ratio": sharpe_ratio}
+
+def synthetic_indicators(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    df = pd.DataFrame({
+        "close": close,
+        "RSI": rng.uniform(0, 100, n),
+        "MACD": rng.normal(0, 1, n),
+        "Signal": rng.normal(0, 1, n),
+        "SMA50": close - rng.normal(0.5, 1, n),
+        "EMA200": close - rng.normal(0.5, 1, n),
+    })
+    df.iloc[:30, 1:] = np.nan
+    return df
+
+class TestVectorizedBacktest(unittest.TestCase):
+
+    def test_matches_reference_loop(self):
+        for seed in range(5):
+            df = synthetic_indicators(3000, seed)
+            allow = np.random.default_rng(seed).random(len(df)) > 0.3
+            for trailing_stop in (0.005, 0.02, 0.1):
+                entry, exit = entry_exit_signals(df)
+                result = simulate_positions(df["close"].to_numpy(), entry, exit, trailing_stop, allow)
+                expected = reference_backtest(df, trailing_stop, allow)
+                self.assertNotEqual(expected["total_profit"], 0)
+                for key in expected:
+                    self.assertAlmostEqual(result[key], expected[key], places=9)
+
+    def test_positions_use_the_allocation(self):
+        df = synthetic_indicators(3000, 0)
+        entry, exit = entry_exit_signals(df)
+        default = simulate_positions(df["close"].to_numpy(), entry, exit, 0.02)
+        half = simulate_positions(df["close"].to_numpy(), entry, exit, 0.02, allocation=DEFAULT_ALLOCATION / 2)
+        self.assertAlmostEqual(half["total_profit"], default["total_profit"] / 2, places=9)
+        self.assertAlmostEqual(half["sharpe_ratio"], default["sharpe_ratio"], places=9)
+
+    def test_no_trades(self):
+        df = synthetic_indicators(300, 0)
+        df["RSI"] = 50.0
+        entry, exit = entry_exit_signals(df)
+        result = simulate_positions(df["close"].to_numpy(), entry, exit, 0.02)
+        self.assertEqual(result, {"total_profit": 0, "max_drawdown": 0, "sharpe_ratio": 0})
+
+class RowModel:
+    """Modelo fila a fila (como la red densa) que cuenta las filas inferidas."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, X, batch_size=None, verbose=0):
+        self.rows += len(X)
+        return 1 / (1 + np.exp(-(X[:, 1] - 50) / 10)).reshape(-1, 1)
+
+class TestBatchedInference(unittest.TestCase):
+
+    def test_matches_prefix_predictions(self):
+        df = synthetic_indicators(400, 3).fillna(0)
+        entry, _ = entry_exit_signals(df)
+        entry[:5] = False
+        model = RowModel()
+        allow = ml_entry_filter(model, df, entry)
+        self.assertEqual(model.rows, len(df))
+        expected = np.zeros(len(df), dtype=bool)
+        for i in np.flatnonzero(entry):
+            expected[i] = predict_with_ml_model(model, df.iloc[:i])[-1] == "buy"
+        np.testing.assert_array_equal(allow, expected)
+        self.assertTrue(allow.any())
+
+    def test_chunked_threads_match_single_pass(self):
+        df = synthetic_indicators(1000, 4).fillna(0)
+        single = predict_scores(RowModel(), df)
+        chunked = predict_scores(RowModel(), df, workers=4, chunk_rows=64)
+        np.testing.assert_array_equal(chunked, single)
+
+class TestParameterSearch(unittest.TestCase):
+
+    def setUp(self):
+        df = synthetic_indicators(2000, 3)
+        entry, exit = entry_exit_signals(df)
+        self.data = {"close": df["close"].to_numpy(), "entry": entry, "exit": exit,
+                     "allow": np.ones(len(df), dtype=bool)}
+
+    def test_evaluate_batch_matches_single_backtests(self):
+        candidates = [(0.03, 0.02), (0.05, 0.02), (0.03, 0.07)]
+        profits = evaluate_batch(self.data, candidates)
+        for (_, trailing_stop), profit in zip(candidates, profits):
+            expected = simulate_positions(self.data["close"], self.data["entry"], self.data["exit"],
+                                          trailing_stop, self.data["allow"])
+            self.assertAlmostEqual(profit, expected["total_profit"])
+
+    def test_search_strategies(self):
+        for strategy in ("grid", "random", "bayes"):
+            params, profit = search_parameters(self.data, strategy, n_evals=16, batch_size=4)
+            self.assertEqual(set(params), {"profit_threshold", "trailing_stop"})
+            self.assertAlmostEqual(profit, evaluate_batch(self.data, [(params["profit_threshold"], params["trailing_stop"])])[0])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from trading_bot.benchmarks.synthetic import SyntheticClient, synthetic_candles
+from trading_bot.benchmarks.run import CASES, check, measure
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_synthetic_data_is_reproducible(self):
+        a = synthetic_candles(1000, seed=3, end=1_700_000_000)
+        b = synthetic_candles(1000, seed=3, end=1_700_000_000)
+        for field in a:
+            np.testing.assert_array_equal(a[field], b[field])
+        self.assertTrue((a["high"] >= np.maximum(a["open"], a["close"])).all())
+        self.assertTrue((np.diff(a["time"]) == 3600).all())
+
+    def test_client_serves_latest_candles(self):
+        client = SyntheticClient(["BTC-USD"], bars=100)
+        candles = client.get_candles("BTC-USD", limit=10)["candles"]
+        self.assertEqual(len(candles), 10)
+        self.assertEqual(float(candles[0]["close"]), client.series["BTC-USD"]["close"][-1])
+
+    def test_every_case_runs(self):
+        for name, (axis, setup) in CASES.items():
+            with self.subTest(case=name):
+                result = measure(setup, 500 if axis == "bars" else 2, repeat=1, seed=0)
+                self.assertGreater(result["median_seconds"], 0)
+
+    def test_check_reports_regressions(self):
+        results = [{"case": "backtest", "size": 500, "median_seconds": 0.002},
+                   {"case": "get_atr", "size": 10, "median_seconds": 0.010}]
+        baseline = {"results": [{"case": "get_atr", "size": 10, "median_seconds": 0.005}]}
+        regressions = check(results, {"backtest@500": 0.001, "get_atr@10": 1.0}, baseline, tolerance=0.5)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(check(results, {"backtest@500": 0.01}), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from trading_bot.candles import CandleStore, parse_candle_time, format_candle_time
+
+def make_candles(start, count, interval=3600):
+    # La API devuelve las velas de la más reciente a la más antigua
+    return [
+        {"startedAt": start + i * interval, "open": i, "high": i + 1, "low": i - 1, "close": i, "volume": 10 * i}
+        for i in reversed(range(count))
+    ]
+
+class TestCandleStore(unittest.TestCase):
+
+    def test_candle_time_round_trip(self):
+        self.assertEqual(format_candle_time(1704067200), "2024-01-01T00:00:00.000Z")
+        self.assertEqual(parse_candle_time(format_candle_time(1704070800)), 1704070800)
+
+    def test_ring_buffer_keeps_last_values_contiguous(self):
+        store = CandleStore('BTC-USD', '1H', capacity=5)
+        store.update(make_candles(0, 8))
+        self.assertEqual(len(store), 5)
+        np.testing.assert_array_equal(store.closes(), [3, 4, 5, 6, 7])
+        np.testing.assert_array_equal(store.column('volume', 2), [60, 70])
+        self.assertFalse(store.closes().flags.writeable)
+
+    def test_update_overwrites_current_candle(self):
+        store = CandleStore('BTC-USD', '1H', capacity=5)
+        store.update(make_candles(0, 3))
+        store.update([{"startedAt": 7200, "open": 2, "high": 9, "low": 1, "close": 8, "volume": 1}])
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.closes()[-1], 8)
+
+    def test_refresh_only_requests_missing_candles(self):
+        store = CandleStore('BTC-USD', '1H', capacity=10)
+        client = MagicMock()
+        client.public.get_candles.return_value = {"candles": make_candles(0, 10)}
+        store.refresh(client, limit=10)
+        self.assertEqual(client.public.get_candles.call_args.kwargs['limit'], 10)
+        self.assertEqual(store.missing(10, now=9 * 3600 + 10), 1)
+        self.assertEqual(store.missing(10, now=11 * 3600 + 10), 3)
+
+if __name__ == '__main__':
+    unittest.main()
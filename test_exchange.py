@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from prometheus_client import REGISTRY
+from trading_bot.exchange import ExchangeClient
+
+def slow(result, delay=0.05):
+    calls = []
+
+    def call(**kwargs):
+        calls.append((threading.get_ident(), kwargs))
+        time.sleep(delay)
+        return result
+    call.calls = calls
+    return call
+
+class TestExchangeClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sdk = MagicMock()
+        self.exchange = ExchangeClient(self.sdk, max_connections=4)
+
+    async def asyncTearDown(self):
+        await self.exchange.close()
+
+    async def test_identical_requests_are_coalesced(self):
+        self.sdk.private.get_account = slow({'account': {'quoteBalance': '250.5'}})
+        balances = await asyncio.gather(*(self.exchange.get_balance() for _ in range(10)))
+        self.assertEqual(balances, [250.5] * 10)
+        self.assertEqual(len(self.sdk.private.get_account.calls), 1)
+        await self.exchange.get_balance()
+        self.assertEqual(len(self.sdk.private.get_account.calls), 2)
+
+    async def test_different_symbols_are_not_coalesced(self):
+        self.sdk.public.get_ticker = slow({'ticker': {'price': '10'}})
+        await asyncio.gather(self.exchange.get_price('BTC-USD'), self.exchange.get_price('ETH-USD'))
+        self.assertEqual(len(self.sdk.public.get_ticker.calls), 2)
+
+    async def test_orders_are_never_coalesced(self):
+        self.sdk.private.create_order = slow({'order': {}})
+        await asyncio.gather(*(self.exchange.create_order(market='BTC-USD', side='buy', size=1, price=1)
+                               for _ in range(3)))
+        self.assertEqual(len(self.sdk.private.create_order.calls), 3)
+
+    async def test_endpoint_timeout(self):
+        self.sdk.public.get_ticker = slow({'ticker': {'price': '10'}}, delay=0.3)
+        exchange = ExchangeClient(self.sdk, timeouts={'ticker': 0.05})
+        with self.assertRaises(asyncio.TimeoutError):
+            await exchange.get_price('BTC-USD')
+        self.assertEqual(exchange._inflight, {})
+        await exchange.close()
+
+    async def test_errors_reach_every_waiter(self):
+        self.sdk.public.get_markets.side_effect = RuntimeError('indexer caído')
+        results = await asyncio.gather(*(self.exchange.get_precision('BTC-USD') for _ in range(3)),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(self.sdk.public.get_markets.call_count, 1)
+
+    async def test_cancelled_caller_does_not_cancel_shared_call(self):
+        self.sdk.public.get_ticker = slow({'ticker': {'price': '7'}}, delay=0.1)
+        first = asyncio.ensure_future(self.exchange.get_price('BTC-USD'))
+        second = asyncio.ensure_future(self.exchange.get_price('BTC-USD'))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        self.assertEqual(await second, 7.0)
+
+    async def test_records_latency_and_coalescing_metrics(self):
+        def sample(name, endpoint):
+            return REGISTRY.get_sample_value(name, {'endpoint': endpoint}) or 0
+
+        self.sdk.public.get_24_hr_stats = slow({'markets': {'BTC-USD': {'volume': '5'}}})
+        requests_before = sample('trading_bot_exchange_request_seconds_count', 'stats')
+        coalesced_before = sample('trading_bot_exchange_coalesced_total', 'stats')
+        await asyncio.gather(*(self.exchange.get_volume('BTC-USD') for _ in range(4)))
+        self.assertEqual(sample('trading_bot_exchange_request_seconds_count', 'stats') - requests_before, 1)
+        self.assertEqual(sample('trading_bot_exchange_coalesced_total', 'stats') - coalesced_before, 3)
+
+if __name__ == '__main__':
+    unittest.main()
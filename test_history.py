@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+import numpy as np
+from trading_bot.candles import CandleStore
+from trading_bot.history import HistoryStore
+
+T0 = 1_700_000_000 - 1_700_000_000 % 3600
+
+def rows(start, n, interval=3600):
+    return [(start + i * interval, 1.0 * i, 2.0 * i, 0.5 * i, 100.0 + i, 10.0) for i in range(n)]
+
+class FakeIndexer:
+    """Indexer que devuelve velas entre from_iso y to_iso, de la más nueva a la más antigua."""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = 0
+
+    def get_candles(self, market, resolution, from_iso, to_iso, limit):
+        self.calls += 1
+        start, end = (datetime.fromisoformat(v.replace("Z", "+00:00")).timestamp() for v in (from_iso, to_iso))
+        selected = [row for row in self.candles if start <= row[0] <= end][::-1][:limit]
+        keys = ("startedAt", "open", "high", "low", "close", "baseTokenVolume")
+        return {"candles": [dict(zip(keys, row)) for row in selected]}
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HistoryStore("BTC-USD", "1H", root=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_update_current_candle(self):
+        self.assertEqual(self.store.append(rows(T0, 5)), 5)
+        self.assertEqual(self.store.append(rows(T0, 3)), 0)
+        last = (T0 + 4 * 3600, 4.0, 9.0, 2.0, 200.0, 11.0)
+        self.assertEqual(self.store.append([last] + rows(T0 + 5 * 3600, 2)), 2)
+        self.assertEqual(len(self.store), 7)
+        self.assertEqual(self.store.closes()[4], 200.0)
+        np.testing.assert_array_equal(np.diff(self.store.column("time")), 3600)
+        # Un proceso nuevo ve lo mismo
+        reopened = HistoryStore("BTC-USD", "1H", root=self.tmp.name)
+        np.testing.assert_array_equal(reopened.closes(), self.store.closes())
+
+    def test_range_slices_are_zero_copy(self):
+        self.store.append(rows(T0, 100))
+        close = self.store.closes(T0 + 10 * 3600, T0 + 20 * 3600)
+        np.testing.assert_array_equal(close, 100.0 + np.arange(10, 20))
+        self.assertTrue(np.shares_memory(close, self.store.closes()))
+        self.assertFalse(close.flags.writeable)
+        self.assertEqual(len(self.store.closes(T0 + 200 * 3600)), 0)
+
+    def test_recovers_from_interrupted_append(self):
+        self.store.append(rows(T0, 3))
+        with open(os.path.join(self.store.path, "close.bin"), "ab") as f:
+            f.write(np.zeros(2).tobytes())  # Columna escrita sin su fichero de tiempos
+        self.store.append(rows(T0 + 3 * 3600, 1))
+        np.testing.assert_array_equal(self.store.closes(), [100.0, 101.0, 102.0, 100.0])
+
+    def test_backfill_pages_and_syncs_incrementally(self):
+        candles = rows(T0, 2500)
+        indexer = FakeIndexer(candles)
+        client = type("Client", (), {"public": indexer})()
+        end = T0 + 2000 * 3600
+        self.assertEqual(self.store.backfill(client, T0 + 500 * 3600, end, page=400), 1501)
+        self.assertGreaterEqual(indexer.calls, 4)
+        self.assertEqual(self.store.first_time, T0 + 500 * 3600)
+        # Velas anteriores: el histórico se reescribe ordenado
+        self.store.backfill(client, T0, T0 + 510 * 3600, page=400)
+        self.assertEqual(self.store.first_time, T0)
+        self.assertEqual(self.store.backfill(client, self.store.last_time, T0 + 2499 * 3600, page=400), 499)
+        np.testing.assert_array_equal(self.store.column("time"), [row[0] for row in candles])
+
+    def test_warm_up_candle_cache(self):
+        self.store.append(rows(T0, 50))
+        cache = CandleStore("BTC-USD", "1H", capacity=20).warm_up(self.store)
+        self.assertEqual(len(cache), 20)
+        np.testing.assert_array_equal(cache.closes(), self.store.closes()[-20:])
+
+if __name__ == '__main__':
+    unittest.main()
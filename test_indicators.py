@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+import talib
+from trading_bot.candles import CandleStore
+from trading_bot.indicators import IndicatorEngine, compute_indicators, COLUMNS
+
+def random_closes(n, seed=0):
+    return 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, n))
+
+class TestIndicators(unittest.TestCase):
+
+    def test_batch_matches_talib_and_pandas(self):
+        close = random_closes(600)
+        result = compute_indicators(close)
+        series = pd.Series(close)
+        ema12 = series.ewm(span=12, adjust=False).mean()
+        ema26 = series.ewm(span=26, adjust=False).mean()
+        expected = {
+            "RSI": talib.RSI(close, timeperiod=14),
+            "EMA12": ema12,
+            "EMA26": ema26,
+            "MACD": ema12 - ema26,
+            "Signal": (ema12 - ema26).ewm(span=9, adjust=False).mean(),
+            "SMA50": talib.SMA(close, timeperiod=50),
+            "EMA200": talib.EMA(close, timeperiod=200),
+        }
+        for column in COLUMNS:
+            np.testing.assert_allclose(result[column], expected[column], rtol=1e-9, equal_nan=True, err_msg=column)
+
+    def test_incremental_matches_batch(self):
+        close = random_closes(400, seed=1)
+        engine = IndicatorEngine()
+        rows = [engine.update(x) for x in close]
+        batch = compute_indicators(close)
+        for column in COLUMNS:
+            np.testing.assert_allclose([row[column] for row in rows], batch[column], rtol=1e-9,
+                                       equal_nan=True, err_msg=column)
+
+    def test_peek_does_not_change_state(self):
+        close = random_closes(300, seed=2)
+        engine = IndicatorEngine()
+        for x in close[:-1]:
+            engine.update(x)
+        peeked = engine.peek(close[-1])
+        self.assertEqual(peeked, engine.peek(close[-1]))
+        self.assertEqual(peeked, engine.update(close[-1]))
+
+    def test_sync_commits_closed_candles_only(self):
+        close = random_closes(250, seed=3)
+        store = CandleStore('BTC-USD', '1H', capacity=300)
+        for i, x in enumerate(close):
+            store.append((i * 3600, x, x, x, x, 1.0))
+        engine = IndicatorEngine()
+        values = engine.sync(store)
+        self.assertEqual(engine.last_time, 248 * 3600)
+        batch = compute_indicators(close)
+        self.assertAlmostEqual(values["MACD"], batch["MACD"][-1])
+        store.append((249 * 3600, 1, 1, 1, 120.0, 1.0))
+        store.append((250 * 3600, 1, 1, 1, 121.0, 1.0))
+        values = engine.sync(store)
+        batch = compute_indicators(np.append(close[:-1], [120.0, 121.0]))
+        self.assertAlmostEqual(values["Signal"], batch["Signal"][-1])
+        self.assertAlmostEqual(values["EMA200"], batch["EMA200"][-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from trading_bot.inference import DenseModel, export_model, load_model, predict_scores
+
+def keras_model(n_features, seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Dense(128, activation='relu', input_shape=(n_features,)),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(1, activation='sigmoid')
+    ])
+    model.compile(optimizer='adam', loss='binary_crossentropy')
+    return model
+
+class TestNumpyRuntime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.X = np.random.default_rng(0).normal(0, 3, (2000, 6)).astype(np.float32)
+        cls.model = keras_model(cls.X.shape[1])
+        cls.model.fit(cls.X, (cls.X[:, 0] > 0).astype(int), epochs=1, verbose=0)
+        cls.path = os.path.join(cls.tmp.name, "modelo.npz")
+        export_model(cls.model, cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_parity_with_keras_predict(self):
+        expected = self.model.predict(self.X, verbose=0)
+        for dtype in ("float32", "float64"):
+            runtime = load_model(self.path, dtype=dtype)
+            np.testing.assert_allclose(runtime.predict(self.X), expected, rtol=1e-5, atol=1e-6)
+
+    def test_batches_do_not_change_result(self):
+        runtime = load_model(self.path)
+        np.testing.assert_allclose(runtime.predict(self.X, batch_size=37), runtime.predict(self.X, batch_size=None),
+                                   rtol=1e-6)
+
+    def test_predict_scores_with_dataframe(self):
+        df = pd.DataFrame(self.X, columns=list("abcdef")).assign(target=0)
+        scores = predict_scores(load_model(self.path), df)
+        np.testing.assert_allclose(scores, self.model.predict(self.X, verbose=0).reshape(-1), rtol=1e-5, atol=1e-6)
+
+    def test_rejects_unknown_activation(self):
+        with self.assertRaises(ValueError):
+            DenseModel([np.ones((2, 1))], [np.zeros(1)], ["softplus"])
+
+    def test_runtime_does_not_import_tensorflow(self):
+        code = "import sys, trading_bot.inference; print('tensorflow' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+if __name__ == '__main__':
+    unittest.main()
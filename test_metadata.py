@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import AsyncMock
+from trading_bot.metadata import MarketMetadata, BalanceLedger, decimals
+
+MARKETS = {'markets': {
+    'BTC-USD': {'tickSize': '1', 'stepSize': '0.0001', 'minOrderSize': '0.001'},
+    'ETH-USD': {'tickSize': '0.1', 'stepSize': '0.001'},
+}}
+
+class TestMarketMetadata(unittest.IsolatedAsyncioTestCase):
+
+    def test_decimals(self):
+        self.assertEqual(decimals('0.001'), 3)
+        self.assertEqual(decimals('1'), 0)
+        self.assertEqual(decimals('0.50'), 1)
+        self.assertEqual(decimals(10), 0)
+
+    async def test_loads_all_markets_in_one_request(self):
+        exchange = AsyncMock()
+        exchange.get_markets.return_value = MARKETS
+        metadata = MarketMetadata(exchange)
+        await metadata.load()
+        exchange.get_markets.assert_awaited_once_with()
+        self.assertEqual(metadata.precision('BTC-USD'), (4, 0))
+        self.assertEqual(metadata.precision('ETH-USD'), (3, 1))
+        self.assertEqual(metadata.min_order_size('BTC-USD'), 0.001)
+        self.assertEqual(metadata.min_order_size('ETH-USD'), 0.0)
+        self.assertNotIn('SOL-USD', metadata)
+
+class TestBalanceLedger(unittest.IsolatedAsyncioTestCase):
+
+    async def test_tracks_fills_and_reconciles(self):
+        exchange = AsyncMock()
+        exchange.get_balance.return_value = 1000.0
+        ledger = BalanceLedger(exchange)
+        await ledger.reconcile()
+        ledger.apply_fill('buy', 100.0, 2)
+        self.assertEqual(ledger.available(), 800.0)
+        ledger.apply_fill('sell', 110.0, 2)
+        self.assertEqual(ledger.available(), 1020.0)
+        exchange.get_balance.return_value = 1019.5
+        self.assertEqual(await ledger.reconcile(), 1019.5)
+        self.assertEqual(ledger.available(), 1019.5)
+        self.assertEqual(exchange.get_balance.await_count, 2)
+
+    async def test_reservations_hold_balance_until_released(self):
+        exchange = AsyncMock()
+        exchange.get_balance.return_value = 1000.0
+        ledger = BalanceLedger(exchange)
+        await ledger.reconcile()
+        self.assertTrue(await ledger.reserve(600.0, 'BTC-USD'))
+        self.assertFalse(await ledger.reserve(600.0, 'ETH-USD'))
+        self.assertEqual(ledger.available(), 400.0)
+        ledger.release(600.0, 'BTC-USD')
+        self.assertTrue(await ledger.reserve(600.0, 'ETH-USD'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from trading_bot.ml_models import train_ml_model, build_training_data
+from trading_bot.model_registry import ModelRegistry, fingerprint
+
+def training_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n + 1))
+    df = pd.DataFrame({"close": close, "RSI": rng.uniform(0, 100, n + 1)})
+    return build_training_data(df)
+
+class CountingTrainer:
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, data, epochs, batch_size, model=None):
+        self.calls.append((len(data), epochs, model is not None))
+        return train_ml_model(data, epochs=1, batch_size=batch_size, model=model)
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trainer = CountingTrainer()
+        self.registry = ModelRegistry(self.tmp.name, train=self.trainer)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fingerprint_depends_on_data_and_hyperparams(self):
+        data = training_frame(100)
+        self.assertEqual(fingerprint(data, {"epochs": 50}), fingerprint(data.copy(), {"epochs": 50}))
+        self.assertNotEqual(fingerprint(data, {"epochs": 50}), fingerprint(data, {"epochs": 10}))
+        self.assertNotEqual(fingerprint(data, {"epochs": 50}), fingerprint(data.iloc[:-1], {"epochs": 50}))
+
+    def test_reuses_identical_model(self):
+        data = training_frame(120)
+        first = self.registry.get_or_train(data)
+        second = ModelRegistry(self.tmp.name, train=self.trainer).get_or_train(data)
+        self.assertEqual(len(self.trainer.calls), 1)
+        X = data.drop(columns=["target"]).to_numpy(dtype=np.float32)
+        np.testing.assert_allclose(first.predict(X, verbose=0), second.predict(X, verbose=0), rtol=1e-6)
+
+    def test_fine_tunes_when_candles_are_appended(self):
+        data = training_frame(400)
+        self.registry.get_or_train(data.iloc[:350])
+        self.registry.get_or_train(data)
+        self.assertEqual(self.trainer.calls[0][2], False)
+        rows, epochs, warm = self.trainer.calls[1]
+        self.assertTrue(warm)
+        self.assertEqual(rows, 250)  # 200 velas ya vistas + 50 nuevas
+        self.assertLess(epochs, self.trainer.calls[0][1])
+
+    def test_evicts_least_recently_used(self):
+        self.registry.max_bytes = 1
+        self.registry.get_or_train(training_frame(100, seed=1))
+        self.registry.get_or_train(training_frame(100, seed=2))
+        models = [name for name in os.listdir(self.tmp.name) if name.endswith(".keras")]
+        self.assertEqual(len(models), 1)
+        self.assertEqual(len(self.registry._index), 1)
+
+if __name__ == '__main__':
+    unittest.main()
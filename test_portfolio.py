@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from trading_bot.candles import get_candle_store
+from trading_bot.config import DEFAULT_ALLOCATION
+from trading_bot.portfolio import portfolio_stats, cap_weights, monte_carlo_frontier, max_sharpe_weights, \
+    min_variance_weights, optimize_weights, portfolio_allocations, snapshot_closes
+
+def synthetic_returns(n_assets, n_periods, seed=0):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, n_periods)
+    betas = rng.uniform(0.5, 1.5, n_assets)
+    drift = rng.uniform(-0.0005, 0.002, n_assets)
+    return drift[:, None] + betas[:, None] * factor + rng.normal(0, 0.01, (n_assets, n_periods))
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        self.returns = synthetic_returns(8, 720)
+        self.mu = self.returns.mean(axis=1)
+        self.cov = np.cov(self.returns)
+
+    def test_stats_match_single_portfolio_formula(self):
+        weights = np.random.default_rng(1).dirichlet(np.ones(8), 50)
+        r, v, s = portfolio_stats(weights, self.mu, self.cov)
+        for k, w in enumerate(weights):
+            self.assertAlmostEqual(r[k], w @ self.mu)
+            self.assertAlmostEqual(v[k], np.sqrt(w @ self.cov @ w))
+            self.assertAlmostEqual(s[k], r[k] / v[k])
+
+    def test_cap_weights(self):
+        weights = cap_weights(np.random.default_rng(2).dirichlet(np.full(8, 0.3), 1000), 0.2)
+        np.testing.assert_allclose(weights.sum(axis=1), 1)
+        self.assertLessEqual(weights.max(), 0.2 + 1e-12)
+        self.assertGreaterEqual(weights.min(), 0)
+
+    def test_unconstrained_tangency_portfolio(self):
+        mu = np.array([0.01, 0.02, 0.015])
+        cov = np.diag([0.04, 0.09, 0.0625])
+        expected = np.linalg.solve(cov, mu)
+        np.testing.assert_allclose(max_sharpe_weights(mu, cov, max_weight=None), expected / expected.sum())
+
+    def test_exact_solver_beats_monte_carlo_with_caps(self):
+        frontier = monte_carlo_frontier(self.mu, self.cov, 20_000, batch_size=4096, max_weight=0.3, seed=0)
+        exact = max_sharpe_weights(self.mu, self.cov, max_weight=0.3)
+        self.assertAlmostEqual(exact.sum(), 1)
+        self.assertLessEqual(exact.max(), 0.3 + 1e-9)
+        self.assertGreaterEqual(exact.min(), 0)
+        _, _, sharpe = portfolio_stats(np.vstack([exact, frontier["max_sharpe"]]), self.mu, self.cov)
+        self.assertGreaterEqual(sharpe[0], sharpe[1] - 1e-9)
+        self.assertEqual(len(frontier["returns"]), 20_000)
+
+    def test_min_variance(self):
+        weights = min_variance_weights(self.cov, max_weight=0.5)
+        _, volatility, _ = portfolio_stats(np.vstack([weights, np.full(8, 1 / 8)]), self.mu, self.cov)
+        self.assertLess(volatility[0], volatility[1])
+
+    def test_infeasible_cap(self):
+        with self.assertRaises(ValueError):
+            max_sharpe_weights(self.mu, self.cov, max_weight=0.1)
+
+    def test_fifty_assets_with_cap(self):
+        # El tiempo de este caso lo vigila el benchmark optimize_weights@50
+        weights = optimize_weights(synthetic_returns(50, 720, seed=3), max_weight=0.1, n_portfolios=200_000, seed=0)
+        self.assertAlmostEqual(weights.sum(), 1)
+        self.assertLessEqual(weights.max(), 0.1 + 1e-9)
+
+class TestAllocations(unittest.TestCase):
+
+    def test_defaults_without_history(self):
+        self.assertEqual(portfolio_allocations(["AAA-USD", "BBB-USD"]), {"AAA-USD": DEFAULT_ALLOCATION,
+                                                                         "BBB-USD": DEFAULT_ALLOCATION})
+
+    def test_allocations_from_candle_cache(self):
+        returns = synthetic_returns(3, 300, seed=4)
+        symbols = ["XA-USD", "XB-USD", "XC-USD"]
+        for symbol, r in zip(symbols, returns):
+            store = get_candle_store(symbol, "1H")
+            close = 100 * np.exp(np.cumsum(r))
+            for k, c in enumerate(close):
+                store.append((k * 3600, c, c, c, c, 1.0))
+        allocations = portfolio_allocations(symbols, max_weight=0.6, seed=0)
+        self.assertAlmostEqual(sum(allocations.values()), 1)
+        self.assertLessEqual(max(allocations.values()), 0.6 + 1e-9)
+
+    def test_snapshot_is_not_a_view_of_the_cache(self):
+        store = get_candle_store("XS-USD", "1H")
+        for k in range(5):
+            store.append((k * 3600, 1.0, 1.0, 1.0, float(k), 1.0))
+        (closes,) = snapshot_closes(["XS-USD"], lookback=5)
+        store.append((4 * 3600, 1.0, 1.0, 1.0, 99.0, 1.0))  # El bucle actualiza la vela en curso
+        self.assertEqual(closes.tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+if __name__ == '__main__':
+    unittest.main()
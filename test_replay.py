@@ -0,0 +1,123 @@
+import math
+import os
+import tempfile
+import unittest
+import numpy as np
+from trading_bot.strategy import exit_levels, should_exit, order_quantity, risk_quantity
+from trading_bot.streaming import MarketStream
+from trading_bot.replay import TICK_DTYPE, TickStore, TickRecorder, candles_from_ticks, candle_context, replay, \
+    parse_trades
+
+def synthetic_ticks(n, seed=0, step=20.0):
+    rng = np.random.default_rng(seed)
+    ticks = np.empty(n, dtype=TICK_DTYPE)
+    ticks["time"] = 1_700_000_000 + np.cumsum(rng.exponential(step, n))
+    ticks["price"] = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    ticks["size"] = rng.exponential(1.0, n)
+    return ticks
+
+def reference_replay(ticks, candles, profit_threshold, trailing_stop, latency, slippage, budget=1000.0,
+                     allocation=0.25, retry_interval=60):
+    """Bucle evento a evento escrito directamente con las reglas de strategy.py."""
+    closed_at, entry, atr_values = candle_context(candles)
+    trades = []
+    holding = False
+    quantity = 0.0
+    pending = None
+    next_check = -math.inf
+    k = -1
+    for t, price in zip(ticks["time"].tolist(), ticks["price"].tolist()):
+        while k + 1 < len(closed_at) and closed_at[k + 1] <= t:
+            k += 1
+        atr = atr_values[k] if k >= 0 else math.nan
+        if pending is not None:
+            side, due = pending
+            if t < due:
+                continue
+            pending = None
+            if side == "buy":
+                holding, buy_price, entry_time = True, price * (1 + slippage), t
+            else:
+                trades.append((entry_time, buy_price, t, price * (1 - slippage), quantity))
+                holding, next_check = False, t + retry_interval
+        if holding:
+            if should_exit(price, *exit_levels(buy_price, atr, profit_threshold, trailing_stop)):
+                pending = ("sell", t + latency)
+        elif t >= next_check:
+            if k >= 0 and entry[k]:
+                max_quantity = risk_quantity(atr, budget) if atr > 0 else math.nan
+                quantity = order_quantity(budget, allocation, price, max_quantity)
+                pending = ("buy", t + latency)
+            else:
+                next_check = t + retry_interval
+    return trades
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.ticks = synthetic_ticks(60_000)
+        self.candles = candles_from_ticks(self.ticks)
+
+    def test_matches_reference_loop(self):
+        expected = reference_replay(self.ticks, self.candles, 0.01, 0.005, 0.5, 0.0005)
+        result = replay(self.ticks, self.candles, 0.01, 0.005, latency=0.5, slippage=0.0005)
+        self.assertGreater(len(expected), 5)
+        self.assertEqual(result["events"], len(self.ticks))
+        np.testing.assert_allclose(result["trades"].tolist(), expected)
+
+    def test_batches_match_single_pass(self):
+        whole = replay(self.ticks, self.candles, 0.01, 0.005)
+        batched = replay((self.ticks[i:i + 7_001] for i in range(0, len(self.ticks), 7_001)), self.candles,
+                         0.01, 0.005)
+        np.testing.assert_array_equal(whole["trades"], batched["trades"])
+        self.assertEqual(whole["total_profit"], batched["total_profit"])
+
+    def test_latency_delays_fills(self):
+        trades = replay(self.ticks, self.candles, 0.01, 0.005, latency=30.0)["trades"]
+        self.assertTrue(len(trades))
+        self.assertTrue((trades["exit_time"] - trades["entry_time"] >= 30.0).all())
+
+    def test_candles_from_ticks(self):
+        candles = candles_from_ticks(self.ticks[:500], interval=3600)
+        bucket = np.floor(self.ticks["time"][:500] / 3600) * 3600
+        first = bucket == candles["time"][0]
+        self.assertEqual(candles["open"][0], self.ticks["price"][:500][first][0])
+        self.assertEqual(candles["high"][0], self.ticks["price"][:500][first].max())
+        self.assertAlmostEqual(candles["volume"].sum(), self.ticks["size"][:500].sum())
+
+class TestTickStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_append_and_batches(self):
+        store = TickStore("BTC-USD", root=self.tmp.name)
+        ticks = synthetic_ticks(1000)
+        store.append(ticks[:600])
+        with open(store.path, "ab") as f:
+            f.write(b"\0" * 5)  # Escritura interrumpida
+        store.append(ticks[600:])
+        self.assertEqual(len(store), 1000)
+        np.testing.assert_array_equal(np.concatenate(list(store.batches(batch_size=300))), ticks)
+        start, end = ticks["time"][100], ticks["time"][200]
+        np.testing.assert_array_equal(store.ticks(start, end), ticks[100:200])
+
+    def test_stream_records_new_trades(self):
+        recorder = TickRecorder(root=self.tmp.name, flush_size=3)
+        stream = MarketStream(recorder=recorder)
+        trades = [{"createdAt": "2024-01-01T00:00:01.500Z", "price": "101", "size": "2"},
+                  {"createdAt": "2024-01-01T00:00:00.250Z", "price": "100", "size": "1"}]
+        stream.handle_message({"type": "subscribed", "channel": "v4_trades", "id": "BTC-USD",
+                               "contents": {"trades": trades}})
+        stream.handle_message({"type": "channel_data", "channel": "v4_trades", "id": "BTC-USD",
+                               "contents": {"trades": trades}})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "BTC-USD.bin")))
+        recorder.close()
+        ticks = TickStore("BTC-USD", root=self.tmp.name).ticks()
+        np.testing.assert_array_equal(ticks, parse_trades(trades))
+        self.assertEqual(ticks["price"].tolist(), [100.0, 101.0])
+        self.assertAlmostEqual(ticks["time"][1] - ticks["time"][0], 1.25, places=6)
+
+if __name__ == "__main__":
+    unittest.main()
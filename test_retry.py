@@ -0,0 +1,126 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from trading_bot.exchange import ExchangeClient
+from trading_bot.retry import CircuitBreaker, CircuitOpenError, backoff_delay, retry_async
+from trading_bot.utils import submit_order
+
+class TestRetryAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_retries_until_success(self):
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError('indexer caído')
+            return 'ok'
+
+        with patch('trading_bot.retry.backoff_delay', return_value=0.001):
+            self.assertEqual(await retry_async(flaky, deadline=1), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    async def test_deadline_bounds_total_time(self):
+        async def hangs():
+            await asyncio.sleep(10)
+
+        start = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            await retry_async(hangs, deadline=0.1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    async def test_open_circuit_is_not_retried(self):
+        calls = []
+
+        async def rejected():
+            calls.append(1)
+            raise CircuitOpenError('abierto')
+
+        with self.assertRaises(CircuitOpenError):
+            await retry_async(rejected, deadline=1)
+        self.assertEqual(len(calls), 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = [backoff_delay(10, base=0.5, cap=8) for _ in range(200)]
+        self.assertTrue(all(0 <= d <= 8 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+class TestSubmitOrder(unittest.IsolatedAsyncioTestCase):
+
+    async def test_timed_out_order_is_not_resent(self):
+        calls = []
+
+        async def create_order(**order):
+            calls.append(order)
+            await asyncio.sleep(10)
+
+        client = MagicMock(create_order=create_order)
+        with self.assertRaises(asyncio.TimeoutError):
+            await submit_order(client, deadline=0.1, market='BTC-USD', side='buy', size=1, price=1)
+        self.assertEqual(len(calls), 1)
+
+    async def test_resends_keep_the_client_id(self):
+        calls = []
+
+        async def create_order(**order):
+            calls.append(order)
+            if len(calls) < 2:
+                raise ConnectionError('nodo caído')
+            return {'order': order}
+
+        client = MagicMock(create_order=create_order)
+        with patch('trading_bot.retry.backoff_delay', return_value=0.001):
+            await submit_order(client, deadline=1, market='BTC-USD', side='buy', size=1, price=1)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0]['client_id'], calls[1]['client_id'])
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    def test_opens_after_threshold_and_probes_once(self):
+        breaker = CircuitBreaker('order', failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        time.sleep(0.06)
+        breaker.before_call()  # Llamada de prueba
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    async def test_cancelled_probe_allows_another(self):
+        sdk = MagicMock()
+        sdk.public.get_ticker.side_effect = lambda **kwargs: time.sleep(0.2) or {'ticker': {'price': '10'}}
+        exchange = ExchangeClient(sdk)
+        breaker = exchange.breaker('ticker')
+        breaker.reset_timeout = 0.01
+        breaker.opened_at = time.monotonic() - 1
+        with self.assertRaises(asyncio.TimeoutError):
+            await retry_async(exchange.call, 'ticker', sdk.public.get_ticker, coalesce=False, market='BTC-USD',
+                              attempts=1, deadline=0.05)
+        self.assertEqual(breaker.state, 'half_open')
+        breaker.before_call()  # La prueba cancelada no bloquea la siguiente
+        await exchange.close()
+
+    async def test_exchange_fails_fast_when_endpoint_is_down(self):
+        sdk = MagicMock()
+        sdk.private.create_order.side_effect = ConnectionError('timeout del nodo')
+        exchange = ExchangeClient(sdk)
+        exchange.breaker('order').failure_threshold = 3
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                await exchange.create_order(market='BTC-USD', side='buy', size=1, price=1)
+        with self.assertRaises(CircuitOpenError):
+            await exchange.create_order(market='BTC-USD', side='buy', size=1, price=1)
+        self.assertEqual(sdk.private.create_order.call_count, 3)
+        # Los demás endpoints siguen disponibles
+        sdk.public.get_ticker.return_value = {'ticker': {'price': '10'}}
+        self.assertEqual(await exchange.get_price('BTC-USD'), 10.0)
+        await exchange.close()
+
+if __name__ == '__main__':
+    unittest.main()
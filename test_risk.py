@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+from trading_bot.risk import RollingWindow, RiskEngine, rolling_var, bootstrap_var
+
+def expected_risk(values, confidence=0.95):
+    quantile = np.percentile(values, (1 - confidence) * 100)
+    tail = np.sort(values)[:int(np.floor((1 - confidence) * (len(values) - 1))) + 1]
+    return max(-quantile, 0.0), max(-tail.mean(), 0.0)
+
+class TestRollingWindow(unittest.TestCase):
+
+    def test_matches_percentile_after_eviction(self):
+        returns = np.random.default_rng(0).normal(0, 0.02, 500)
+        window = RollingWindow(size=100)
+        for k, value in enumerate(returns):
+            window.append(value)
+            if k >= 99 and k % 37 == 0:
+                expected = expected_risk(returns[k - 99:k + 1])
+                np.testing.assert_allclose(window.risk(), expected, rtol=1e-12)
+        self.assertEqual(len(window), 100)
+        np.testing.assert_array_equal(window.values(), returns[-100:])
+
+    def test_rolling_var_matches_loop(self):
+        returns = np.random.default_rng(1).normal(0, 0.01, 300)
+        var, cvar = rolling_var(returns, window=50)
+        self.assertTrue(np.isnan(var[:49]).all())
+        for i in range(49, 300, 25):
+            np.testing.assert_allclose((var[i], cvar[i]), expected_risk(returns[i - 49:i + 1]), rtol=1e-12)
+
+    def test_bootstrap_var(self):
+        returns = np.random.default_rng(2).normal(0, 0.01, 1000)
+        var, cvar = bootstrap_var(returns, horizon=1, seed=0)
+        self.assertAlmostEqual(var, expected_risk(returns)[0], delta=0.002)
+        var_day, _ = bootstrap_var(returns, horizon=24, seed=0)
+        self.assertGreater(var_day, var)
+        self.assertGreaterEqual(cvar, var)
+
+class TestRiskEngine(unittest.TestCase):
+
+    def test_update_price_samples_one_return_per_period(self):
+        engine = RiskEngine(window=10, interval=60)
+        for timestamp, price in [(0, 100), (30, 101), (61, 102), (90, 99), (125, 99)]:
+            engine.update_price("BTC-USD", price, timestamp)
+        # Cierres por periodo: 101, 99 -> una rentabilidad completa
+        np.testing.assert_allclose(engine._windows["BTC-USD"].values(), [99 / 101 - 1])
+
+    def test_gaps_do_not_produce_returns(self):
+        engine = RiskEngine(window=10, interval=60)
+        engine.seed("BTC-USD", [100, 101, 102, 103], [0, 60, 120, 180])
+        np.testing.assert_allclose(engine._windows["BTC-USD"].values(), [101 / 100 - 1, 102 / 101 - 1])
+        # El cierre del periodo sembrado en curso sí enlaza con el siguiente tick
+        engine.update_price("BTC-USD", 104, 245)
+        self.assertEqual(len(engine._windows["BTC-USD"]), 3)
+        engine.update_price("BTC-USD", 150, 900)
+        self.assertEqual(len(engine._windows["BTC-USD"]), 4)
+        # Sin precios durante varios periodos: el salto hasta 150 no se guarda como una rentabilidad
+        engine.update_price("BTC-USD", 151, 965)
+        self.assertEqual(len(engine._windows["BTC-USD"]), 4)
+        engine.update_price("BTC-USD", 150, 1030)
+        self.assertEqual(len(engine._windows["BTC-USD"]), 5)
+        np.testing.assert_allclose(engine._windows["BTC-USD"].values()[-1], 151 / 150 - 1)
+
+    def test_portfolio_aligns_windows_on_periods(self):
+        engine = RiskEngine(window=10, interval=60, budget=1000)
+        engine.seed("BTC-USD", [100, 90, 100, 100], [0, 60, 120, 180])
+        engine.seed("ETH-USD", [100, 100, 110, 100, 100], [0, 60, 120, 180, 240])
+        # Periodos comunes 1 y 2: la pérdida de -10% de BTC coincide con el 0% de ETH, no con su -9%
+        _, cvar = engine._portfolio_risk({"BTC-USD": 100, "ETH-USD": 100})
+        self.assertAlmostEqual(cvar, 10.0)
+
+    def test_entry_blocked_when_portfolio_cvar_exceeds_limit(self):
+        rng = np.random.default_rng(3)
+        engine = RiskEngine(window=200, max_portfolio_cvar=0.05, budget=1000)
+        for symbol in ("BTC-USD", "ETH-USD"):
+            engine.seed(symbol, 100 * np.cumprod(1 + rng.normal(0, 0.02, 202)), np.arange(202) * 3600)
+        _, cvar_symbol = engine.symbol_risk("BTC-USD")
+        self.assertGreater(cvar_symbol, 0)
+        self.assertTrue(engine.allows_entry("BTC-USD", 500))
+        engine.on_fill("BTC-USD", "buy", engine._prices["BTC-USD"], 1500 / engine._prices["BTC-USD"])
+        var, cvar = engine.portfolio_risk()
+        self.assertAlmostEqual(cvar, 1500 * cvar_symbol, delta=1e-9)
+        self.assertGreaterEqual(cvar, var)
+        self.assertFalse(engine.allows_entry("ETH-USD", 1000))
+        engine.on_fill("BTC-USD", "sell", engine._prices["BTC-USD"], 1500 / engine._prices["BTC-USD"])
+        self.assertEqual(engine.portfolio_risk(), (0.0, 0.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from trading_bot.config import MIN_POLL_INTERVAL, MAX_POLL_INTERVAL, DEFAULT_POLL_INTERVAL, ENTRY_PRIORITY
+from trading_bot.exchange import ExchangeClient
+from trading_bot.retry import CircuitOpenError
+from trading_bot.scheduler import TokenBucket, poll_interval, exit_priority, request_priority
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+
+    async def test_burst_is_served_immediately(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        await asyncio.wait_for(asyncio.gather(*(bucket.acquire() for _ in range(5))), 0.1)
+
+    async def test_waiters_are_served_by_priority(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        served = []
+
+        async def request(name, priority):
+            with request_priority(priority):
+                await bucket.acquire()
+            served.append(name)
+
+        await asyncio.gather(request("entrada", ENTRY_PRIORITY), request("lejos", 5.0), request("cerca", 0.2))
+        self.assertEqual(served, ["cerca", "lejos", "entrada"])
+
+    async def test_cancelled_waiter_releases_its_turn(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        cancelled = asyncio.ensure_future(bucket.acquire(priority=0))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(bucket.acquire(priority=1), 0.5)
+
+    async def test_coalesced_calls_consume_one_token(self):
+        sdk = MagicMock()
+        sdk.public.get_ticker.return_value = {'ticker': {'price': '10'}}
+        bucket = TokenBucket(rate=1, capacity=3)
+        exchange = ExchangeClient(sdk, rate_limiter=bucket)
+        await asyncio.gather(*(exchange.get_price('BTC-USD') for _ in range(5)))
+        await exchange.close()
+        self.assertGreaterEqual(bucket._tokens, 1.9)
+
+    async def test_waiting_for_a_token_does_not_count_against_the_timeout(self):
+        sdk = MagicMock()
+        sdk.public.get_ticker.return_value = {'ticker': {'price': '10'}}
+        exchange = ExchangeClient(sdk, timeouts={'ticker': 0.05}, rate_limiter=TokenBucket(rate=10, capacity=1))
+        prices = await asyncio.gather(*(exchange.get_price(f'SYM{i}-USD') for i in range(3)))
+        await exchange.close()
+        self.assertEqual(prices, [10.0] * 3)
+        self.assertEqual(exchange.breaker('ticker').failures, 0)
+
+    async def test_open_circuit_does_not_spend_tokens(self):
+        sdk = MagicMock()
+        sdk.public.get_ticker.side_effect = RuntimeError("caído")
+        bucket = TokenBucket(rate=0.001, capacity=10)
+        exchange = ExchangeClient(sdk, rate_limiter=bucket)
+        breaker = exchange.breaker('ticker')
+        for _ in range(breaker.failure_threshold):
+            with self.assertRaises(RuntimeError):
+                await exchange.call('ticker', sdk.public.get_ticker, coalesce=False)
+        spent = bucket._tokens
+        with self.assertRaises(CircuitOpenError):
+            await exchange.call('ticker', sdk.public.get_ticker, coalesce=False)
+        await exchange.close()
+        self.assertAlmostEqual(bucket._tokens, spent, places=2)
+
+class TestPollInterval(unittest.TestCase):
+
+    def test_without_data_uses_default(self):
+        self.assertEqual(poll_interval(), DEFAULT_POLL_INTERVAL)
+        self.assertEqual(poll_interval(100.0, float('nan')), DEFAULT_POLL_INTERVAL)
+
+    def test_closer_exit_polls_faster(self):
+        far = poll_interval(100.0, 1.0, (110.0, 90.0))
+        near = poll_interval(100.0, 1.0, (100.1, 90.0))
+        self.assertLess(near, far)
+        self.assertEqual(far, MAX_POLL_INTERVAL)
+        self.assertEqual(poll_interval(100.0, 1.0, (100.01,)), MIN_POLL_INTERVAL)
+
+    def test_higher_volatility_polls_faster(self):
+        self.assertLess(poll_interval(100.0, 2.0, (100.5,)), poll_interval(100.0, 0.5, (100.5,)))
+
+    def test_exit_priority(self):
+        self.assertAlmostEqual(exit_priority(100.0, 2.0, (103.0, 99.0)), 0.5)
+        self.assertEqual(exit_priority(None, None, ()), ENTRY_PRIORITY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import time
+import unittest
+import numpy as np
+from trading_bot.sentiment import SentimentIndex, TextScorer, SentimentFeed, parse_fear_and_greed
+
+def _fake_fetch(values):
+    calls = []
+
+    def fetch(limit=1):
+        calls.append(limit)
+        value = values[min(len(calls), len(values)) - 1]
+        return np.array([1_700_000_000 + 86400 * len(calls)]), np.array([float(value)]), 'Neutral'
+    return fetch, calls
+
+class TestSentimentIndex(unittest.TestCase):
+
+    def test_parse_orders_by_time(self):
+        times, values, classification = parse_fear_and_greed({'data': [
+            {'value': '40', 'value_classification': 'Fear', 'timestamp': '200'},
+            {'value': '60', 'value_classification': 'Greed', 'timestamp': '100'}]})
+        np.testing.assert_array_equal(times, [100, 200])
+        np.testing.assert_array_equal(values, [60.0, 40.0])
+        self.assertEqual(classification, 'Fear')
+
+    def test_serves_stale_value_while_revalidating(self):
+        fetch, calls = _fake_fetch([30, 70])
+        index = SentimentIndex(ttl=0.05, max_age=60, fetch=fetch)
+        self.assertEqual(index.get(), (30.0, 'Neutral'))
+        self.assertEqual(index.get(), (30.0, 'Neutral'))
+        self.assertEqual(len(calls), 1)
+        time.sleep(0.06)
+        # Caducado: devuelve el valor anterior sin esperar y refresca en otro hilo
+        self.assertEqual(index.peek(), (30.0, 'Neutral'))
+        deadline = time.monotonic() + 5
+        while index.value != 70.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(index.peek(), (70.0, 'Neutral'))
+        self.assertEqual(len(calls), 2)
+        self.assertAlmostEqual(index.score(), 0.4)
+
+    def test_failed_refresh_keeps_value_until_max_age(self):
+        index = SentimentIndex(ttl=0, max_age=0.05, retry_interval=60, fetch=lambda limit=1: 1 / 0)
+        index.store(np.array([100]), np.array([20.0]), 'Extreme Fear')
+        self.assertEqual(index.peek(), (20.0, 'Extreme Fear'))
+        time.sleep(0.06)
+        self.assertIsNone(index.peek())
+        self.assertTrue(np.isnan(index.score()))
+
+    def test_scores_at_uses_last_published_value(self):
+        index = SentimentIndex()
+        index.store(np.array([100, 200]), np.array([25.0, 75.0]), 'Greed')
+        np.testing.assert_allclose(index.scores_at([50, 100, 150, 250]), [np.nan, -0.5, -0.5, 0.5])
+
+class TestTextScorer(unittest.TestCase):
+
+    def test_deduplicates_and_memoizes(self):
+        seen = []
+
+        def polarity(texts):
+            seen.extend(texts)
+            return [len(text) / 10 for text in texts]
+
+        scorer = TextScorer(memo_size=3, batch_size=2, workers=2, polarity=polarity)
+        try:
+            np.testing.assert_allclose(scorer.score(['a', 'bb', 'a', 'ccc', 'bb']), [0.1, 0.2, 0.1, 0.3, 0.2])
+            self.assertEqual(sorted(seen), ['a', 'bb', 'ccc'])
+            scorer.score(['bb', 'dddd'])
+            self.assertEqual(seen.count('bb'), 1)
+            # 'a' era el menos usado: salió de la memoria al entrar 'dddd'
+            scorer.score(['a'])
+            self.assertEqual(seen.count('a'), 2)
+        finally:
+            scorer.close()
+
+class TestSentimentFeed(unittest.IsolatedAsyncioTestCase):
+
+    async def test_feature_combines_index_and_texts(self):
+        feed = SentimentFeed(scorer=TextScorer(workers=1, polarity=lambda texts: [0.8 for _ in texts]),
+                             index_weight=0.5)
+        self.assertTrue(np.isnan(feed.feature('BTC-USD')))
+        await feed.update_texts('BTC-USD', ['BTC sube', 'BTC sube'])
+        self.assertAlmostEqual(feed.feature('BTC-USD'), 0.8)
+        feed.index.store(np.array([100]), np.array([30.0]), 'Fear')
+        self.assertAlmostEqual(feed.feature('BTC-USD'), 0.5 * -0.4 + 0.5 * 0.8)
+        self.assertAlmostEqual(feed.feature('ETH-USD'), -0.4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from trading_bot.sharding import assign_shards, ShardCoordinator, CoordinatorChannel, SharedLedger, \
+    RemoteSentiment, _Worker, rate_share
+
+def _buying_worker(worker_id, conn, symbols, simulator, universe, rate_limit):
+    # Worker ligero: intenta comprar 300 en todos sus símbolos a la vez
+    async def run():
+        channel = CoordinatorChannel(conn)
+        ledger = SharedLedger(channel)
+
+        async def buy(symbol):
+            if await ledger.reserve(300.0, symbol):
+                channel.send(("fill", symbol, "buy", 100.0, 3.0))
+                ledger.release(300.0, symbol)
+        await asyncio.gather(*(buy(symbol) for symbol in symbols))
+        await channel.stopping.wait()
+        channel.close()
+    asyncio.run(run())
+
+async def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.05)
+
+class TestAssignShards(unittest.TestCase):
+
+    def test_removing_a_worker_only_moves_its_symbols(self):
+        symbols = [f'SYM{i}-USD' for i in range(200)]
+        before = assign_shards(symbols, [0, 1, 2])
+        self.assertEqual(before, assign_shards(symbols, [0, 1, 2]))
+        self.assertEqual(set(before.values()), {0, 1, 2})
+        after = assign_shards(symbols, [0, 1])
+        moved = [symbol for symbol in symbols if before[symbol] != after[symbol]]
+        self.assertTrue(moved)
+        self.assertTrue(all(before[symbol] == 2 for symbol in moved))
+
+    def test_processes_split_the_request_budget(self):
+        with patch('trading_bot.sharding.REQUEST_RATE_LIMIT', 40), patch('trading_bot.sharding.REQUEST_BURST', 20):
+            self.assertEqual(rate_share(3), (10.0, 5.0))
+
+class TestCoordinatorChannel(unittest.IsolatedAsyncioTestCase):
+
+    async def test_stop_keeps_the_channel_open_until_closed(self):
+        coordinator, worker = multiprocessing.Pipe()
+        channel = CoordinatorChannel(worker)
+        coordinator.send(("stop",))
+        await asyncio.wait_for(channel.stopping.wait(), 1)
+        # Las ventas del cierre ordenado siguen llegando al coordinador
+        channel.send(("fill", 'BTC-USD', "sell", 100.0, 1.0))
+        self.assertEqual(coordinator.recv(), ("fill", 'BTC-USD', "sell", 100.0, 1.0))
+        channel.close()
+        self.assertTrue(channel.closed.is_set())
+        self.assertFalse(await asyncio.wait_for(channel.request("reserve", 'BTC-USD', 1.0), 1))
+        coordinator.close()
+
+    async def test_allocations_reach_the_worker(self):
+        coordinator, worker = multiprocessing.Pipe()
+        channel = CoordinatorChannel(worker)
+        received = asyncio.get_running_loop().create_future()
+        channel.on_allocations = received.set_result
+        coordinator.send(("allocations", {'BTC-USD': 0.7, 'ETH-USD': 0.3}))
+        self.assertEqual(await asyncio.wait_for(received, 1), {'BTC-USD': 0.7, 'ETH-USD': 0.3})
+        channel.close()
+        coordinator.close()
+
+    async def test_sentiment_comes_from_the_coordinator(self):
+        coordinator, worker = multiprocessing.Pipe()
+        channel = CoordinatorChannel(worker)
+        feed = RemoteSentiment(channel)
+        self.assertTrue(np.isnan(feed.feature('BTC-USD')))
+        coordinator.send(("sentiment", {'BTC-USD': 0.4}))
+        await _wait_for(lambda: feed.feature('BTC-USD') == 0.4, timeout=1)
+        channel.close()
+        coordinator.close()
+
+class TestShardCoordinator(unittest.IsolatedAsyncioTestCase):
+
+    def _coordinator(self, budget=1000.0):
+        coordinator = ShardCoordinator(['BTC-USD', 'ETH-USD', 'SOL-USD'], workers=2, budget=budget)
+        for worker_id in (0, 1):
+            coordinator.workers[worker_id] = _Worker(worker_id, MagicMock(), MagicMock(poll=lambda: False), [])
+        return coordinator
+
+    async def test_reservations_never_exceed_budget(self):
+        coordinator = self._coordinator()
+        first, second = coordinator.workers[0], coordinator.workers[1]
+        coordinator._handle(first, ("reserve", 0, 'BTC-USD', 600.0))
+        coordinator._handle(second, ("reserve", 0, 'ETH-USD', 600.0))
+        first.conn.send.assert_any_call(("reply", 0, True))
+        second.conn.send.assert_any_call(("reply", 0, False))
+        # La compra se ejecuta: el coste pasa de la reserva a la posición
+        coordinator._handle(first, ("fill", 'BTC-USD', "buy", 100.0, 6.0))
+        coordinator._handle(first, ("release", 'BTC-USD'))
+        self.assertAlmostEqual(coordinator.deployed(), 600.0)
+        coordinator._handle(second, ("reserve", 1, 'ETH-USD', 400.0))
+        second.conn.send.assert_any_call(("reply", 1, True))
+        coordinator._handle(first, ("fill", 'BTC-USD', "sell", 110.0, 6.0))
+        self.assertAlmostEqual(coordinator.deployed(), 400.0)
+
+    async def test_lost_worker_releases_reservations(self):
+        coordinator = self._coordinator()
+        coordinator.respawn = False
+        coordinator._handle(coordinator.workers[0], ("reserve", 0, 'BTC-USD', 900.0))
+        self.assertEqual(coordinator.available_balance(), 100.0)
+        with patch.object(asyncio.get_running_loop(), 'remove_reader'):
+            coordinator._worker_lost(0)
+        self.assertEqual(coordinator.available_balance(), 1000.0)
+        self.assertEqual(coordinator.workers[1].symbols, ['BTC-USD', 'ETH-USD', 'SOL-USD'])
+
+    async def test_replacement_keeps_the_assignment(self):
+        coordinator = self._coordinator()
+        coordinator.rebalance()
+        before = dict(coordinator.assignment)
+        coordinator.respawn = True
+        coordinator.workers[0].started -= coordinator.monitor_interval
+        spawned = []
+
+        def spawn(worker_id, symbols):
+            spawned.append(worker_id)
+            coordinator.workers[worker_id] = _Worker(worker_id, MagicMock(), MagicMock(poll=lambda: False), symbols)
+
+        with patch.object(coordinator, '_spawn', side_effect=spawn), \
+                patch.object(asyncio.get_running_loop(), 'remove_reader'):
+            coordinator._worker_lost(0)
+        # El sustituto hereda el id: los símbolos del superviviente (y sus posiciones) no se mueven
+        self.assertEqual(spawned, [0])
+        self.assertEqual(coordinator.assignment, before)
+
+    async def test_portfolio_is_optimized_across_workers(self):
+        coordinator = self._coordinator()
+        for k, symbol in enumerate(coordinator.symbols):
+            coordinator._handle(coordinator.workers[k % 2], ("closes", symbol, np.linspace(1, 2 + k, 50).tobytes()))
+        allocations = {'BTC-USD': 0.5, 'ETH-USD': 0.3, 'SOL-USD': 0.2}
+        with patch('trading_bot.sharding.allocations_from_closes', return_value=allocations) as optimize:
+            await coordinator.rebalance_portfolio()
+        symbols, closes = optimize.call_args[0]
+        self.assertEqual(symbols, ['BTC-USD', 'ETH-USD', 'SOL-USD'])
+        self.assertEqual(len(closes), 3)
+        for worker in coordinator.workers.values():
+            worker.conn.send.assert_any_call(("allocations", allocations))
+
+    async def test_workers_share_the_budget_and_symbols_move_when_one_dies(self):
+        symbols = [f'SYM{i}-USD' for i in range(8)]
+        # fork: con spawn el hijo reimportaría este módulo con el directorio del paquete en sys.path
+        coordinator = ShardCoordinator(symbols, workers=2, budget=1000.0, simulator=False, respawn=False,
+                                       monitor_interval=0.1, start_method='fork', target=_buying_worker)
+        await coordinator.start()
+        try:
+            await _wait_for(lambda: len(coordinator.positions) == 3 and coordinator.reserved() == 0)
+            await asyncio.sleep(0.2)
+            # 8 compras de 300 con 1000 de presupuesto: sólo caben 3 entre los dos procesos
+            self.assertEqual(len(coordinator.positions), 3)
+            self.assertAlmostEqual(coordinator.deployed(), 900.0)
+            victim, survivor = list(coordinator.workers)
+            coordinator.workers[victim].process.kill()
+            await _wait_for(lambda: victim not in coordinator.workers)
+            self.assertEqual(coordinator.workers[survivor].symbols, sorted(symbols))
+        finally:
+            await coordinator.stop(timeout=5)
+        self.assertEqual(coordinator.workers, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import unittest
+from trading_bot.app import initialize_client
+from trading_bot.exchange import ExchangeClient
+from trading_bot.simulator import ExchangeSimulator, SimulatedExchangeError, RateLimitExceeded
+from trading_bot.streaming import MarketStream
+
+class TestExchangeSimulator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_serves_market_data_with_latency(self):
+        simulator = ExchangeSimulator(["BTC-USD"], bars=50, latency=0.02, jitter=0.005)
+        exchange = ExchangeClient(simulator)
+        started = time.perf_counter()
+        price = await exchange.get_price("BTC-USD")
+        self.assertGreaterEqual(time.perf_counter() - started, 0.015)
+        self.assertEqual(price, simulator.price("BTC-USD"))
+        candles = await exchange.get_candles("BTC-USD", limit=20)
+        self.assertEqual(len(candles["candles"]), 20)
+        self.assertEqual(await exchange.get_precision("BTC-USD"), (4, 2))
+        stats = simulator.stats()["endpoints"]
+        self.assertEqual(stats["ticker"]["requests"], 1)
+        self.assertGreaterEqual(stats["ticker"]["p50_ms"], 15)
+        await exchange.close()
+
+    async def test_injected_errors_and_rate_limit(self):
+        failing = ExchangeSimulator(["BTC-USD"], bars=10, latency=0, jitter=0, error_rate=1.0)
+        with self.assertRaises(SimulatedExchangeError):
+            await failing.get_ticker("BTC-USD")
+        self.assertEqual(failing.stats()["endpoints"]["ticker"]["errors"], 1)
+
+        limited = ExchangeSimulator(["BTC-USD"], bars=10, latency=0, jitter=0, rate_limit=5)
+        results = await asyncio.gather(*(limited.get_ticker("BTC-USD") for _ in range(10)), return_exceptions=True)
+        rejected = [r for r in results if isinstance(r, RateLimitExceeded)]
+        self.assertEqual(len(rejected), 5)
+        self.assertEqual(limited.stats()["endpoints"]["ticker"]["rejected"], 5)
+
+    async def test_orders_update_balance_and_positions(self):
+        simulator = ExchangeSimulator(["BTC-USD"], bars=10, latency=0, jitter=0, balance=1_000_000)
+        price = simulator.price("BTC-USD")
+        await simulator.create_order(market="BTC-USD", side="buy", size=2, price=price * 0.98)
+        self.assertAlmostEqual(simulator.balance, 1_000_000 - 2 * price)
+        self.assertEqual(simulator.positions["BTC-USD"], 2)
+        await simulator.create_order(market="BTC-USD", side="sell", size=2, price=price * 0.98)
+        self.assertAlmostEqual(simulator.balance, 1_000_000)
+        with self.assertRaises(SimulatedExchangeError):
+            await simulator.create_order(market="BTC-USD", side="buy", size=1e9)
+        self.assertEqual(len(simulator.orders), 2)
+        # Reenviar con el mismo client_id no abre una segunda posición
+        for _ in range(2):
+            await simulator.create_order(market="BTC-USD", side="buy", size=1, client_id="abc")
+        self.assertEqual(len(simulator.orders), 3)
+        self.assertEqual(simulator.positions["BTC-USD"], 1)
+
+    async def test_websocket_feeds_market_stream(self):
+        simulator = ExchangeSimulator(["WSTEST-USD"], bars=10, latency=0, jitter=0, tick_interval=0.02)
+        # Símbolo propio: el canal de velas escribe en la caché de velas compartida
+        url = await simulator.serve()
+        stream = MarketStream(url=url)
+        queue = stream.subscribe("WSTEST-USD")
+        task = asyncio.create_task(stream.run())
+        try:
+            update = None
+            while update is None or update["channel"] != "trades":
+                update = await asyncio.wait_for(queue.get(), 2)
+            self.assertAlmostEqual(update["price"], simulator.price("WSTEST-USD"), delta=simulator.price("WSTEST-USD") * 0.01)
+            self.assertTrue(stream.connected.is_set())
+        finally:
+            await stream.stop()
+            task.cancel()
+            await simulator.close()
+        self.assertGreater(simulator.stats()["ws_messages"], 0)
+
+    async def test_initialize_client_returns_simulator(self):
+        client, indexer, faucet = await initialize_client(simulator=True, symbols=["ETH-USD"])
+        self.assertIsInstance(client, ExchangeSimulator)
+        self.assertIs(client, indexer)
+        self.assertEqual(list(client.series), ["ETH-USD"])
+
+if __name__ == "__main__":
+    unittest.main()
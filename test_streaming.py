@@ -0,0 +1,118 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import websockets
+from trading_bot.candles import get_candle_store
+from trading_bot.streaming import MarketStream
+
+class LocalIndexerWebSocket:
+    """WebSocket local que imita al indexer: registra suscripciones y reenvía mensajes."""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.connections = set()
+        self.subscribed = asyncio.Event()
+        self.server = None
+
+    async def _handler(self, ws):
+        self.connections.add(ws)
+        try:
+            async for raw in ws:
+                self.subscriptions.append(json.loads(raw))
+                self.subscribed.set()
+        finally:
+            self.connections.discard(ws)
+
+    async def start(self):
+        self.server = await websockets.serve(self._handler, "127.0.0.1", 0)
+        port = list(self.server.sockets)[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def broadcast(self, message):
+        for ws in list(self.connections):
+            await ws.send(json.dumps(message))
+
+    async def drop_connections(self):
+        for ws in list(self.connections):
+            await ws.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+def trade_message(symbol, price):
+    return {"type": "channel_data", "channel": "v4_trades", "id": symbol,
+            "contents": {"trades": [{"price": str(price), "size": "1", "side": "BUY"}]}}
+
+class TestMarketStream(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.indexer = LocalIndexerWebSocket()
+        url = await self.indexer.start()
+        self.exchange = AsyncMock()
+        self.stream = MarketStream(self.exchange, url=url)
+        self.queues = [self.stream.subscribe('BTC-USD'), self.stream.subscribe('BTC-USD')]
+        self.task = asyncio.create_task(self.stream.run())
+        await asyncio.wait_for(self.stream.connected.wait(), 2)
+        await asyncio.wait_for(self.indexer.subscribed.wait(), 2)
+
+    async def asyncTearDown(self):
+        await self.stream.stop()
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        await self.indexer.stop()
+
+    async def test_subscribes_to_trades_markets_and_candles(self):
+        await asyncio.sleep(0.05)
+        channels = {(m['channel'], m.get('id')) for m in self.indexer.subscriptions}
+        self.assertIn(('v4_trades', 'BTC-USD'), channels)
+        self.assertIn(('v4_candles', 'BTC-USD/1HOUR'), channels)
+        self.assertIn(('v4_markets', None), channels)
+
+    async def test_trades_fan_out_to_every_consumer(self):
+        await self.indexer.broadcast(trade_message('BTC-USD', 101.5))
+        for queue in self.queues:
+            update = await self.stream.next_update(queue, 1)
+            self.assertEqual(update['price'], 101.5)
+            self.assertEqual(update['channel'], 'trades')
+        self.assertEqual(self.stream.prices['BTC-USD'], 101.5)
+
+    async def test_slow_consumer_keeps_latest_updates(self):
+        self.stream.queue_size = 2
+        queue = self.stream.subscribe('ETH-USD')
+        for price in (1, 2, 3):
+            self.stream.handle_message(trade_message('ETH-USD', price))
+        self.assertEqual([queue.get_nowait()['price'] for _ in range(queue.qsize())], [2.0, 3.0])
+
+    async def test_candles_update_shared_store(self):
+        candle = {"startedAt": "2024-01-01T00:00:00.000Z", "open": "1", "high": "3", "low": "1",
+                  "close": "2", "baseTokenVolume": "5"}
+        await self.indexer.broadcast({"type": "channel_data", "channel": "v4_candles", "id": "BTC-USD/1HOUR",
+                                      "contents": candle})
+        await self.stream.next_update(self.queues[0], 1)
+        self.assertEqual(get_candle_store('BTC-USD', '1H').closes()[-1], 2.0)
+
+    async def test_watched_prices_reach_the_risk_engine(self):
+        # Sin consumidores: SOL-USD sólo está vigilado, pero su precio debe llegar igualmente al riesgo
+        stream = MarketStream(self.exchange, risk=MagicMock(), symbols=['SOL-USD'])
+        stream.handle_message({"type": "channel_data", "channel": "v4_markets",
+                               "contents": {"oraclePrices": {"SOL-USD": {"oraclePrice": "150"},
+                                                             "DOGE-USD": {"oraclePrice": "0.1"}}}})
+        stream.risk.update_price.assert_called_once_with('SOL-USD', 150.0)
+        candle = {"startedAt": "2024-01-01T00:00:00.000Z", "open": "1", "high": "3", "low": "1",
+                  "close": "151", "baseTokenVolume": "5"}
+        stream.handle_message({"type": "channel_data", "channel": "v4_candles", "id": "SOL-USD/1HOUR",
+                               "contents": candle})
+        stream.risk.update_price.assert_called_with('SOL-USD', 151.0)
+
+    async def test_falls_back_to_rest_on_disconnect(self):
+        self.exchange.get_price.return_value = 99.0
+        with patch('trading_bot.streaming.REST_FALLBACK_INTERVAL', 0.01):
+            await self.indexer.drop_connections()
+            update = await self.stream.next_update(self.queues[0], 1)
+        self.assertEqual(update['channel'], 'rest')
+        self.assertEqual(update['price'], 99.0)
+
+if __name__ == '__main__':
+    unittest.main()
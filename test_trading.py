@@ -1,53 +1,164 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
-from trading_bot.trading import buy_crypto, sell_crypto, get_avg_volume, calculate_position_size, macd_confirmation
-
-class TestTrading(unittest.TestCase):
-
-    @patch('trading_bot.trading.Client')
-    def test_get_avg_volume(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_klines.return_value = [
-            [0, 0, 0, 0, 0, 100], [0, 0, 0, 0, 0, 200], [0, 0, 0, 0, 0, 300]
-        ]
-        avg_volume = get_avg_volume(mock_client, 'BTCUSDT', period=3)
-        self.assertEqual(avg_volume, 200)
-
-    @patch('trading_bot.trading.Client')
-    def test_calculate_position_size(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_klines.return_value = [
-            [0, 0, 0, 0, 0, 100], [0, 0, 0, 0, 0, 200], [0, 0, 0, 0, 0, 300]
-        ]
-        position_size = calculate_position_size(mock_client, 'BTCUSDT', 100)
+from unittest.mock import patch, MagicMock, AsyncMock
+from trading_bot.benchmarks.synthetic import SyntheticClient
+from trading_bot.config import DEFAULT_ALLOCATION
+from trading_bot.exchange import ExchangeClient
+from trading_bot.trading import buy_crypto, sell_crypto, get_avg_volume, calculate_position_size, macd_confirmation, \
+    TradingSupervisor
+
+class TestTrading(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.symbol = f'SYN{self.id().rsplit(".", 1)[-1]}-USD'
+        self.client = SyntheticClient([self.symbol], bars=300, seed=7)
+        self.exchange = ExchangeClient(self.client)
+        self.candles = self.client.series[self.symbol]
+
+    async def asyncTearDown(self):
+        await self.exchange.close()
+
+    async def test_get_avg_volume(self):
+        avg_volume = await get_avg_volume(self.exchange, self.symbol, period=3)
+        self.assertAlmostEqual(avg_volume, self.candles['volume'][-3:].mean())
+
+    async def test_calculate_position_size(self):
+        position_size = await calculate_position_size(self.exchange, self.symbol, self.candles['close'][-1])
         self.assertGreater(position_size, 0)
 
-    @patch('trading_bot.trading.Client')
-    def test_macd_confirmation(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_klines.return_value = [
-            [0, 0, 0, 0, 100], [0, 0, 0, 0, 200], [0, 0, 0, 0, 300]
-        ]
-        confirmation = macd_confirmation(mock_client, 'BTCUSDT')
-        self.assertIsInstance(confirmation, bool)
-
-    @patch('trading_bot.trading.Client')
-    def test_buy_crypto(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_price.return_value = 100
-        mock_client.get_volume.return_value = 1000
-        mock_client.get_avg_volume.return_value = 800
-        mock_client.macd_confirmation.return_value = True
-        price, quantity = buy_crypto(mock_client, 'BTCUSDT', 1000)
-        self.assertIsNotNone(price)
-        self.assertIsNotNone(quantity)
-
-    @patch('trading_bot.trading.Client')
-    def test_sell_crypto(self, MockClient):
-        mock_client = MockClient()
-        mock_client.get_price.return_value = 200
-        sell_crypto(mock_client, 'BTCUSDT', 100, 10, 0.05, 0.02)
-        mock_client.order_limit_sell.assert_called()
+    async def test_macd_confirmation(self):
+        confirmation = await macd_confirmation(self.exchange, self.symbol)
+        self.assertIn(confirmation, (True, False))
+
+    async def test_buy_crypto(self):
+        with patch('trading_bot.trading.macd_confirmation', AsyncMock(return_value=True)):
+            price, quantity = await buy_crypto(self.exchange, self.symbol, 1000)
+        self.assertAlmostEqual(price, self.candles['close'][-1])
+        self.assertGreater(quantity, 0)
+        self.assertLessEqual(quantity, round(1000 * DEFAULT_ALLOCATION / price, 4))  # stepSize 0.0001
+
+    async def test_buy_crypto_skips_zero_allocation(self):
+        ledger, risk = MagicMock(), MagicMock()
+        ledger.available.return_value = 1e9
+        risk.symbol_risk.return_value = (0.0, 0.0)
+        with patch('trading_bot.trading.macd_confirmation', AsyncMock(return_value=True)), \
+                patch('trading_bot.trading.REAL_MARKET', True), \
+                patch('trading_bot.trading.log_transaction') as log:
+            result = await buy_crypto(self.exchange, self.symbol, 1000, ledger=ledger, allocation=0, risk=risk)
+        self.assertEqual(result, (None, None))
+        ledger.reserve.assert_not_called()
+        risk.on_fill.assert_not_called()
+        log.assert_not_called()
+        self.assertEqual(self.client.orders, [])
+
+    async def test_entry_poll_updates_risk(self):
+        risk = MagicMock()
+        risk.symbol_risk.return_value = (0.0, 0.0)
+        risk.allows_entry.return_value = False
+        with patch('trading_bot.trading.macd_confirmation', AsyncMock(return_value=True)):
+            self.assertEqual(await buy_crypto(self.exchange, self.symbol, 1000, risk=risk), (None, None))
+        risk.update_price.assert_called_once_with(self.symbol, self.candles['close'][-1])
+
+    async def test_buy_crypto_skips_entry_on_negative_sentiment(self):
+        feed = MagicMock()
+        feed.feature.return_value = -0.9
+        with patch('trading_bot.trading.macd_confirmation', AsyncMock(return_value=True)), \
+                patch('trading_bot.trading.get_sentiment_feed', return_value=feed):
+            self.assertEqual(await buy_crypto(self.exchange, self.symbol, 1000), (None, None))
+        feed.feature.assert_called_once_with(self.symbol)
+
+    async def test_sell_crypto(self):
+        buy_price = self.candles['close'][-1] / 1.1
+        with patch('trading_bot.trading.REAL_MARKET', True):
+            await sell_crypto(self.exchange, self.symbol, buy_price, 10, 0.05, 0.02)
+        self.assertEqual(len(self.client.orders), 1)
+        self.assertEqual(self.client.orders[0]['side'], 'sell')
+
+    async def test_empty_candle_cache_falls_back_to_rest_atr(self):
+        # Stream conectado pero sin velas en la caché (vaciada tras un hueco): el ATR se pide por REST
+        stream = MagicMock()
+        stream.connected.is_set.return_value = True
+        stream.next_update = AsyncMock(return_value={'price': 110.0})
+        with patch('trading_bot.trading.aget_atr', AsyncMock(return_value=1.0)) as aget_atr:
+            await sell_crypto(self.exchange, self.symbol, 100.0, 1, 0.05, 0.02, stream=stream)
+        aget_atr.assert_awaited_once_with(self.exchange, self.symbol)
+
+class TestTradingSupervisor(unittest.IsolatedAsyncioTestCase):
+
+    async def test_symbols_run_concurrently_within_limit(self):
+        active = 0
+        peak = 0
+        seen = []
+
+        async def fake_buy(client, symbol, budget, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            seen.append(symbol)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return None, None
+
+        symbols = [f'SYM{i}-USD' for i in range(6)]
+        with patch('trading_bot.trading.buy_crypto', side_effect=fake_buy):
+            supervisor = TradingSupervisor(MagicMock(), symbols, 1000, max_concurrency=2)
+            supervisor.start()
+            await asyncio.sleep(0.2)
+            await supervisor.shutdown(timeout=1)
+        self.assertEqual(set(seen), set(symbols))
+        self.assertEqual(peak, 2)
+        self.assertEqual(supervisor.tasks, {})
+
+    async def test_shutdown_cancels_open_positions_after_timeout(self):
+        async def fake_sell(*args, **kwargs):
+            await asyncio.sleep(3600)
+
+        with patch('trading_bot.trading.buy_crypto', return_value=(100, 1)), \
+                patch('trading_bot.trading.sell_crypto', side_effect=fake_sell):
+            supervisor = TradingSupervisor(MagicMock(), ['BTC-USD'], 1000)
+            supervisor.start()
+            await asyncio.sleep(0.01)
+            task = supervisor.tasks['BTC-USD']
+            await supervisor.shutdown(timeout=0.05)
+        self.assertTrue(task.cancelled())
+
+    async def test_allocations_feed_buy_size(self):
+        allocations = []
+
+        async def fake_buy(client, symbol, budget, **kwargs):
+            allocations.append((symbol, kwargs['allocation']))
+            return None, None
+
+        with patch('trading_bot.trading.buy_crypto', side_effect=fake_buy), \
+                patch('trading_bot.trading.allocations_from_closes', return_value={'BTC-USD': 0.7, 'ETH-USD': 0.3}):
+            supervisor = TradingSupervisor(MagicMock(), ['BTC-USD', 'ETH-USD'], 1000)
+            await supervisor.rebalance()
+            supervisor.start()
+            await asyncio.sleep(0.01)
+            await supervisor.shutdown(timeout=1)
+        self.assertEqual(sorted(allocations), [('BTC-USD', 0.7), ('ETH-USD', 0.3)])
+
+    async def test_assign_starts_new_symbols_and_retires_removed(self):
+        seen = []
+
+        async def fake_buy(client, symbol, budget, **kwargs):
+            seen.append(symbol)
+            await asyncio.sleep(0.01)
+            return None, None
+
+        with patch('trading_bot.trading.buy_crypto', side_effect=fake_buy), \
+                patch('trading_bot.trading.ENTRY_RETRY_INTERVAL', 0.01):
+            supervisor = TradingSupervisor(MagicMock(), ['BTC-USD', 'ETH-USD'], 1000, rebalance_interval=0)
+            supervisor.start()
+            await asyncio.sleep(0.02)
+            supervisor.assign(['ETH-USD', 'SOL-USD'])
+            await asyncio.sleep(0.05)
+            self.assertEqual(set(supervisor.tasks), {'ETH-USD', 'SOL-USD'})
+            seen.clear()
+            await asyncio.sleep(0.05)
+            await supervisor.shutdown(timeout=1)
+        self.assertNotIn('BTC-USD', seen)
+        self.assertIn('SOL-USD', seen)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,164 +1,317 @@
 import logging
-import time
-import csv
 import asyncio
+import signal
+from contextlib import asynccontextmanager, nullcontext
 import numpy as np
-import pandas as pd
-from multiprocessing import Pool
-from dydx_v4_client import NodeClient, QueryNodeClient, IndexerClient, FaucetClient
-from dydx_v4_client.network import secure_channel, TESTNET, TESTNET_FAUCET
-from tests.conftest import TEST_ADDRESS
-from trading_bot.utils import get_precision, get_price, get_volume, adjust_sleep_time, execute_with_retry, get_balance, validate_balance, get_atr, get_technical_indicators
-from trading_bot.config import SYMBOLS, BUDGET, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, REAL_MARKET
-from trading_bot.backtesting import optimize_parameters
-
-# Configura la salida de logging
-logging.basicConfig(level=logging.INFO)
+from trading_bot.app import AppContext
+from trading_bot.candles import get_candle_store
+from trading_bot.indicators import get_indicator_engine
+from trading_bot.journal import get_journal
+from trading_bot.utils import adjust_sleep_time, submit_order, aget_atr, compute_atr
+from trading_bot.scheduler import request_priority, exit_priority
+from trading_bot.portfolio import snapshot_closes, allocations_from_closes
+from trading_bot.sharding import run_sharded
+from trading_bot.sentiment import get_sentiment_feed
+from trading_bot.strategy import volume_confirmation, sentiment_confirmation, risk_quantity, order_quantity, \
+    exit_levels, should_exit
+from trading_bot.metrics import DECISION_TICK_SECONDS, INDICATOR_SECONDS, ORDER_ROUNDTRIP_SECONDS
+from trading_bot.config import SYMBOLS, BUDGET, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, REAL_MARKET, \
+    MAX_CONCURRENT_SYMBOLS, ENTRY_RETRY_INTERVAL, SHUTDOWN_TIMEOUT, DEFAULT_ALLOCATION, PORTFOLIO_REBALANCE_INTERVAL, \
+    SHARD_WORKERS
 
 # Obtén un logger
 logger = logging.getLogger(__name__)
 
-# Usa el logger
-logger.info("Inicializando el bot de trading")
-
-# Ejemplo de inicialización del cliente
-try:
-    client = Client(
-        host='https://api.dydx.exchange',
-        api_key='tu_api_key',
-        api_secret='tu_api_secret',
-        passphrase='tu_passphrase'
-    )
-    logger.info("Cliente de dYdX inicializado correctamente")
-except Exception as e:
-    logger.error(f"Error al inicializar el cliente de dYdX: {e}")
-
-# Archivo de registro
-log_file = "transacciones.csv"
-with open(log_file, mode="w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Acción", "Símbolo", "Precio", "Cambio %", "Cantidad", "Saldo Restante"])
-
-node = await QueryNodeClient(secure_channel("test-dydx-grpc.kingnodes.com"))
-
-def log_transaction(action, price, change, quantity, remaining_balance):
-    with open(log_file, mode="a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([action, symbol, price, change, quantity, remaining_balance])
-
-async def test(): 
-     faucet = FaucetClient(TESTNET_FAUCET) 
-     response = await faucet.fill(TEST_ADDRESS, 0, 2000) 
-     print(response) 
-     print(response.status) 
-  
-  
- asyncio.run(test()) 
+def log_transaction(action, symbol, price, change, quantity, remaining_balance):
+    get_journal().record(action, symbol, price, change, quantity, remaining_balance)
+
+async def test():
+    from dydx_v4_client import FaucetClient
+    from dydx_v4_client.network import TESTNET_FAUCET
+    from tests.conftest import TEST_ADDRESS
+    faucet = FaucetClient(TESTNET_FAUCET)
+    response = await faucet.fill(TEST_ADDRESS, 0, 2000)
+    print(response)
+    print(response.status)
 
 async def test_account():
+    from dydx_v4_client import IndexerClient
+    from dydx_v4_client.network import TESTNET
     indexer = IndexerClient(TESTNET.rest_indexer)
 
     print(await indexer.account.get_subaccounts("dydx1ree4zw38cxtn9l9mkjgdjnveud6mly0mr6wq9j"))
 
-async def initialize_client():
-    try:
-        node = await NodeClient(secure_channel("test-dydx-grpc.kingnodes.com"))
-        indexer = IndexerClient(TESTNET.rest_indexer)
-        faucet = FaucetClient()
-        logger.info("Clientes de dYdX inicializados correctamente")
-        return node, indexer, faucet
-    except Exception as e:
-        logger.error(f"Error al inicializar los clientes de dYdX: {e}")
-        return None, None, None
-        
 async def get_avg_volume(client, symbol, period=30):
-    klines = await client.public.get_candles(market=symbol, resolution="1H", limit=period)
-    volumes = [float(k['volume']) for k in klines['candles']]
-    return np.mean(volumes)
+    store = await get_candle_store(symbol, "1H").arefresh(client, limit=period)
+    return np.mean(store.column("volume", period))
 
-async def calculate_position_size(client, symbol, buy_price):
-    atr = await get_atr(client, symbol)
-    risk_amount = BUDGET * RISK_PERCENTAGE
+async def calculate_position_size(client, symbol, buy_price, risk=None):
+    atr = await aget_atr(client, symbol)
     stop_distance = atr  # Utilizando ATR como medida de riesgo
+    if risk is not None:
+        # Si el VaR histórico del símbolo es mayor que el ATR, manda el VaR
+        stop_distance = max(stop_distance, risk.symbol_risk(symbol)[0] * buy_price)
     if stop_distance == 0:
-        return BUDGET * 0.25 / buy_price
-    return risk_amount / stop_distance
+        return BUDGET * DEFAULT_ALLOCATION / buy_price
+    return risk_quantity(stop_distance)
 
 async def macd_confirmation(client, symbol):
-    klines = await client.public.get_candles(market=symbol, resolution="1H", limit=200)
-    close_prices = [float(k['close']) for k in klines['candles']]
-    df = pd.DataFrame(close_prices, columns=["close"])
-    df["EMA12"] = pd.Series(df["close"]).ewm(span=12, adjust=False).mean()
-    df["EMA26"] = pd.Series(df["close"]).ewm(span=26, adjust=False).mean()
-    df["MACD"] = df["EMA12"] - df["EMA26"]
-    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    return df["MACD"].iloc[-1] > df["Signal"].iloc[-1]
-
-async def buy_crypto(client, symbol, budget):
-    if not await validate_balance(client, budget):
+    store = await get_candle_store(symbol, "1H").arefresh(client, limit=200)
+    with INDICATOR_SECONDS.labels("incremental").time():
+        indicators = get_indicator_engine(symbol, "1H").sync(store)
+    return indicators["MACD"] > indicators["Signal"]
+
+async def _precision(client, symbol, metadata):
+    if metadata is not None and symbol in metadata:
+        return metadata.precision(symbol)
+    return await client.get_precision(symbol)
+
+async def buy_crypto(client, symbol, budget, metadata=None, ledger=None, allocation=DEFAULT_ALLOCATION, risk=None):
+    with DECISION_TICK_SECONDS.labels(symbol, "entry").time():
+        return await _buy_crypto(client, symbol, budget, metadata, ledger, allocation, risk)
+
+async def _buy_crypto(client, symbol, budget, metadata, ledger, allocation, risk):
+    balance = ledger.available() if ledger is not None else await client.get_balance()
+    if balance < budget:
         logging.error(f"{symbol}: Saldo insuficiente, no se ejecuta la compra.")
         return None, None
-    initial_price = await get_price(client, symbol)
+    # Último valor ya calculado en segundo plano: leerlo no hace ninguna petición
+    if not sentiment_confirmation(get_sentiment_feed().feature(symbol)):
+        logging.info(f"{symbol}: Sentimiento de mercado desfavorable. Compra evitada.")
+        return None, None
+    initial_price = await client.get_price(symbol)
     if not initial_price:
         return None, None
-    volume = await get_volume(client, symbol)
+    if risk is not None:
+        # Sin posición abierta el riesgo del símbolo también se mantiene con el sondeo de entrada
+        risk.update_price(symbol, initial_price)
+    volume = await client.get_volume(symbol)
     avg_vol = await get_avg_volume(client, symbol)
-    if volume < 1.2 * avg_vol or not await macd_confirmation(client, symbol):
+    if not volume_confirmation(volume, avg_vol) or not await macd_confirmation(client, symbol):
         logging.info(f"{symbol}: Condiciones no favorables (volumen/MACD). Compra evitada.")
         return None, None
 
-    q_prec, p_prec = await get_precision(client, symbol)
-    pos_size = await calculate_position_size(client, symbol, initial_price)
-    quantity = round(min(budget * 0.25 / initial_price, pos_size), q_prec)
+    q_prec, p_prec = await _precision(client, symbol, metadata)
+    pos_size = await calculate_position_size(client, symbol, initial_price, risk)
+    quantity = round(order_quantity(budget, allocation, initial_price, pos_size), q_prec)
+    # Una asignación nula o mínima de la cartera optimizada redondea a 0: no hay orden que enviar
+    min_size = metadata.min_order_size(symbol) if metadata is not None and symbol in metadata else 0.0
+    if quantity <= 0 or quantity < min_size:
+        logging.info(f"{symbol}: Cantidad {quantity} por debajo del mínimo del mercado. Compra evitada.")
+        return None, None
+    notional = quantity * initial_price
+    if risk is not None and not risk.allows_entry(symbol, notional):
+        logging.info(f"{symbol}: El CVaR de la cartera superaría el límite. Compra evitada.")
+        return None, None
+    # El importe queda apartado hasta que se aplica la ejecución: otro símbolo no puede gastarlo a la vez
+    if ledger is not None and not await ledger.reserve(notional, symbol):
+        logging.info(f"{symbol}: Saldo comprometido por otras compras. Compra evitada.")
+        return None, None
     try:
         if REAL_MARKET:
-            await execute_with_retry(client, client.private.create_order,  # Cambiar a función de orden de dYdX
-                               market=symbol,
-                               side="buy",
-                               size=quantity,
-                               price=round(initial_price * 0.98, p_prec))
+            with ORDER_ROUNDTRIP_SECONDS.labels("buy").time():
+                await submit_order(client,
+                                   market=symbol,
+                                   side="buy",
+                                   size=quantity,
+                                   price=round(initial_price * 0.98, p_prec))
+            if ledger is not None:
+                ledger.apply_fill("buy", initial_price, quantity)
+        if risk is not None:
+            risk.on_fill(symbol, "buy", initial_price, quantity)
         log_transaction("Compra", symbol, initial_price, 0, quantity, budget - (quantity * initial_price))
         return initial_price, quantity
     except Exception as e:  # Manejar excepción genérica
         logging.error(f"{symbol}: Orden de compra fallida: {e}")
-        time.sleep(5)
         return None, None
+    finally:
+        if ledger is not None:
+            ledger.release(notional, symbol)
+
+async def sell_crypto(client, symbol, buy_price, quantity, profit_threshold, trailing_stop, limiter=None, stream=None,
+                      metadata=None, ledger=None, risk=None):
+    q_prec, p_prec = await _precision(client, symbol, metadata)
+    queue = stream.subscribe(symbol) if stream else None
+    try:
+        await _watch_position(client, symbol, buy_price, quantity, profit_threshold, trailing_stop,
+                              q_prec, p_prec, limiter, stream, queue, ledger, risk)
+    finally:
+        if queue is not None:
+            stream.unsubscribe(symbol, queue)
+
+@asynccontextmanager
+async def _timed_tick(symbol):
+    with DECISION_TICK_SECONDS.labels(symbol, "exit").time():
+        yield
 
-async def sell_crypto(client, symbol, buy_price, quantity, profit_threshold, trailing_stop):
-    q_prec, p_prec = await get_precision(client, symbol)
+async def _watch_position(client, symbol, buy_price, quantity, profit_threshold, trailing_stop,
+                          q_prec, p_prec, limiter, stream, queue, ledger, risk):
+    # Último precio/ATR conocidos: fijan la frecuencia de consulta y la prioridad de las peticiones
+    current_price = atr = None
+    exit_prices = ()
     while True:
-        current_price = await get_price(client, symbol)
-        if not current_price:
-            time.sleep(await adjust_sleep_time(client, symbol))
-            continue
-        price_change = (current_price - buy_price) / buy_price
-        logging.info(f"{symbol}: Precio actual: ${current_price:.2f} | Cambio: {price_change * 100:.2f}%")
+        interval = adjust_sleep_time(client, symbol, current_price, atr, exit_prices)
+        update = None
+        if queue is not None:
+            # Con el feed activo se evalúa en cuanto llega un precio; si no llega nada se consulta por REST
+            update = await stream.next_update(queue, interval)
+        # Cuanto más cerca de una salida, antes se atienden sus peticiones dentro del límite global
+        with request_priority(exit_priority(current_price, atr, exit_prices)):
+            async with limiter or nullcontext(), _timed_tick(symbol):
+                current_price = update["price"] if update else await client.get_price(symbol)
+                if current_price:
+                    if risk is not None:
+                        risk.update_price(symbol, current_price)
+                    price_change = (current_price - buy_price) / buy_price
+                    logging.info(f"{symbol}: Precio actual: ${current_price:.2f} | Cambio: {price_change * 100:.2f}%")
+
+                    atr = np.nan
+                    if stream is not None and stream.connected.is_set():
+                        # El canal de velas mantiene la caché al día: no hace falta pedirlas por REST
+                        store = get_candle_store(symbol, "1H")
+                        atr = compute_atr(store.column("high"), store.column("low"), store.column("close"))
+                    if np.isnan(atr):
+                        # Sin stream, o con la caché vaciada tras un hueco y aún sin velas suficientes
+                        atr = await aget_atr(client, symbol)
+                    exit_prices = exit_levels(buy_price, atr, profit_threshold, trailing_stop)
+
+                    if should_exit(current_price, *exit_prices):
+                        try:
+                            if REAL_MARKET:
+                                with ORDER_ROUNDTRIP_SECONDS.labels("sell").time():
+                                    await submit_order(client,
+                                                       market=symbol,
+                                                       side="sell",
+                                                       size=round(quantity, q_prec),
+                                                       price=round(current_price * 0.98, p_prec))
+                                if ledger is not None:
+                                    ledger.apply_fill("sell", current_price, quantity)
+                            if risk is not None:
+                                risk.on_fill(symbol, "sell", current_price, quantity)
+                            log_transaction("Venta", symbol, current_price, price_change * 100, quantity, buy_price * quantity)
+                        except Exception as e:  # Manejar excepción genérica
+                            # La posición sigue abierta: se vuelve a intentar en la próxima evaluación
+                            logging.error(f"{symbol}: Orden de venta fallida: {e}")
+                        else:
+                            break
+        if queue is None:
+            await asyncio.sleep(adjust_sleep_time(client, symbol, current_price, atr, exit_prices))
+
+class TradingSupervisor:
+    """Ejecuta una tarea por símbolo con un límite de concurrencia y apagado ordenado."""
+
+    def __init__(self, client, symbols=SYMBOLS, budget=BUDGET, max_concurrency=MAX_CONCURRENT_SYMBOLS, stream=None,
+                 metadata=None, ledger=None, allocations=None, rebalance_interval=PORTFOLIO_REBALANCE_INTERVAL,
+                 risk=None):
+        self.client = client
+        self.risk = risk
+        self.stream = stream
+        self.metadata = metadata
+        self.ledger = ledger
+        self.symbols = list(symbols)
+        self.budget = budget
+        # Fracción del presupuesto por símbolo; se recalcula con la cartera óptima cada `rebalance_interval`
+        self.allocations = dict(allocations or {})
+        self.rebalance_interval = rebalance_interval
+        # Limita cuántos símbolos consultan el exchange a la vez; las esperas no ocupan plaza
+        self.limiter = asyncio.Semaphore(max_concurrency)
+        self.stopping = asyncio.Event()
+        self.tasks = {}
+
+    async def _wait(self, seconds):
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def trade_symbol(self, symbol):
+        # Un símbolo retirado con assign() termina su posición abierta y no vuelve a entrar
+        while not self.stopping.is_set() and symbol in self.symbols:
+            try:
+                async with self.limiter:
+                    initial_price, quantity = await buy_crypto(
+                        self.client, symbol, self.budget, metadata=self.metadata, ledger=self.ledger,
+                        allocation=self.allocations.get(symbol, DEFAULT_ALLOCATION), risk=self.risk)
+                if initial_price and quantity:
+                    await sell_crypto(self.client, symbol, initial_price, quantity,
+                                      DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP, limiter=self.limiter, stream=self.stream,
+                                      metadata=self.metadata, ledger=self.ledger, risk=self.risk)
+            except asyncio.CancelledError:
+                logger.warning(f"{symbol}: Tarea cancelada")
+                raise
+            except Exception as e:
+                logger.error(f"{symbol}: Error en el ciclo de trading: {e}")
+            await self._wait(ENTRY_RETRY_INTERVAL)
+
+    async def rebalance(self):
+        # El optimizador es CPU: se ejecuta en un hilo para no frenar el resto de símbolos, sobre una copia de
+        # los cierres hecha aquí porque el bucle sigue actualizando las cachés de velas
+        symbols = list(self.symbols)
+        self.allocations = await asyncio.to_thread(allocations_from_closes, symbols, snapshot_closes(symbols))
+        return self.allocations
+
+    async def _rebalance_loop(self):
+        while not self.stopping.is_set():
+            try:
+                await self.rebalance()
+            except Exception as e:
+                logger.error(f"Error al recalcular la cartera: {e}")
+            await self._wait(self.rebalance_interval)
+
+    def start(self):
+        if self.rebalance_interval and "rebalance" not in self.tasks:
+            self.tasks["rebalance"] = asyncio.create_task(self._rebalance_loop(), name="rebalance")
+        for symbol in self.symbols:
+            if symbol not in self.tasks:
+                task = self.tasks[symbol] = asyncio.create_task(self.trade_symbol(symbol), name=f"trade-{symbol}")
+                task.add_done_callback(lambda t, s=symbol: self.tasks.pop(s) if self.tasks.get(s) is t else None)
+
+    def assign(self, symbols):
+        """Cambia los símbolos de este supervisor: arranca los nuevos y retira los que ya no están."""
+        self.symbols = list(symbols)
+        if not self.stopping.is_set():
+            self.start()
+
+    def stop(self):
+        if not self.stopping.is_set():
+            logger.info("Deteniendo el bot de trading: no se abrirán nuevas posiciones")
+            self.stopping.set()
 
-        atr = await get_atr(client, symbol)
-        dynamic_trailing_stop = max(trailing_stop, atr / buy_price)
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Espera a que las posiciones abiertas se cierren y cancela lo que quede tras `timeout`."""
+        self.stop()
+        if not self.tasks:
+            return
+        _, pending = await asyncio.wait(self.tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
 
-        if price_change >= profit_threshold or current_price < buy_price * (1 - dynamic_trailing_stop):
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
             try:
-                if REAL_MARKET:
-                    await execute_with_retry(client, client.private.create_order,  # Cambiar a función de orden de dYdX
-                                        market=symbol,
-                                        side="sell",
-                                        size=round(quantity, q_prec),
-                                        price=round(current_price * 0.98, p_prec))
-                log_transaction("Venta", symbol, current_price, price_change * 100, quantity, buy_price * quantity)
-            except Exception as e:  # Manejar excepción genérica
-                logging.error(f"{symbol}: Orden de venta fallida: {e}")
-                time.sleep(5)
-            break
-        time.sleep(await adjust_sleep_time(client, symbol))
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        self.start()
+        try:
+            await self.stopping.wait()
+        finally:
+            await self.shutdown()
 
 async def main():
-    client, indexer, faucet = await initialize_client()
-    if client and indexer and faucet:
-        for symbol in SYMBOLS:
-            initial_price, quantity = await buy_crypto(client, symbol, BUDGET)
-            if initial_price and quantity:
-                await sell_crypto(client, symbol, initial_price, quantity, DEFAULT_PROFIT_THRESHOLD, DEFAULT_TRAILING_STOP)
+    # Configura la salida de logging
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Inicializando el bot de trading")
+    if SHARD_WORKERS > 1:
+        await run_sharded()
+        return
+    async with AppContext() as app:
+        if await app.start():
+            await TradingSupervisor(app.exchange, SYMBOLS, BUDGET, stream=app.stream, metadata=app.metadata,
+                                    ledger=app.ledger, risk=app.risk).run()
 
 if __name__ == "__main__":
     asyncio.run(main())
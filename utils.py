@@ -1,11 +1,12 @@
-import logging
-import time
-from dydx3 import Client
+import uuid
 import numpy as np
-import pandas as pd
-import talib
-from textblob import TextBlob
-import requests
+from trading_bot.candles import get_candle_store
+from trading_bot.indicators import compute_indicators
+from trading_bot.metrics import INDICATOR_SECONDS
+from trading_bot.retry import retry_async
+from trading_bot.sentiment import get_sentiment_feed
+from trading_bot.config import ORDER_DEADLINE
+from trading_bot.scheduler import poll_interval
 
 def get_precision(client, symbol):
     market = client.public.get_markets(market=symbol)
@@ -21,18 +22,23 @@ def get_volume(client, symbol):
     volume = client.public.get_24_hr_stats(market=symbol)
     return float(volume['markets'][symbol]['volume'])
 
-def adjust_sleep_time(client, symbol):
-    return 5
+def adjust_sleep_time(client, symbol, price=None, atr=None, exit_prices=()):
+    return poll_interval(price, atr, exit_prices)
 
-def execute_with_retry(client, func, *args, **kwargs):
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            logging.error(f"Error al ejecutar la orden: {e}")
-            time.sleep(2 ** attempt)
-    return None
+async def execute_with_retry(client, func, *args, deadline=ORDER_DEADLINE, **kwargs):
+    """Ejecuta la corrutina `func` con reintentos acotados por `deadline`; si no lo consigue propaga el error."""
+    return await retry_async(func, *args, deadline=deadline, **kwargs)
+
+async def submit_order(client, deadline=ORDER_DEADLINE, **order):
+    """Envía una orden con un client_id fijo para todos sus intentos.
+
+    Un timeout no se reintenta: la orden original puede seguir en curso en el
+    hilo del SDK y reenviarla duplicaría la posición. Ante otros errores el
+    reenvío lleva el mismo client_id, así que el exchange lo trata como la
+    misma orden.
+    """
+    order.setdefault("client_id", uuid.uuid4().hex)
+    return await retry_async(client.create_order, deadline=deadline, retry_on_timeout=False, **order)
 
 def get_balance(client):
     account = client.private.get_account()
@@ -42,43 +48,41 @@ def validate_balance(client, budget):
     balance = get_balance(client)
     return balance >= budget
 
+async def aget_atr(exchange, symbol, period=14):
+    store = await get_candle_store(symbol, "1H").arefresh(exchange, limit=period + 1)
+    return compute_atr(store.column("high"), store.column("low"), store.column("close"), period)
+
+def compute_atr(high, low, close, period=14):
+    high, low, close = high[-period - 1:], low[-period - 1:], close[-period - 1:]
+    if len(close) < period:
+        return np.nan
+    tr = high - low
+    tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+    return tr[-period:].mean()
+
 def get_atr(client, symbol, period=14):
-    klines = client.public.get_candles(market=symbol, resolution="1H", limit=period)
-    high_prices = [float(k['high']) for k in klines['candles']]
-    low_prices = [float(k['low']) for k in klines['candles']]
-    close_prices = [float(k['close']) for k in klines['candles']]
-    df = pd.DataFrame({
-        'high': high_prices,
-        'low': low_prices,
-        'close': close_prices
-    })
-    df['tr0'] = abs(df['high'] - df['low'])
-    df['tr1'] = abs(df['high'] - df['close'].shift())
-    df['tr2'] = abs(df['low'] - df['close'].shift())
-    tr = df[['tr0', 'tr1', 'tr2']].max(axis=1)
-    atr = tr.rolling(window=period).mean().iloc[-1]
-    return atr
+    store = get_candle_store(symbol, "1H").refresh(client, limit=period + 1)
+    return compute_atr(store.column("high"), store.column("low"), store.column("close"), period)
 
 def get_technical_indicators(df):
-    df["RSI"] = talib.RSI(df["close"].values, timeperiod=14)
-    df["EMA12"] = pd.Series(df["close"]).ewm(span=12, adjust=False).mean()
-    df["EMA26"] = pd.Series(df["close"]).ewm(span=26, adjust=False).mean()
-    df["MACD"] = df["EMA12"] - df["EMA26"]
-    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    df["SMA50"] = talib.SMA(df["close"].values, timeperiod=50)
-    df["EMA200"] = talib.EMA(df["close"].values, timeperiod=200)
+    with INDICATOR_SECONDS.labels("batch").time():
+        indicators = compute_indicators(df["close"].values)
+    for column, values in indicators.items():
+        df[column] = values
     return df
 
 def sentiment_analysis(text):
-    analysis = TextBlob(text)
-    return analysis.sentiment.polarity
+    return float(get_sentiment_feed().scorer.score([text])[0])
 
 def get_market_sentiment():
-    url = "https://api.alternative.me/fng/?limit=1"
-    response = requests.get(url).json()
-    sentiment_value = response['data'][0]['value']
-    sentiment_classification = response['data'][0]['value_classification']
-    return sentiment_value, sentiment_classification
+    # Caché con revalidación en segundo plano: sólo la primera llamada del proceso espera a la API
+    return get_sentiment_feed().index.get()
+
+async def aget_market_sentiment(exchange):
+    index = get_sentiment_feed().index
+    if index.age() > index.ttl:
+        await index.arefresh(exchange)
+    return index.peek(revalidate=False)
 
 def calculate_var(returns, confidence_level=0.95):
     if len(returns) < 2:
@@ -88,16 +92,14 @@ def calculate_var(returns, confidence_level=0.95):
     var = np.percentile(returns, (1 - confidence_level) * 100)
     return var
 
-def optimize_portfolio(returns, risk_free_rate=0.01):
-    cov_matrix = np.cov(returns)
+def optimize_portfolio(returns, risk_free_rate=0.01, max_weight=None):
+    from trading_bot.portfolio import optimize_weights, portfolio_stats
+    cov_matrix = np.atleast_2d(np.cov(returns))
     mean_returns = np.mean(returns, axis=1)
-    num_assets = len(mean_returns)
-    weights = np.random.random(num_assets)
-    weights /= np.sum(weights)
-    portfolio_return = np.sum(mean_returns * weights)
-    portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std_dev
-    return weights, portfolio_return, portfolio_std_dev, sharpe_ratio
+    weights = optimize_weights(returns, max_weight, risk_free_rate)
+    portfolio_return, portfolio_std_dev, sharpe_ratio = portfolio_stats(weights, mean_returns, cov_matrix,
+                                                                        risk_free_rate)
+    return weights, float(portfolio_return[0]), float(portfolio_std_dev[0]), float(sharpe_ratio[0])
 
 def backtest_scenario(client, symbol, scenarios):
     results = {}